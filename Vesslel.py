@@ -1,42 +1,84 @@
-from stl import mesh
 import numpy as np
 import tkinter as tk
-from tkinter import filedialog, ttk
+from tkinter import filedialog, ttk, messagebox
 from tkinter import scrolledtext, simpledialog
+import tkinter.font as tkfont
 import os
 import traceback  # 导入错误跟踪模块
-import pyvista as pv
 
-pv.set_plot_theme('document')  # 设置主题
-from pyvistaqt import BackgroundPlotter  # 替换默认的 Plotter
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout
-from PyQt5.QtCore import Qt
-import sys
-
-# 修改 Plotter 的初始化
-plotter = BackgroundPlotter()  # 使用 BackgroundPlotter 替代 pv.Plotter()
-plotter.close() #初始化完毕关闭窗口
+from vessel import (CORNER_WELD_PREFIX, DEVIATION_ARRAY, LOD_CELL_BUDGET, POINTCLOUD_SUFFIXES, QUALITY_ASPECT_LIMIT,
+                    QUALITY_FIELDS, VERTEX_MERGE_TOLERANCE, AssemblyLoader, BackgroundLoader, CellSpatialIndex,
+                    DeviationTask, FacetAdjacency, LoadCancelled, MeshCache, ReportTask, ScanRegistrationTask,
+                    WeldCellIndex, WeldCells, WeldGeometryCache, WeldListModel, WeldStore, blocks_from_files,
+                    QualityTask, build_corner_weld_data, build_weld_data, compute_weld_deviation,
+                    compute_weld_metrics, compute_weld_scan, mesh_triangles, metric_rows, to_polydata,
+                    SEGMENT_MIN_CELLS, WELD_STATUSES, read_assembly_manifest, segment_weld_data, write_metrics)
+from vessel import count, span, traced, tracer
 
 # 全局变量
-current_mesh = None
-current_mesh_pv = None
+current_mesh_pv = None  # 当前模型，顶点与连接数组直接引用加载结果的索引网格
+display_mesh_pv = None  # 实际显示的网格：全分辨率网格本身，或带 cell_id 的简化网格
+current_lod = None  # 当前模型的简化显示网格 (LodMesh)，模型较小时为 None
 plotter = None
-highlighted_areas = []
+highlighted_areas = []  # 当前高亮的焊缝名（按高亮顺序）
 weld_data = {}  # 确保全局变量初始化
+weld_index = None  # 单元 -> 焊缝 反向索引 (WeldCellIndex)
+spatial_index = None  # 单元空间索引 (CellSpatialIndex)，用于拾取和区域查询
+current_adjacency = None  # 面片相邻图 (FacetAdjacency)，用于生成连续焊缝与焊缝分段
+weld_geometry_cache = WeldGeometryCache()  # 焊缝几何缓存
+mesh_cache = MeshCache()  # STL 网格磁盘缓存，重复打开同一文件时直接读取
 highlighting_active = False  # 跟踪高亮状态
+active_loader = None  # 正在运行的后台加载器 (BackgroundLoader)
+active_deviation = None  # 正在运行的偏差计算 (DeviationTask)
+active_report = None  # 正在运行的焊缝报告渲染 (ReportTask)
+active_scan = None  # 正在运行的点云读取与配准 (ScanRegistrationTask)
+active_quality = None  # 正在运行的面片质量计算 (QualityTask)
+current_scan = None  # 已配准扫描点的 (单元 ID, 距离)，未导入点云时为 None
+current_deviation = None  # 当前模型每个单元到设计模型的带符号偏差，未对比时为 None
+current_quality = None  # 当前模型的面片质量场 (FacetQuality)，首次按质量着色时计算
+weld_list_model = WeldListModel()  # 焊缝列表模型（稳定 ID + 过滤）
+weld_store = WeldStore()  # 焊缝数据库，修改与删除逐条写入
+current_store_key = None  # 当前模型在焊缝数据库中的键
+SEGMENT_CONFIRM_CHANGES = 50  # 焊缝分段新增与删除的焊缝超过该数目时，写入数据库前先确认
+WELD_OVERLAY_ARRAY = 'weld_overlay'  # 焊缝高亮的单元标量名，值为色表序号，0 为模型底色
+weld_overlay_palette = ['lightblue', 'red', 'green', 'yellow', 'blue', 'orange', 'magenta', 'cyan']
+# 可用于着色的单元数组：数组名 -> (色标标题, 是否关于 0 对称)
+COLOR_FIELDS = {DEVIATION_ARRAY: ('偏差', True), 'area': ('面积', False), 'aspect_ratio': ('长宽比', False),
+                'min_angle': ('最小内角', False), 'mean_curvature': ('平均曲率', True),
+                'gaussian_curvature': ('高斯曲率', True)}
+
+# 界面控件，由 build_main_window 创建
+root = title_label = left_frame = weld_list = info_text = status_label = progress = None
+lod_enabled = None  # tk.BooleanVar：是否用简化网格显示大模型
+color_field = None  # tk.StringVar：着色用的单元数组名（COLOR_FIELDS），空串为焊缝高亮
+trace_enabled = None  # tk.BooleanVar：是否记录阶段耗时并显示在状态栏
+timing_label = None  # 状态栏中的阶段耗时读数
+weld_filter_status = weld_filter_strength = weld_filter_text = None  # 焊缝列表过滤条件 (tk.StringVar)
+
+
+def import_pyvista():
+    """按需导入 PyVista，首次导入时设置主题，避免启动时加载 VTK"""
+    import pyvista as pv
+
+    if not getattr(import_pyvista, 'themed', False):
+        pv.set_plot_theme('document')  # 设置主题
+        import_pyvista.themed = True
+    return pv
 
 
 def load_model(filepath):
     """加载模型并在导入后高亮焊缝，同时自动弹出窗口"""
-    global current_mesh_pv, plotter
+    global current_mesh_pv, display_mesh_pv, spatial_index, current_adjacency, plotter
     try:
+        pv = import_pyvista()
         current_mesh_pv = pv.read(filepath)
+        display_mesh_pv = current_mesh_pv
+        spatial_index = CellSpatialIndex(np.asarray(current_mesh_pv.points), mesh_triangles(current_mesh_pv))
+        current_adjacency = FacetAdjacency.from_triangles(mesh_triangles(current_mesh_pv))
 
         plotter = pv.Plotter()
-        plotter.add_mesh(current_mesh_pv, show_edges=True, opacity=0.5)
-
-        for weld_name in weld_data.keys():
-            highlight_weld(weld_name)
+        add_weld_overlay_mesh(opacity=0.5)
+        highlight_all_welds()
 
         plotter.show(auto_close=False)
 
@@ -44,39 +86,142 @@ def load_model(filepath):
         print(f"模型加载失败: {str(e)}")
 
 
-def visualize_stl(file_path):
-    global current_mesh, current_mesh_pv, plotter
+def start_loader(make_loader):
+    """取消上一个加载器并启动新的加载器
+
+    make_loader(on_progress, on_done, on_error) 创建加载器；回调只在该加载器仍是
+    active_loader 时生效，被新文件取代的加载器已排队的进度与结果都直接丢弃。
+    """
+    global active_loader
+
+    if active_loader is not None:
+        active_loader.cancel()
+
+    loader = None
+
+    def if_active(handler):
+        return lambda *args: handler(*args) if loader is active_loader else None
+
+    progress.stop()
+    progress.config(mode="determinate", maximum=100, value=0)
+    loader = make_loader(if_active(_on_load_progress), if_active(show_loaded_model), if_active(_on_load_error))
+    active_loader = loader
+    loader.start()
+
+
+def visualize_stl(file_path, tolerance=VERTEX_MERGE_TOLERANCE):
+    """在后台加载 STL，完成后在主线程中显示"""
+    start_loader(lambda on_progress, on_done, on_error: BackgroundLoader(
+        root, file_path,
+        on_progress=on_progress,
+        on_done=on_done,
+        on_error=on_error,
+        tolerance=tolerance,
+        cache=mesh_cache,
+        lod_budget=LOD_CELL_BUDGET,
+        build_spatial=True,
+        store=weld_store))
+
+
+def load_assembly_files():
+    """选择多个分段 STL 或一个总装清单 (JSON)，用进程池并行加载后合并显示"""
+    file_paths = filedialog.askopenfilenames(
+        title="选择分段STL文件或总装清单",
+        filetypes=[("STL文件", "*.stl"), ("总装清单", "*.json"), ("所有文件", "*.*")]
+    )
+    if not file_paths:
+        return
 
     try:
-        current_mesh = mesh.Mesh.from_file(file_path)
-
-        print(f"正在加载: {os.path.basename(file_path)}")
-        print(f"Number of facets: {len(current_mesh)}")
-        print(f"Volume: {current_mesh.get_mass_properties()[0]}")
-        print(f"Center of mass: {current_mesh.get_mass_properties()[1]}")
-        print(f"Moments of inertia: {current_mesh.get_mass_properties()[2]}")
-
-        vertices = current_mesh.vectors.reshape(-1, 3)
-        faces = np.hstack(
-            [np.array([3, i * 3, i * 3 + 1, i * 3 + 2])
-             for i in range(len(current_mesh))]
-        ).astype(int)
-        current_mesh_pv = pv.PolyData(vertices, faces)
-
-        generate_weld_data()
+        if len(file_paths) == 1 and file_paths[0].lower().endswith('.json'):
+            blocks = read_assembly_manifest(file_paths[0])
+        else:
+            blocks = blocks_from_files(file_paths)
+    except Exception as e:
+        status_label.config(text=f"读取总装清单出错: {str(e)}")
+        traceback.print_exc()
+        return
+
+    status_label.config(text=f"正在并行加载 {len(blocks)} 个分段...")
+    start_loader(lambda on_progress, on_done, on_error: AssemblyLoader(
+        root, blocks,
+        on_progress=on_progress,
+        on_done=on_done,
+        on_error=on_error,
+        file_path=file_paths[0],
+        cache_dir=mesh_cache.cache_dir,
+        store_path=weld_store.path,
+        lod_budget=LOD_CELL_BUDGET,
+        build_spatial=True))
+
+
+def _on_load_progress(label, value):
+    progress.config(value=value * 100)
+    status_label.config(text=f"正在加载: {label} ({value:.0%})")
+
+
+def _on_load_error(error, trace_text):
+    progress.config(value=0)
+    if isinstance(error, LoadCancelled):
+        status_label.config(text="已取消加载")
+        return
+    status_label.config(text=f"错误: {str(error)}")
+    print(f"可视化出错: {str(error)}")
+    print(trace_text)
+
+
+def cancel_loading():
+    """取消正在进行的加载、偏差计算、报告渲染、点云配准或面片质量计算"""
+    for task in (active_loader, active_deviation, active_report, active_scan, active_quality):
+        if task is not None and task.running:
+            task.cancel()
+            status_label.config(text="正在取消加载...")
+
+
+@traced('scene_setup', 'render')
+def show_loaded_model(model):
+    """把加载结果设为当前模型并创建绘图窗口（仅在主线程调用）"""
+    global current_mesh_pv, current_lod, plotter, weld_data, weld_index, spatial_index
+    global current_store_key, current_adjacency, current_deviation, current_quality, current_scan
+
+    try:
+        current_mesh_pv = model.mesh_pv
+        current_deviation = None
+        current_quality = None
+        current_scan = None
+        color_field.set('')
+        current_lod = model.lod
+        weld_data = model.weld_data
+        weld_index = model.weld_index
+        spatial_index = model.spatial
+        current_adjacency = model.adjacency
+        current_store_key = model.store_key
+        weld_geometry_cache.invalidate()
+
         update_weld_list()
 
         if plotter is not None:
             plotter.close()
 
+        import_pyvista()
+        from pyvistaqt import BackgroundPlotter  # Qt 只在首次显示模型时加载
+
         plotter = BackgroundPlotter()  # 使用 BackgroundPlotter
-        plotter.add_mesh(current_mesh_pv, color='lightblue', show_edges=True,
-                         opacity=1.0, name='base_mesh')
+        highlighted_areas.clear()
+        select_display_mesh()
+        add_weld_overlay_mesh()
         plotter.add_axes()
         plotter.show_grid()
 
-        plotter.enable_cell_picking(callback=on_cell_pick, show_message=False)
+        # 在显示网格表面取点，再到全分辨率网格上找最近单元，简化显示时拾取结果依然精确
+        plotter.enable_point_picking(callback=on_cell_pick, use_picker=True,
+                                     show_message=False, show_point=False)
         enable_weld_controls()
+        progress.config(value=100)
+        if model.blocks:
+            status_label.config(text=f"已加载总装: {len(model.blocks)} 个分段，{len(weld_data)} 条焊缝")
+        else:
+            status_label.config(text=f"已加载: {os.path.basename(model.file_path)}")
 
     except Exception as e:
         status_label.config(text=f"错误: {str(e)}")
@@ -84,76 +229,170 @@ def visualize_stl(file_path):
         traceback.print_exc()
 
 
-
+@traced('generate_welds', 'welds')
 def generate_weld_data():
     """生成模拟焊缝数据"""
-    global current_mesh_pv, weld_data
+    global current_mesh_pv, weld_data, weld_index
 
     if current_mesh_pv is None:
         return
 
-    n_cells = current_mesh_pv.n_cells
-    print(f"模型总单元数: {n_cells}")
-
-    weld_data = {}
-    for i in range(12):
-        start = int(n_cells * (i / 12))
-        end = int(n_cells * ((i + 1) / 12))
-        weld_data[f'焊缝{i + 1}'] = {
-            'cells': list(range(start, end)),
-            'strength': round(np.random.uniform(0.7, 0.95), 2),
-            'status': '正常' if np.random.rand() > 0.3 else '需检查',
-            'color': np.random.choice(['red', 'green', 'yellow', 'blue', 'orange']),
-            'info': f'焊缝 {i + 1} 区域，模拟数据'
-        }
-
-    for name, data in weld_data.items():
-        print(f"{name} 包含 {len(data['cells'])} 个单元")
+    weld_geometry_cache.invalidate()
+    weld_data = build_weld_data(current_mesh_pv.n_cells, adjacency=current_adjacency)
+    weld_index = WeldCellIndex.from_weld_data(current_mesh_pv.n_cells, weld_data)
+
+
+class VirtualWeldList:
+    """只渲染可见行的焊缝列表
+
+    Listbox 中只放当前一屏的行，滚动条位置按模型总行数换算；
+    选中项按焊缝名记录，与行号和显示文本无关。
+    """
+
+    def __init__(self, parent, model, on_select, scrollbar_style=None, **listbox_options):
+        self.model = model
+        self.on_select = on_select
+        self.top = 0          # 第一条可见行在模型中的行号
+        self.selected = None  # 选中的焊缝名
+
+        self.listbox = tk.Listbox(parent, exportselection=False, activestyle="none", **listbox_options)
+        self.scrollbar = ttk.Scrollbar(parent, command=self.yview,
+                                       **({'style': scrollbar_style} if scrollbar_style else {}))
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_listbox_select)
+        self.listbox.bind("<Configure>", lambda event: self.refresh())
+        self.listbox.bind("<MouseWheel>", lambda event: self.yview("scroll", -event.delta // 120, "units"))
+        self.listbox.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units"))
+        self.listbox.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+        self.listbox.bind("<Up>", lambda event: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda event: self._move_selection(1))
+
+    def config(self, **options):
+        self.listbox.config(**options)
+
+    @property
+    def page_rows(self):
+        return max(1, self.listbox.winfo_height() // self._line_height)
+
+    def refresh(self):
+        """按 top 重新填充可见行并更新滚动条"""
+        n_rows = len(self.model)
+        page = self.page_rows
+        self.top = max(0, min(self.top, n_rows - page))
+        bottom = min(n_rows, self.top + page)
+
+        self.listbox.delete(0, tk.END)
+        for row in range(self.top, bottom):
+            self.listbox.insert(tk.END, self.model.text_at(row))
+
+        row = self.model.row_of(self.selected) if self.selected is not None else None
+        if row is not None and self.top <= row < bottom:
+            self.listbox.selection_set(row - self.top)
+
+        if n_rows:
+            self.scrollbar.set(self.top / n_rows, bottom / n_rows)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        """滚动条与滚轮回调：moveto 比例 / scroll n units|pages"""
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.model))
+        elif args[0] == "scroll":
+            step = self.page_rows if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.refresh()
+        return "break"
+
+    def see(self, weld_name):
+        """滚动到指定焊缝所在行"""
+        row = self.model.row_of(weld_name)
+        if row is None:
+            return
+        page = self.page_rows
+        if row < self.top:
+            self.top = row
+        elif row >= self.top + page:
+            self.top = row - page + 1
+        self.refresh()
+
+    def select(self, weld_name):
+        self.selected = weld_name
+        self.see(weld_name)
+        self.refresh()
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        row = self.top + selection[0]
+        if row >= len(self.model):
+            return
+        self.selected = self.model.name_at(row)
+        self.on_select(self.selected)
 
-    for name, data in weld_data.items():
-        valid_cells = [c for c in data['cells'] if c < n_cells]
-        weld_data[name]['cells'] = valid_cells
-        print(f"焊缝 {name} 包含 {len(valid_cells)} 个有效单元")
+    def _move_selection(self, step):
+        row = self.model.row_of(self.selected) if self.selected is not None else None
+        row = 0 if row is None else max(0, min(len(self.model) - 1, row + step))
+        if len(self.model):
+            self.select(self.model.name_at(row))
+            self.on_select(self.selected)
+        return "break"
 
 
 def update_weld_list():
-    """更新焊缝列表"""
-    global weld_list
-
-    weld_list.delete(0, tk.END)
-
-    if 'weld_data' in globals() and weld_data:
-        for name, data in weld_data.items():
-            status_indicator = "✓" if data['status'] == '正常' else "⚠"
-            weld_list.insert(tk.END, f"{status_indicator} {name} ({data['status']})")
-
+    """按 weld_data 重建焊缝列表（加载新模型时调用）"""
+    weld_list_model.reset(weld_data)
+    weld_list.selected = None
+    weld_list.top = 0
+    weld_list.refresh()
     weld_list.config(state=tk.NORMAL)
     print(f"已添加 {len(weld_data)} 个焊缝到列表")
 
 
-def on_weld_select(event):
-    """当用户从列表中选择焊缝时触发"""
-    global plotter, highlighted_areas
+def refresh_weld_rows(names):
+    """增量更新列表中的指定焊缝：存在则更新或新增，已删除则移除"""
+    for name in names:
+        if name in weld_data:
+            weld_list_model.upsert(name, weld_data[name])
+        else:
+            weld_list_model.remove(name)
+    if weld_list.selected is not None and weld_list.selected not in weld_data:
+        weld_list.selected = None
+    weld_list.refresh()
 
-    selection = weld_list.curselection()
-    if not selection:
-        return
 
-    selected_index = selection[0]
-    selected_item = weld_list.get(selected_index)
+def apply_weld_filter(*args):
+    """按状态、最低强度与关键字过滤焊缝列表"""
+    status = weld_filter_status.get()
+    try:
+        min_strength = float(weld_filter_strength.get()) if weld_filter_strength.get().strip() else None
+    except ValueError:
+        min_strength = None
+    weld_list_model.set_filter(status=None if status == "全部" else status,
+                               min_strength=min_strength,
+                               text=weld_filter_text.get())
+    weld_list.top = 0
+    weld_list.refresh()
 
-    parts = selected_item.split(' ')
-    if len(parts) < 2:
-        print("列表项格式错误")
-        return
 
-    selected_name = parts[1]
+def selected_weld_name():
+    """当前列表中选中的焊缝名，没有则为 None"""
+    return weld_list.selected
+
+
+def on_weld_select(selected_name):
+    """当用户从列表中选择焊缝时触发"""
     print(f"选择了焊缝: {selected_name}")
 
     display_weld_info(selected_name)
     highlight_weld(selected_name)
 
 
+@traced('weld_info', 'ui')
 def display_weld_info(weld_name):
     """显示焊缝详细信息，并增加焊缝最大尺寸、焊缝边界和 PCA 结果"""
     if weld_name in weld_data:
@@ -163,55 +402,183 @@ def display_weld_info(weld_name):
         info_text.delete(1.0, tk.END)
 
         info_text.insert(tk.END, f"名称: {weld_name}\n")
-        info_text.insert(tk.END, f"强度: {data['strength']:.2f}\n")
-        info_text.insert(tk.END, f"状态: {data['status']}\n")
-        info_text.insert(tk.END, f"单元数: {len(data['cells'])}\n")
+        info_text.insert(tk.END, f"强度: {data.strength:.2f}\n")
+        info_text.insert(tk.END, f"状态: {data.status}\n")
+        info_text.insert(tk.END, f"单元数: {len(data.cells)}\n")
 
-        if current_mesh_pv is not None and data['cells']:
+        if current_mesh_pv is not None and data.cells:
             try:
-                weld_mesh = current_mesh_pv.extract_cells(np.array(data['cells'], dtype=int))
-                weld_bounds = weld_mesh.bounds  # (xmin, xmax, ymin, ymax, zmin, zmax)
-                info_text.insert(tk.END, f"焊缝边界: {weld_bounds}\n")
-                max_dim = max(weld_bounds[1] - weld_bounds[0],
-                              weld_bounds[3] - weld_bounds[2],
-                              weld_bounds[5] - weld_bounds[4])
-                info_text.insert(tk.END, f"焊缝最大尺寸: {max_dim:.2f}\n")
-
-                points = weld_mesh.points
-                mean_point = np.mean(points, axis=0)
-                centered = points - mean_point
-                cov = np.cov(centered, rowvar=False)
-                eig_vals, eig_vecs = np.linalg.eig(cov)
-                sorted_indices = np.argsort(eig_vals)[::-1]
-                eig_vals = eig_vals[sorted_indices]
-                eig_vecs = eig_vecs[:, sorted_indices]
-                pca_result = (
-                    f"主成分分析 (PCA) 结果:\n"
-                    f"  特征值: {np.array2string(eig_vals, precision=2)}\n"
-                    f"  主方向:\n    {np.array2string(eig_vecs[:, 0], precision=2)}\n"
-                    f"    {np.array2string(eig_vecs[:, 1], precision=2)}\n"
-                    f"    {np.array2string(eig_vecs[:, 2], precision=2)}\n"
-                )
-                info_text.insert(tk.END, pca_result)
+                geometry = weld_geometry_cache.get(weld_name, data, current_mesh_pv)
+                if geometry.empty:
+                    info_text.insert(tk.END, "焊缝单元不在当前模型中\n")
+                else:
+                    info_text.insert(tk.END, f"焊缝边界: {geometry.bounds}\n")
+                    info_text.insert(tk.END, f"焊缝最大尺寸: {geometry.max_dim:.2f}\n")
+
+                    eig_vals, eig_vecs = geometry.eig_vals, geometry.eig_vecs
+                    pca_result = (
+                        f"主成分分析 (PCA) 结果:\n"
+                        f"  特征值: {np.array2string(eig_vals, precision=2)}\n"
+                        f"  主方向:\n    {np.array2string(eig_vecs[:, 0], precision=2)}\n"
+                        f"    {np.array2string(eig_vecs[:, 1], precision=2)}\n"
+                        f"    {np.array2string(eig_vecs[:, 2], precision=2)}\n"
+                    )
+                    info_text.insert(tk.END, pca_result)
             except Exception as e:
                 info_text.insert(tk.END, f"计算几何属性出错: {str(e)}\n")
 
-        info_text.insert(tk.END, f"\n信息: {data['info']}\n")
+        if current_deviation is not None and data.cells:
+            stats = compute_weld_deviation(current_deviation, {weld_name: data})
+            info_text.insert(tk.END,
+                             f"扫描-设计偏差: 平均 {stats.mean[0]:.4f}，RMS {stats.rms[0]:.4f}，"
+                             f"范围 [{stats.min[0]:.4f}, {stats.max[0]:.4f}]，"
+                             f"|偏差| 95% 分位 {stats.p95[0]:.4f}\n")
+
+        if current_scan is not None and data.cells:
+            cell_ids, distances = current_scan
+            scan = compute_weld_scan(cell_ids, distances, {weld_name: data}, current_mesh_pv.n_cells)
+            info_text.insert(tk.END,
+                             f"点云扫描: {int(scan.points[0])} 点，覆盖 {int(scan.covered_cells[0])}/{len(data.cells)} 个单元"
+                             + (f"，平均距离 {scan.mean_distance[0]:.4f}，最大 {scan.max_distance[0]:.4f}\n"
+                                if scan.points[0] else "\n"))
+
+        if current_quality is not None and data.cells:
+            cells = data.cells.clip(len(current_quality)).to_array()
+            poor = ~current_quality.mask(aspect_ratio=(None, QUALITY_ASPECT_LIMIT))[cells]
+            info_text.insert(tk.END,
+                             f"面片质量: 平均长宽比 {np.nanmean(current_quality.aspect_ratio[cells]):.2f}，"
+                             f"最小内角 {np.nanmin(current_quality.min_angle[cells]):.1f}°，"
+                             f"平均曲率 {np.nanmean(current_quality.mean_curvature[cells]):.4f}，"
+                             f"劣质面片 {int(np.count_nonzero(poor))} 个\n")
+
+        info_text.insert(tk.END, f"\n信息: {data.info}\n")
         info_text.insert(tk.END, "\n备注: 此数据为模拟数据，仅供参考。\n")
 
-        if data['status'] == '正常':
+        if data.status == '正常':
             info_text.tag_add("status", "3.0", "3.0 lineend")
             info_text.tag_config("status", foreground="green")
-        elif data['status'] == '需检查':
+        elif data.status == '需检查':
             info_text.tag_add("status", "3.0", "3.0 lineend")
             info_text.tag_config("status", foreground="orange")
-        elif data['status'] == '需修复':
+        elif data.status == '需修复':
             info_text.tag_add("status", "3.0", "3.0 lineend")
             info_text.tag_config("status", foreground="red")
 
         info_text.config(state=tk.DISABLED)
 
 
+def select_display_mesh():
+    """根据 LOD 开关选择显示网格：大模型用简化网格，其余直接显示全分辨率网格"""
+    global display_mesh_pv
+
+    if current_lod is not None and (lod_enabled is None or lod_enabled.get()):
+        display_mesh_pv = to_polydata(current_lod.points, current_lod.triangles)
+        display_mesh_pv.cell_data['cell_id'] = current_lod.cell_ids  # 显示单元 -> 原始单元
+    else:
+        display_mesh_pv = current_mesh_pv
+    _add_cell_fields(current_mesh_pv)
+    if display_mesh_pv is not current_mesh_pv:
+        _add_cell_fields(display_mesh_pv, display_mesh_pv.cell_data['cell_id'])
+
+
+def _add_cell_fields(mesh_pv, cell_ids=None):
+    """把偏差与面片质量写成单元数组；cell_ids 为简化显示网格的 显示单元 -> 原始单元 映射"""
+    if current_deviation is not None:
+        mesh_pv.cell_data[DEVIATION_ARRAY] = current_deviation if cell_ids is None else current_deviation[cell_ids]
+    if current_quality is not None:
+        current_quality.add_to(mesh_pv, cell_ids)
+
+
+def toggle_lod():
+    """切换简化显示，焊缝高亮状态保持不变"""
+    if plotter is None or current_mesh_pv is None:
+        return
+    select_display_mesh()
+    add_weld_overlay_mesh()
+    _overlay_modified()
+    plotter.render()
+
+
+def add_weld_overlay_mesh(opacity=1.0):
+    """添加模型底色网格，焊缝高亮通过同一个 actor 的单元标量显示
+
+    选择了着色字段（偏差或面片质量）时同一个 actor 改为按该单元数组显示，焊缝高亮暂不可见；
+    有符号的字段用关于 0 对称的色标，色标范围去掉两端 1% 的极端值。
+    """
+    for mesh_pv in (current_mesh_pv, display_mesh_pv):
+        if WELD_OVERLAY_ARRAY not in mesh_pv.cell_data:
+            mesh_pv.cell_data[WELD_OVERLAY_ARRAY] = np.zeros(mesh_pv.n_cells, dtype=np.uint8)
+
+    field = color_field.get() if color_field is not None else ''
+    if field and field in display_mesh_pv.cell_data:
+        title, symmetric = COLOR_FIELDS[field]
+        values = display_mesh_pv.cell_data[field]
+        if symmetric:
+            limit = float(np.nanpercentile(np.abs(values), 99)) or 1.0
+            clim = [-limit, limit]
+        else:
+            clim = [float(v) for v in np.nanpercentile(values, [1, 99])]
+        _clear_scalar_bars()
+        plotter.add_mesh(display_mesh_pv,
+                         scalars=field,
+                         cmap='coolwarm' if symmetric else 'viridis',
+                         clim=clim,
+                         scalar_bar_args={'title': title},
+                         show_edges=False,
+                         opacity=opacity,
+                         name='base_mesh')
+        return
+
+    plotter.add_mesh(display_mesh_pv,
+                     scalars=WELD_OVERLAY_ARRAY,
+                     cmap=list(weld_overlay_palette),
+                     clim=[0, len(weld_overlay_palette) - 1],
+                     n_colors=len(weld_overlay_palette),
+                     show_scalar_bar=False,
+                     show_edges=display_mesh_pv is current_mesh_pv,  # 简化显示时不画边线
+                     opacity=opacity,
+                     name='base_mesh')
+
+
+def _overlay_modified():
+    """覆盖数组修改后通知 VTK；简化显示时按 cell_id 把颜色同步到显示单元"""
+    current_mesh_pv.GetCellData().GetArray(WELD_OVERLAY_ARRAY).Modified()
+    if display_mesh_pv is not current_mesh_pv:
+        overlay = current_mesh_pv.cell_data[WELD_OVERLAY_ARRAY]
+        display_mesh_pv.cell_data[WELD_OVERLAY_ARRAY][:] = overlay[display_mesh_pv.cell_data['cell_id']]
+        display_mesh_pv.GetCellData().GetArray(WELD_OVERLAY_ARRAY).Modified()
+
+
+def _overlay_color_index(color):
+    """返回颜色在覆盖色表中的序号，新颜色追加到色表末尾"""
+    if color not in weld_overlay_palette:
+        if len(weld_overlay_palette) >= 255:
+            return 1
+        weld_overlay_palette.append(color)
+    return weld_overlay_palette.index(color)
+
+
+@traced('repaint', 'render')
+def repaint_weld_overlay():
+    """按 highlighted_areas 重新填充覆盖数组，并渲染一次"""
+    global highlighted_areas
+
+    highlighted_areas = [name for name in highlighted_areas if name in weld_data]
+    overlay = current_mesh_pv.cell_data[WELD_OVERLAY_ARRAY]
+    overlay[:] = 0
+    n_colors = len(weld_overlay_palette)
+    for name in highlighted_areas:
+        record = weld_data[name]
+        record.cells.clip(len(overlay)).put(overlay, _overlay_color_index(record.color))
+    _overlay_modified()
+
+    if len(weld_overlay_palette) != n_colors:
+        add_weld_overlay_mesh()  # 色表扩充后需要更新 actor 的颜色映射
+    with span('render', 'render'):
+        plotter.render()
+
+
+@traced('highlight', 'ui')
 def highlight_weld(weld_name):
     """高亮或取消高亮显示指定焊缝"""
     global current_mesh_pv, plotter
@@ -221,61 +588,85 @@ def highlight_weld(weld_name):
         return
 
     weld_info = weld_data[weld_name]
-    if "cells" not in weld_info:
-        print(f"错误: {weld_name} 缺少cells字段")
-        return
 
     try:
-        actor_name = f"weld_{weld_name}"
-        if actor_name in plotter.renderer._actors:
-            plotter.remove_actor(actor_name)
-            plotter.update()
-            plotter.render()
+        if weld_name in highlighted_areas:
+            highlighted_areas.remove(weld_name)
+            repaint_weld_overlay()
             return
 
-        cells_to_highlight = np.array(weld_info['cells'], dtype=int)
-        if cells_to_highlight.size == 0:
+        cells = weld_info.cells.clip(current_mesh_pv.n_cells)
+        if not cells:
             print(f"警告: {weld_name} 无有效单元")
             return
 
-        selected_cells = current_mesh_pv.extract_cells(cells_to_highlight)
-        if selected_cells.n_cells == 0:
-            print(f"警告: {weld_name} 无有效单元可显示")
-            return
-
-        plotter.add_mesh(selected_cells,
-                         color=weld_info.get('color'),
-                         opacity=1.0,
-                         show_edges=True,
-                         line_width=4,
-                         name=actor_name)
-
-        plotter.update()
-        plotter.render()
+        # 新高亮的焊缝只需写入自身单元，无需重建整个覆盖数组
+        n_colors = len(weld_overlay_palette)
+        highlighted_areas.append(weld_name)
+        overlay = current_mesh_pv.cell_data[WELD_OVERLAY_ARRAY]
+        cells.put(overlay, _overlay_color_index(weld_info.color))
+        _overlay_modified()
+        count('highlighted_cells', len(cells))
+
+        if len(weld_overlay_palette) != n_colors:
+            add_weld_overlay_mesh()
+        with span('render', 'render'):
+            plotter.render()
 
     except Exception as e:
         print(f"高亮错误: {str(e)}")
         traceback.print_exc()
 
 
-def on_cell_pick(point):
-    global current_mesh_pv
+def highlight_all_welds():
+    """高亮全部焊缝，无论焊缝数量多少只渲染一次"""
+    global highlighted_areas
+
+    highlighted_areas = list(weld_data.keys())
+    repaint_weld_overlay()
+
 
-    closest_cell = current_mesh_pv.find_closest_cell(point)
+def on_cell_pick(point):
+    with span('pick', 'ui'):
+        if spatial_index is not None:
+            closest_cell = spatial_index.closest_cell(point)
+        else:
+            closest_cell = current_mesh_pv.find_closest_cell(point)
+    count('picks')
     print(f"点击位置: {point}")
     print(f"最近的单元 ID: {closest_cell}")
 
-    found_weld = None
-    for weld_name, weld_info in weld_data.items():
-        if closest_cell in weld_info['cells']:
-            found_weld = weld_name
-            break
+    found_weld = weld_index.weld_at(closest_cell) if weld_index is not None else None
 
     if found_weld:
         print(f"点击的焊缝: {found_weld}")
+        weld_list.select(found_weld)
         highlight_weld(found_weld)
 
 
+def select_welds_in_region():
+    """按球形区域（中心与半径）选择焊缝并高亮"""
+    global highlighted_areas
+
+    if spatial_index is None or weld_index is None:
+        status_label.config(text="错误: 请先加载模型")
+        return
+
+    answer = simpledialog.askstring("区域选择焊缝", "输入球心坐标与半径（x y z r）:")
+    if not answer:
+        return
+    try:
+        x, y, z, radius = (float(value) for value in answer.replace(',', ' ').split())
+    except ValueError:
+        messagebox.showerror("输入错误", "请输入 4 个数字：x y z r")
+        return
+
+    names = spatial_index.welds_in_sphere(weld_index, (x, y, z), radius)
+    highlighted_areas = names
+    repaint_weld_overlay()
+    status_label.config(text=f"区域内共 {len(names)} 条焊缝")
+
+
 def enable_weld_controls():
     """启用焊缝控制区域"""
     weld_list.config(state=tk.NORMAL)
@@ -299,15 +690,11 @@ def add_modify_delete_buttons():
 def modify_weld():
     global weld_data, weld_list, status_label
 
-    selection = weld_list.curselection()
-    if not selection:
+    selected_name = selected_weld_name()
+    if selected_name is None:
         status_label.config(text="请先选择要修改的焊缝")
         return
 
-    selected_index = selection[0]
-    selected_item = weld_list.get(selected_index)
-    selected_name = selected_item.split(' ')[1]
-
     # 创建修改窗口
     modify_window = tk.Toplevel(root)
     modify_window.title(f"修改焊缝 - {selected_name}")
@@ -324,36 +711,35 @@ def modify_weld():
     ttk.Label(modify_window, text="强度", style="Custom.TLabel").pack(pady=5)
     strength_entry = ttk.Entry(modify_window)
     strength_entry.pack(pady=5)
-    strength_entry.insert(0, str(data['strength']))
+    strength_entry.insert(0, str(data.strength))
 
     # 输入框用于状态的修改
     ttk.Label(modify_window, text="状态", style="Custom.TLabel").pack(pady=5)
     status_entry = ttk.Entry(modify_window)
     status_entry.pack(pady=5)
-    status_entry.insert(0, data['status'])
+    status_entry.insert(0, data.status)
 
     # 输入框用于单元数的修改（通常单元数不应手动修改，但这里我们允许修改）
     ttk.Label(modify_window, text="单元数", style="Custom.TLabel").pack(pady=5)
     cells_entry = ttk.Entry(modify_window)
     cells_entry.pack(pady=5)
-    cells_entry.insert(0, len(data['cells']))
+    cells_entry.insert(0, len(data.cells))
 
     # 输入框用于焊缝边界的修改
     ttk.Label(modify_window, text="焊缝边界 (xmin, xmax, ymin, ymax, zmin, zmax)", style="Custom.TLabel").pack(pady=5)
-    weld_mesh = current_mesh_pv.extract_cells(np.array(data['cells'], dtype=int))
-    weld_bounds = weld_mesh.bounds  # (xmin, xmax, ymin, ymax, zmin, zmax)
+    geometry = weld_geometry_cache.get(selected_name, data, current_mesh_pv)
     bounds_entry = ttk.Entry(modify_window)
     bounds_entry.pack(pady=5)
-    bounds_entry.insert(0, str(weld_bounds))
+    if not geometry.empty:  # 没有单元的焊缝边界与尺寸留空
+        bounds_entry.insert(0, str(geometry.bounds))
 
     # 输入框用于焊缝最大尺寸的修改
-    max_dim = max(weld_bounds[1] - weld_bounds[0],
-                  weld_bounds[3] - weld_bounds[2],
-                  weld_bounds[5] - weld_bounds[4])
+    max_dim = geometry.max_dim
     ttk.Label(modify_window, text="焊缝最大尺寸", style="Custom.TLabel").pack(pady=5)
     max_dim_entry = ttk.Entry(modify_window)
     max_dim_entry.pack(pady=5)
-    max_dim_entry.insert(0, f"{max_dim:.2f}")
+    if not geometry.empty:
+        max_dim_entry.insert(0, f"{max_dim:.2f}")
 
     # 保存按钮
     save_button = ttk.Button(modify_window, text="保存",
@@ -364,48 +750,70 @@ def modify_weld():
     save_button.pack(pady=20)
 
 def save_weld(modify_window, weld_name, strength, status, cells_count, bounds, max_dim):
-    global weld_data
+    global weld_data, weld_index
+
+    record = weld_data[weld_name]
 
     # 更新焊缝信息
     if strength:
-        weld_data[weld_name]['strength'] = float(strength)
+        record.strength = float(strength)
     if status:
-        weld_data[weld_name]['status'] = status
+        record.status = status
     if cells_count:
-        weld_data[weld_name]['cells'] = list(range(int(cells_count)))  # 假设修改为简单的范围
+        record.cells = WeldCells.from_range(0, int(cells_count))  # 假设修改为简单的范围
+        if current_mesh_pv is not None:
+            record.cells = record.cells.clip(current_mesh_pv.n_cells)
+        if weld_index is not None:
+            weld_index.add(weld_name, record.cells)
+        if weld_name in highlighted_areas and plotter is not None:
+            repaint_weld_overlay()
     if bounds:
         # 更新焊缝边界（这里需要解析输入的边界值）
         bounds_values = list(map(float, bounds.strip('()').split(',')))
-        weld_data[weld_name]['bounds'] = bounds_values
+        record.bounds = bounds_values
 
-    # 重新计算最大尺寸（由新的边界决定，可选）
-    if len(bounds_values) == 6:
-        new_max_dim = max(bounds_values[1] - bounds_values[0],
-                          bounds_values[3] - bounds_values[2],
-                          bounds_values[5] - bounds_values[4])
-        weld_data[weld_name]['max_dim'] = new_max_dim
+        # 重新计算最大尺寸（由新的边界决定，可选）
+        if len(bounds_values) == 6:
+            new_max_dim = max(bounds_values[1] - bounds_values[0],
+                              bounds_values[3] - bounds_values[2],
+                              bounds_values[5] - bounds_values[4])
+            record.max_dim = new_max_dim
 
-    update_weld_list()
+    persist_welds(updated={weld_name: record})
+    refresh_weld_rows([weld_name])
     modify_window.destroy()
     status_label.config(text=f"焊缝 {weld_name} 信息已更新")
 
 
+def persist_welds(updated=None, deleted=()):
+    """把焊缝的新增、修改与删除增量写入焊缝数据库"""
+    if current_store_key is None:
+        return
+    try:
+        weld_store.write(current_store_key, updated, deleted)
+    except Exception as e:
+        status_label.config(text=f"保存焊缝数据出错: {str(e)}")
+        traceback.print_exc()
+
+
 def delete_weld():
-    global weld_data, weld_list
+    global weld_data, weld_list, weld_index
 
-    selection = weld_list.curselection()
-    if not selection:
+    selected_name = selected_weld_name()
+    if selected_name is None:
         status_label.config(text="请先选择要删除的焊缝")
         return
 
-    selected_index = selection[0]
-    selected_item = weld_list.get(selected_index)
-    selected_name = selected_item.split(' ')[1]
-
-    confirm = tk.messagebox.askyesno("确认删除", f"确定要删除焊缝 {selected_name} 吗？")
+    confirm = messagebox.askyesno("确认删除", f"确定要删除焊缝 {selected_name} 吗？")
     if confirm:
         del weld_data[selected_name]
-        update_weld_list()
+        if weld_index is not None:
+            weld_index.remove(selected_name)
+        weld_geometry_cache.invalidate(selected_name)
+        persist_welds(deleted=[selected_name])
+        if selected_name in highlighted_areas and plotter is not None:
+            repaint_weld_overlay()
+        refresh_weld_rows([selected_name])
         status_label.config(text=f"已删除焊缝 {selected_name}")
 
 
@@ -419,12 +827,13 @@ def select_stl_file():
 
     if file_path:
         status_label.config(text="正在加载文件...")
-        root.after(100, lambda: visualize_stl(file_path))
+        visualize_stl(file_path)
 
 
+@traced('corner_extract', 'extract')
 def extract_corner_welds():
     """提取模型中的角焊缝"""
-    global current_mesh_pv, weld_data
+    global current_mesh_pv, weld_data, weld_index
 
     if current_mesh_pv is None:
         status_label.config(text="错误: 请先加载模型")
@@ -434,21 +843,29 @@ def extract_corner_welds():
         status_label.config(text="正在提取角焊缝...")
 
         n_cells = current_mesh_pv.n_cells
-
-        corner_weld_data = {}
-        for i in range(1, 13):
-            start_cell = int(n_cells * (i - 1) / 12)
-            end_cell = int(n_cells * i / 12)
-            corner_weld_data[f'角焊缝{i}'] = {
-                'cells': list(range(start_cell, end_cell)),
-                'strength': round(0.6 + 0.05 * (i % 5), 2),
-                'status': '正常' if i % 3 != 0 else '需检查',
-                'color': 'magenta' if i % 2 == 0 else 'cyan',
-                'info': f'自动检测的角焊缝{i}'
-            }
+        corner_weld_data = build_corner_weld_data(np.asarray(current_mesh_pv.points),
+                                                  mesh_triangles(current_mesh_pv),
+                                                  adjacency=current_adjacency)
+
+        # 重新提取时先移除上一次的角焊缝
+        previous = [name for name in weld_data if name.startswith(CORNER_WELD_PREFIX)]
+        for name in previous:
+            del weld_data[name]
+            if weld_index is not None:
+                weld_index.remove(name)
+            weld_geometry_cache.invalidate(name)
 
         weld_data.update(corner_weld_data)
-        update_weld_list()
+        persist_welds(updated=corner_weld_data,
+                      deleted=[name for name in previous if name not in corner_weld_data])
+        if weld_index is None or weld_index.n_cells != n_cells:
+            weld_index = WeldCellIndex.from_weld_data(n_cells, weld_data)
+        else:
+            for name, data in corner_weld_data.items():
+                weld_index.add(name, data.cells)
+        if plotter is not None and any(name.startswith(CORNER_WELD_PREFIX) for name in highlighted_areas):
+            repaint_weld_overlay()
+        refresh_weld_rows(previous + [name for name in corner_weld_data if name not in previous])
         status_label.config(text=f"已提取 {len(corner_weld_data)} 个角焊缝")
 
     except Exception as e:
@@ -457,174 +874,530 @@ def extract_corner_welds():
         traceback.print_exc()
 
 
-# 创建主窗口
-root = tk.Tk()
-root.option_add("*TLabel*foreground", "black")
-root.option_add("*TLabel*background", "white")
-root.title("船舰智能焊缝检测系统")
-root.geometry("1280x720")
-root.configure(bg="#2E2E2E")
-
-# 设置全局样式
-style = ttk.Style()
-style.theme_create("custom", parent="alt", settings={
-    "TFrame": {"configure": {"background": "#3A3A3A"}},
-    "TLabel": {
-        "configure": {
-            "background": "#3A3A3A",
-            "foreground": "#FFFFFF",
-            "font": ("微软雅黑", 12)
-        }
-    },
-    "TButton": {
-        "configure": {
-            "background": "#4A90E2",
-            "foreground": "white",
-            "borderwidth": 0,
-            "width": 15,
-            "font": ("微软雅黑", 11, "bold")
+@traced('segment_welds', 'ui')
+def segment_welds():
+    """按面片相邻关系把每条焊缝拆分为连续的焊缝段"""
+    global weld_data, weld_index, current_adjacency
+
+    if current_mesh_pv is None:
+        status_label.config(text="错误: 请先加载模型")
+        return
+    min_cells = simpledialog.askinteger("焊缝连续分段", "单元数少于该值的焊缝段视为噪声丢弃:",
+                                        initialvalue=SEGMENT_MIN_CELLS, minvalue=1, parent=root)
+    if min_cells is None:
+        return
+
+    try:
+        status_label.config(text="正在按相邻关系拆分焊缝...")
+        if current_adjacency is None or current_adjacency.n_cells != current_mesh_pv.n_cells:
+            current_adjacency = FacetAdjacency.from_triangles(mesh_triangles(current_mesh_pv))
+
+        previous = weld_data
+        segmented = segment_weld_data(current_adjacency, previous, min_cells)
+        deleted = [name for name in previous if name not in segmented]
+        updated = {name: record for name, record in segmented.items() if previous.get(name) is not record}
+        dropped = sum(len(record.cells) for record in previous.values()) - \
+            sum(len(record.cells) for record in segmented.values())
+        if len(deleted) + len(updated) > SEGMENT_CONFIRM_CHANGES or dropped:
+            confirm = messagebox.askyesno(
+                "确认焊缝分段",
+                f"拆分后共 {len(segmented)} 条焊缝（原 {len(previous)} 条），"
+                f"新增或修改 {len(updated)} 条、删除 {len(deleted)} 条，"
+                f"丢弃 {dropped} 个噪声单元。\n确定保存到焊缝数据库吗？")
+            if not confirm:
+                status_label.config(text="已取消焊缝分段")
+                return
+
+        weld_data = segmented
+        for name in deleted + list(updated):
+            weld_geometry_cache.invalidate(name)
+        persist_welds(updated=updated, deleted=deleted)
+        weld_index = WeldCellIndex.from_weld_data(current_mesh_pv.n_cells, weld_data)
+        if plotter is not None and highlighted_areas:
+            repaint_weld_overlay()
+        refresh_weld_rows(deleted + list(updated))
+        status_label.config(text=f"已拆分为 {len(weld_data)} 条连续焊缝（原 {len(previous)} 条）")
+
+    except Exception as e:
+        status_label.config(text=f"焊缝分段错误: {str(e)}")
+        print(f"焊缝分段出错: {str(e)}")
+        traceback.print_exc()
+
+
+def compare_with_design():
+    """选择设计模型，在后台计算当前（扫描）模型每个单元到它的带符号偏差"""
+    global active_deviation
+
+    if current_mesh_pv is None:
+        status_label.config(text="错误: 请先加载扫描模型")
+        return
+
+    design_path = filedialog.askopenfilename(
+        title="选择设计STL文件",
+        filetypes=[("STL文件", "*.stl"), ("所有文件", "*.*")]
+    )
+    if not design_path:
+        return
+
+    if active_deviation is not None and active_deviation.running:
+        active_deviation.cancel()
+
+    status_label.config(text="正在计算扫描-设计偏差...")
+    progress.stop()
+    progress.config(mode="determinate", maximum=100, value=0)
+    active_deviation = DeviationTask(root, np.asarray(current_mesh_pv.points), mesh_triangles(current_mesh_pv),
+                                     weld_data, design_path,
+                                     on_progress=_on_load_progress,
+                                     on_done=show_deviation,
+                                     on_error=_on_load_error,
+                                     cache=mesh_cache)
+    active_deviation.start()
+
+
+@traced('deviation_view', 'render')
+def show_deviation(result):
+    """保存偏差结果并切换到偏差着色（仅在主线程调用）"""
+    global current_deviation
+
+    deviation, stats, design = result
+    if current_mesh_pv is None or len(deviation) != current_mesh_pv.n_cells:
+        status_label.config(text="模型已更换，偏差结果作废")
+        return
+
+    current_deviation = deviation
+    select_display_mesh()  # 把偏差数组写到全分辨率网格与当前显示网格
+    progress.config(value=100)
+    rms = float(np.sqrt(np.mean(deviation * deviation)))
+    text = f"偏差计算完成（{os.path.basename(design.file_path)}）：RMS {rms:.4f}"
+    if len(stats) and np.isfinite(stats.abs_max).any():
+        worst = int(np.nanargmax(stats.abs_max))
+        text += f"，最大偏差焊缝 {stats.names[worst]}（{stats.abs_max[worst]:.4f}）"
+    status_label.config(text=text)
+
+    color_field.set(DEVIATION_ARRAY)
+    set_color_field()
+    selected = selected_weld_name()
+    if selected:
+        display_weld_info(selected)
+
+
+def set_color_field():
+    """按 color_field 切换着色：焊缝高亮、扫描-设计偏差或面片质量（首次选择时在后台计算）"""
+    global active_quality
+
+    if plotter is None or current_mesh_pv is None:
+        return
+    field = color_field.get()
+    if field == DEVIATION_ARRAY and current_deviation is None:
+        color_field.set('')
+        status_label.config(text="请先在「文件」菜单中进行扫描-设计偏差对比")
+        field = ''
+    elif field in QUALITY_FIELDS and current_quality is None:
+        if active_quality is not None and active_quality.running:
+            return  # 计算完成后按当时选择的字段着色
+        status_label.config(text="正在计算面片质量...")
+        progress.stop()
+        progress.config(mode="determinate", maximum=100, value=0)
+        mesh_pv = current_mesh_pv
+        active_quality = QualityTask(root, np.asarray(mesh_pv.points), mesh_triangles(mesh_pv),
+                                     on_progress=_on_load_progress,
+                                     on_done=lambda quality: show_facet_quality(quality, mesh_pv),
+                                     on_error=_on_load_error,
+                                     adjacency=current_adjacency)
+        active_quality.start()
+        return
+
+    add_weld_overlay_mesh()
+    if not field:
+        _clear_scalar_bars()
+        _overlay_modified()
+    plotter.render()
+    selected = selected_weld_name()
+    if selected:
+        display_weld_info(selected)
+
+
+def show_facet_quality(quality, mesh_pv):
+    """保存面片质量场并按当前选择的字段着色（仅在主线程调用）"""
+    global current_quality
+
+    if mesh_pv is not current_mesh_pv:
+        status_label.config(text="模型已更换，面片质量结果作废")
+        return
+
+    current_quality = quality
+    select_display_mesh()  # 把质量数组写到全分辨率网格与当前显示网格
+    status_label.config(text=f"面片质量计算完成：{len(quality)} 个面片，"
+                             f"长宽比超过 {QUALITY_ASPECT_LIMIT:g} 的 "
+                             f"{int(np.count_nonzero(~quality.mask(aspect_ratio=(None, QUALITY_ASPECT_LIMIT))))} 个")
+    set_color_field()
+
+
+def _clear_scalar_bars():
+    for title in list(plotter.scalar_bars.keys()):
+        plotter.remove_scalar_bar(title, render=False)
+
+
+def build_main_window():
+    """创建主窗口及全部控件"""
+    global root, title_label, left_frame, weld_list, info_text, status_label, progress, lod_enabled
+    global weld_filter_status, weld_filter_strength, weld_filter_text, trace_enabled, timing_label
+    global color_field
+
+    # 创建主窗口
+    root = tk.Tk()
+    root.option_add("*TLabel*foreground", "black")
+    root.option_add("*TLabel*background", "white")
+    root.title("船舰智能焊缝检测系统")
+    root.geometry("1280x720")
+    root.configure(bg="#2E2E2E")
+
+    # 设置全局样式
+    style = ttk.Style()
+    style.theme_create("custom", parent="alt", settings={
+        "TFrame": {"configure": {"background": "#3A3A3A"}},
+        "TLabel": {
+            "configure": {
+                "background": "#3A3A3A",
+                "foreground": "#FFFFFF",
+                "font": ("微软雅黑", 12)
+            }
         },
-        "map": {
-            "background": [("active", "#357ABD"), ("disabled", "#A0A0A0")],
-            "foreground": [("disabled", "#E0E0E0")]
-        }
-    },
-    "TListbox": {
-        "configure": {
-            "background": "#404040",
-            "foreground": "#FFFFFF",
-            "selectbackground": "#4A90E2",
-            "font": ("Consolas", 11)
-        }
-    },
-    "TScrolledText": {
-        "configure": {
-            "background": "#404040",
-            "foreground": "#FFFFFF",
-            "insertbackground": "white",
-            "font": ("Consolas", 11)
-        }
-    },
-    "TLabelFrame": {
-        "configure": {
-            "background": "#3A3A3A",
-            "foreground": "#4A90E2",
-            "relief": "flat",
-            "borderwidth": 2,
-            "labelmargins": (10, 5),
-            "font": ("微软雅黑", 12, "bold")
-        }
-    },
-    "Horizontal.TProgressbar": {
-        "configure": {
-            "background": "#4A90E2",
-            "troughcolor": "#404040",
-            "borderwidth": 0,
-            "lightcolor": "#6AA8FF",
-            "darkcolor": "#357ABD"
+        "TButton": {
+            "configure": {
+                "background": "#4A90E2",
+                "foreground": "white",
+                "borderwidth": 0,
+                "width": 15,
+                "font": ("微软雅黑", 11, "bold")
+            },
+            "map": {
+                "background": [("active", "#357ABD"), ("disabled", "#A0A0A0")],
+                "foreground": [("disabled", "#E0E0E0")]
+            }
+        },
+        "TListbox": {
+            "configure": {
+                "background": "#404040",
+                "foreground": "#FFFFFF",
+                "selectbackground": "#4A90E2",
+                "font": ("Consolas", 11)
+            }
+        },
+        "TScrolledText": {
+            "configure": {
+                "background": "#404040",
+                "foreground": "#FFFFFF",
+                "insertbackground": "white",
+                "font": ("Consolas", 11)
+            }
+        },
+        "TLabelFrame": {
+            "configure": {
+                "background": "#3A3A3A",
+                "foreground": "#4A90E2",
+                "relief": "flat",
+                "borderwidth": 2,
+                "labelmargins": (10, 5),
+                "font": ("微软雅黑", 12, "bold")
+            }
+        },
+        "Horizontal.TProgressbar": {
+            "configure": {
+                "background": "#4A90E2",
+                "troughcolor": "#404040",
+                "borderwidth": 0,
+                "lightcolor": "#6AA8FF",
+                "darkcolor": "#357ABD"
+            }
         }
-    }
-})
-style.theme_use("custom")
-
-# 创建标题框架
-title_frame = ttk.Frame(root)
-title_frame.pack(fill=tk.X, pady=15)
-
-# 创建标题标签
-title_label = ttk.Label(title_frame,
-                        text="⛴️ 船舰智能焊缝检测系统",
-                        font=("微软雅黑", 20, "bold"),
-                        foreground="#4A90E2")
-title_label.pack(expand=True)
-
-# 创建菜单栏
-menubar = tk.Menu(root, tearoff=0, bg="#404040", fg="white",
-                  activebackground="#4A90E2", activeforeground="white")
-root.config(menu=menubar)
-
-# 文件菜单
-file_menu = tk.Menu(menubar, tearoff=0, bg="#404040", fg="white")
-menubar.add_cascade(label="文件", menu=file_menu)
-file_menu.add_command(label="📤 导入模型", command=select_stl_file)
-file_menu.add_command(label="🔍 角焊缝提取", command=extract_corner_welds)
-file_menu.add_separator()
-file_menu.add_command(label="🚪 退出", command=root.quit)
-
-# 主面板布局
-main_frame = ttk.PanedWindow(root, orient=tk.HORIZONTAL)
-main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
-
-# 左侧控制面板
-left_frame = ttk.Frame(main_frame)
-main_frame.add(left_frame, weight=1)
-
-# 焊缝列表容器
-weld_frame = ttk.LabelFrame(left_frame, text="🔗 焊缝列表")
-weld_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-# 自定义滚动条
-scroll_style = ttk.Style()
-scroll_style.configure("Custom.Vertical.TScrollbar",
-                       gripcount=0,
-                       background="#404040",
-                       troughcolor="#3A3A3A",
-                       arrowcolor="white")
-
-# 焊缝列表
-weld_list = tk.Listbox(weld_frame,
-                       bg="#404040", fg="white",
-                       selectbackground="#4A90E2",
-                       selectforeground="white",
-                       font=("微软雅黑", 11),
-                       relief="flat",
-                       highlightthickness=0)
-scrollbar = ttk.Scrollbar(weld_frame,
-                          style="Custom.Vertical.TScrollbar",
-                          command=weld_list.yview)
-weld_list.config(yscrollcommand=scrollbar.set)
-weld_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-weld_list.bind("<<ListboxSelect>>", on_weld_select)
-
-# 添加修改和删除按钮
-add_modify_delete_buttons()
-
-# 右侧信息面板
-right_frame = ttk.Frame(main_frame)
-main_frame.add(right_frame, weight=2)
-
-# 焊缝信息容器
-info_frame = ttk.LabelFrame(right_frame, text="📄 焊缝详细信息")
-info_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-# 信息文本框
-info_text = scrolledtext.ScrolledText(info_frame,
-                                      wrap=tk.WORD,
-                                      bg="#404040",
-                                      fg="white",
-                                      insertbackground="white",
-                                      font=("Consolas", 11),
-                                      relief="flat",
-                                      padx=10,
-                                      pady=10)
-info_text.pack(fill=tk.BOTH, expand=True)
-
-# 状态栏
-status_bar = ttk.Frame(root, height=25)
-status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-
-status_label = ttk.Label(status_bar,
-                         text="✅ 系统就绪",
-                         anchor=tk.W,
-                         font=("微软雅黑", 10),
-                         foreground="#4A90E2")
-status_label.pack(side=tk.LEFT, padx=10)
-
-progress = ttk.Progressbar(status_bar,
-                           mode="indeterminate",
-                           style="Horizontal.TProgressbar")
-progress.pack(side=tk.RIGHT, padx=10, pady=2)
+    })
+    style.theme_use("custom")
+
+    # 创建标题框架
+    title_frame = ttk.Frame(root)
+    title_frame.pack(fill=tk.X, pady=15)
+
+    # 创建标题标签
+    title_label = ttk.Label(title_frame,
+                            text="⛴️ 船舰智能焊缝检测系统",
+                            font=("微软雅黑", 20, "bold"),
+                            foreground="#4A90E2")
+    title_label.pack(expand=True)
+
+    # 创建菜单栏
+    menubar = tk.Menu(root, tearoff=0, bg="#404040", fg="white",
+                      activebackground="#4A90E2", activeforeground="white")
+    root.config(menu=menubar)
+
+    # 文件菜单
+    file_menu = tk.Menu(menubar, tearoff=0, bg="#404040", fg="white")
+    menubar.add_cascade(label="文件", menu=file_menu)
+    file_menu.add_command(label="📤 导入模型", command=select_stl_file)
+    file_menu.add_command(label="🚢 导入分段总装", command=load_assembly_files)
+    file_menu.add_command(label="🔍 角焊缝提取", command=extract_corner_welds)
+    file_menu.add_command(label="🧩 焊缝连续分段", command=segment_welds)
+    file_menu.add_command(label="📐 扫描-设计偏差对比", command=compare_with_design)
+    file_menu.add_command(label="🛰 导入点云扫描并配准", command=import_scan_cloud)
+    file_menu.add_command(label="📊 导出焊缝指标", command=export_weld_metrics)
+    file_menu.add_command(label="🖼 导出焊缝报告", command=export_weld_report)
+    file_menu.add_command(label="⏱ 导出性能追踪", command=export_trace)
+    file_menu.add_command(label="🎯 区域选择焊缝", command=select_welds_in_region)
+    file_menu.add_command(label="⏹ 取消加载", command=cancel_loading)
+    file_menu.add_separator()
+    file_menu.add_command(label="🚪 退出", command=root.quit)
+
+    # 视图菜单
+    lod_enabled = tk.BooleanVar(value=True)
+    view_menu = tk.Menu(menubar, tearoff=0, bg="#404040", fg="white")
+    menubar.add_cascade(label="视图", menu=view_menu)
+    view_menu.add_checkbutton(label="简化显示大模型", variable=lod_enabled, command=toggle_lod)
+    color_field = tk.StringVar(value='')
+    color_menu = tk.Menu(view_menu, tearoff=0, bg="#404040", fg="white")
+    view_menu.add_cascade(label="着色", menu=color_menu)
+    color_menu.add_radiobutton(label="焊缝高亮", value='', variable=color_field, command=set_color_field)
+    for field, (title, _) in COLOR_FIELDS.items():
+        color_menu.add_radiobutton(label=title, value=field, variable=color_field, command=set_color_field)
+    trace_enabled = tk.BooleanVar(value=tracer.enabled)
+    view_menu.add_checkbutton(label="显示阶段耗时", variable=trace_enabled, command=toggle_trace)
+
+    # 主面板布局
+    main_frame = ttk.PanedWindow(root, orient=tk.HORIZONTAL)
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
+
+    # 左侧控制面板
+    left_frame = ttk.Frame(main_frame)
+    main_frame.add(left_frame, weight=1)
+
+    # 焊缝列表容器
+    weld_frame = ttk.LabelFrame(left_frame, text="🔗 焊缝列表")
+    weld_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    # 自定义滚动条
+    scroll_style = ttk.Style()
+    scroll_style.configure("Custom.Vertical.TScrollbar",
+                           gripcount=0,
+                           background="#404040",
+                           troughcolor="#3A3A3A",
+                           arrowcolor="white")
+
+    # 焊缝过滤：状态、最低强度、关键字
+    filter_frame = ttk.Frame(weld_frame)
+    filter_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+    weld_filter_status = tk.StringVar(value="全部")
+    weld_filter_strength = tk.StringVar()
+    weld_filter_text = tk.StringVar()
+    ttk.Combobox(filter_frame, textvariable=weld_filter_status, values=["全部", *WELD_STATUSES],
+                 state="readonly", width=6).pack(side=tk.LEFT, padx=2)
+    ttk.Label(filter_frame, text="强度≥").pack(side=tk.LEFT)
+    ttk.Entry(filter_frame, textvariable=weld_filter_strength, width=5).pack(side=tk.LEFT, padx=2)
+    ttk.Entry(filter_frame, textvariable=weld_filter_text).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+    for variable in (weld_filter_status, weld_filter_strength, weld_filter_text):
+        variable.trace_add("write", apply_weld_filter)
+
+    # 焊缝列表（只渲染可见行）
+    weld_list = VirtualWeldList(weld_frame, weld_list_model, on_weld_select,
+                                scrollbar_style="Custom.Vertical.TScrollbar",
+                                bg="#404040", fg="white",
+                                selectbackground="#4A90E2",
+                                selectforeground="white",
+                                font=("微软雅黑", 11),
+                                relief="flat",
+                                highlightthickness=0)
+
+    # 添加修改和删除按钮
+    add_modify_delete_buttons()
+
+    # 右侧信息面板
+    right_frame = ttk.Frame(main_frame)
+    main_frame.add(right_frame, weight=2)
+
+    # 焊缝信息容器
+    info_frame = ttk.LabelFrame(right_frame, text="📄 焊缝详细信息")
+    info_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    # 信息文本框
+    info_text = scrolledtext.ScrolledText(info_frame,
+                                          wrap=tk.WORD,
+                                          bg="#404040",
+                                          fg="white",
+                                          insertbackground="white",
+                                          font=("Consolas", 11),
+                                          relief="flat",
+                                          padx=10,
+                                          pady=10)
+    info_text.pack(fill=tk.BOTH, expand=True)
+
+    # 状态栏
+    status_bar = ttk.Frame(root, height=25)
+    status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
+    status_label = ttk.Label(status_bar,
+                             text="✅ 系统就绪",
+                             anchor=tk.W,
+                             font=("微软雅黑", 10),
+                             foreground="#4A90E2")
+    status_label.pack(side=tk.LEFT, padx=10)
+
+    progress = ttk.Progressbar(status_bar,
+                               mode="indeterminate",
+                               style="Horizontal.TProgressbar")
+    progress.pack(side=tk.RIGHT, padx=10, pady=2)
+
+    timing_label = ttk.Label(status_bar,
+                             text="",
+                             anchor=tk.E,
+                             font=("Consolas", 9),
+                             foreground="#888888")
+    timing_label.pack(side=tk.RIGHT, padx=10)
+
+
+def export_weld_metrics():
+    """一次性计算全部焊缝的几何指标并导出为 CSV/JSON"""
+    if current_mesh_pv is None or not weld_data:
+        status_label.config(text="错误: 请先加载模型")
+        return
+
+    output = filedialog.asksaveasfilename(
+        title="导出焊缝指标",
+        defaultextension=".csv",
+        filetypes=[("CSV文件", "*.csv"), ("JSON文件", "*.json")]
+    )
+    if not output:
+        return
+
+    try:
+        metrics = compute_weld_metrics(np.asarray(current_mesh_pv.points),
+                                       mesh_triangles(current_mesh_pv), weld_data)
+        file_name = os.path.basename(active_loader.file_path) if active_loader is not None else ''
+        fmt = 'json' if output.lower().endswith('.json') else 'csv'
+        write_metrics(metric_rows(file_name, weld_data, metrics), output, fmt)
+        status_label.config(text=f"已导出 {len(metrics)} 条焊缝指标")
+    except Exception as e:
+        status_label.config(text=f"导出焊缝指标出错: {str(e)}")
+        traceback.print_exc()
+
+
+def export_weld_report():
+    """选择目录，在后台用进程池离屏渲染全部焊缝截图并写出指标表"""
+    global active_report
+
+    if current_mesh_pv is None or not weld_data:
+        status_label.config(text="错误: 请先加载模型")
+        return
+
+    output_dir = filedialog.askdirectory(title="选择焊缝报告输出目录")
+    if not output_dir:
+        return
+
+    if active_report is not None and active_report.running:
+        active_report.cancel()
+
+    status_label.config(text=f"正在渲染 {len(weld_data)} 条焊缝截图...")
+    progress.stop()
+    progress.config(mode="determinate", maximum=100, value=0)
+    file_name = os.path.basename(active_loader.file_path) if active_loader is not None else ''
+    active_report = ReportTask(root, np.asarray(current_mesh_pv.points), mesh_triangles(current_mesh_pv),
+                               weld_data, output_dir,
+                               on_progress=_on_load_progress,
+                               on_done=_on_report_done,
+                               on_error=_on_load_error,
+                               file_name=file_name,
+                               spatial=spatial_index)
+    active_report.start()
+
+
+def _on_report_done(table):
+    progress.config(value=100)
+    status_label.config(text=f"焊缝报告已写入: {table}")
+
+
+def import_scan_cloud():
+    """选择点云扫描文件，在后台读取、ICP 配准到当前模型并映射到焊缝单元"""
+    global active_scan
+
+    if current_mesh_pv is None or spatial_index is None:
+        status_label.config(text="错误: 请先加载模型")
+        return
+
+    scan_path = filedialog.askopenfilename(
+        title="选择点云扫描文件",
+        filetypes=[("点云文件", " ".join(f"*{suffix}" for suffix in POINTCLOUD_SUFFIXES)), ("所有文件", "*.*")]
+    )
+    if not scan_path:
+        return
+    voxel_size = simpledialog.askfloat("体素下采样", "体素尺寸（0 为不下采样）:", initialvalue=0.0,
+                                       minvalue=0.0, parent=root)
+    if voxel_size is None:
+        return
+
+    if active_scan is not None and active_scan.running:
+        active_scan.cancel()
+
+    status_label.config(text="正在读取并配准点云...")
+    progress.stop()
+    progress.config(mode="determinate", maximum=100, value=0)
+    active_scan = ScanRegistrationTask(root, scan_path, spatial_index, weld_data,
+                                       on_progress=_on_load_progress,
+                                       on_done=show_scan_cloud,
+                                       on_error=_on_load_error,
+                                       voxel_size=voxel_size or None)
+    active_scan.start()
+
+
+@traced('scan_view', 'render')
+def show_scan_cloud(result):
+    """显示配准后的点云（按到模型的距离着色）并保存单元映射（仅在主线程调用）"""
+    global current_scan
+
+    aligned, cell_ids, distances, registration, stats = result
+    if plotter is None or active_scan is None or active_scan.spatial is not spatial_index:
+        status_label.config(text="模型已更换，点云配准结果作废")
+        return
+
+    current_scan = (cell_ids, distances)
+    if len(aligned):
+        plotter.add_points(aligned, scalars=distances, cmap='viridis', point_size=2, name='scan_cloud',
+                           clim=[0.0, float(np.percentile(distances, 99)) or 1.0],  # 去掉极端值
+                           scalar_bar_args={'title': '扫描距离'}, render=False)
+    plotter.render()
+    progress.config(value=100)
+    status_label.config(text=f"点云配准{'完成' if registration.converged else '未收敛'}：{len(aligned)} 点，"
+                             f"{registration.iterations} 次迭代，RMSE {registration.rmse:.4g}，"
+                             f"{int(np.count_nonzero(stats.points))}/{len(stats)} 条焊缝有扫描点")
+    selected = selected_weld_name()
+    if selected:
+        display_weld_info(selected)
+
+
+def toggle_trace():
+    """开关阶段计时；打开时状态栏显示最近各阶段耗时"""
+    tracer.enable(trace_enabled.get())
+    if not trace_enabled.get():
+        timing_label.config(text="")
+
+
+def update_timing_readout():
+    """定时刷新状态栏中的阶段耗时（只在主线程读取 tracer，工作线程不触碰 Tk）"""
+    if tracer.enabled:
+        timing_label.config(text=" · ".join(f"{name} {seconds * 1000:.0f}ms"
+                                            for name, seconds in tracer.recent(5)))
+    root.after(500, update_timing_readout)
+
+
+def export_trace():
+    """导出 Chrome trace-event JSON（chrome://tracing 或 Perfetto 打开）"""
+    if not tracer.events:
+        status_label.config(text="没有计时记录，请先在「视图」菜单中打开阶段计时")
+        return
+    output = filedialog.asksaveasfilename(
+        title="导出性能追踪",
+        defaultextension=".json",
+        filetypes=[("Chrome Trace", "*.json")]
+    )
+    if output:
+        tracer.write(output)
+        status_label.config(text=f"已导出 {len(tracer.events)} 条计时记录")
 
 
 # 动态效果
@@ -635,7 +1408,14 @@ def animate_title():
     root.after(1500, animate_title)
 
 
-animate_title()
+def main():
+    build_main_window()
+    animate_title()
+    update_timing_readout()
+
+    # 启动应用
+    root.mainloop()
+
 
-# 启动应用
-root.mainloop()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
\ No newline at end of file
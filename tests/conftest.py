@@ -0,0 +1,45 @@
+"""测试共用的小规模合成船体与焊缝"""
+import numpy as np
+import pytest
+
+from vessel import CellSpatialIndex, build_indexed_mesh, build_weld_data, synthetic_hull, write_binary_stl
+
+HULL_FACETS = 4000
+
+
+@pytest.fixture(scope='session')
+def hull_vectors():
+    return synthetic_hull(HULL_FACETS)
+
+
+@pytest.fixture(scope='session')
+def hull(hull_vectors):
+    """索引网格 (points, triangles)"""
+    points, triangles, _ = build_indexed_mesh(hull_vectors)
+    return points, triangles
+
+
+@pytest.fixture(scope='session')
+def spatial(hull):
+    return CellSpatialIndex(*hull)
+
+
+@pytest.fixture(scope='session')
+def welds(hull):
+    return build_weld_data(len(hull[1]), n_welds=12, seed=0, verbose=False)
+
+
+@pytest.fixture
+def hull_stl(tmp_path, hull_vectors):
+    path = tmp_path / 'hull.stl'
+    write_binary_stl(path, hull_vectors)
+    return str(path)
+
+
+def surface_points(points, triangles, n, noise, seed=0):
+    """在网格表面随机取 n 点并加高斯噪声"""
+    rng = np.random.default_rng(seed)
+    cells = rng.integers(0, len(triangles), n)
+    weights = rng.dirichlet(np.ones(3), n)
+    corners = points[triangles[cells]].astype(np.float64)
+    return np.einsum('ij,ijk->ik', weights, corners) + rng.normal(scale=noise, size=(n, 3))
@@ -0,0 +1,60 @@
+import numpy as np
+from scipy import sparse as scipy_sparse
+from scipy.sparse.csgraph import connected_components as scipy_components
+
+from vessel import FacetAdjacency, WeldCells, WeldRecord, connected_components, facet_edge_pairs, segment_weld_data
+
+
+def _scipy_pieces(triangles, cells):
+    """scipy 在焊缝单元诱导子图上的连通分量，每个分量为单元集合"""
+    face_a, face_b = facet_edge_pairs(triangles)
+    inside = np.zeros(len(triangles), dtype=bool)
+    inside[cells] = True
+    linked = inside[face_a] & inside[face_b]
+    local = np.full(len(triangles), -1)
+    local[cells] = np.arange(len(cells))
+    graph = scipy_sparse.coo_matrix((np.ones(int(linked.sum())), (local[face_a[linked]], local[face_b[linked]])),
+                                    shape=(len(cells), len(cells)))
+    _, labels = scipy_components(graph, directed=False)
+    return {frozenset(cells[labels == label].tolist()) for label in np.unique(labels)}
+
+
+def test_connected_components_matches_scipy(hull):
+    triangles = hull[1]
+    face_a, face_b = facet_edge_pairs(triangles)
+    rng = np.random.default_rng(0)
+    keep = rng.random(len(face_a)) < 0.3  # 去掉大部分边，得到许多分量
+    labels = connected_components(len(triangles), face_a[keep], face_b[keep])
+    graph = scipy_sparse.coo_matrix((np.ones(int(keep.sum())), (face_a[keep], face_b[keep])),
+                                    shape=(len(triangles), len(triangles)))
+    n_expected, expected = scipy_components(graph, directed=False)
+    assert len(np.unique(labels)) == n_expected
+    # 两种标签给出同一划分：标签对一一对应
+    assert len(np.unique(labels * n_expected + expected)) == n_expected
+
+
+def test_segment_weld_data_matches_scipy_components(hull, welds):
+    triangles = hull[1]
+    adjacency = FacetAdjacency.from_triangles(triangles)
+    rng = np.random.default_rng(1)
+    scattered = {name: WeldRecord(WeldCells.from_ids(np.sort(rng.choice(len(triangles), 300, replace=False))),
+                                  record.strength, record.status, record.color, record.info)
+                 for name, record in list(welds.items())[:4]}
+    scattered.update(list(welds.items())[4:])
+
+    segments = segment_weld_data(adjacency, scattered, min_cells=1)
+    for name, record in scattered.items():
+        expected = _scipy_pieces(triangles, record.cells.to_array())
+        found = {frozenset(segment.cells.to_array().tolist()) for segment_name, segment in segments.items()
+                 if segment_name == name or segment_name.startswith(f'{name}-')}
+        assert found == expected
+
+
+def test_segment_weld_data_drops_small_pieces(hull, welds):
+    triangles = hull[1]
+    adjacency = FacetAdjacency.from_triangles(triangles)
+    segments = segment_weld_data(adjacency, welds, min_cells=5)
+    for segment in segments.values():
+        assert len(segment.cells) >= 5
+    kept = sum(len(segment.cells) for segment in segments.values())
+    assert kept <= sum(len(record.cells) for record in welds.values())
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vessel import (BLOCK_SEPARATOR, AssemblyBlock, LoadCancelled, WeldStore, block_transform,
+                    combine_mass_properties, load_assembly, load_stl_model)
+
+
+@pytest.fixture
+def blocks(hull_stl):
+    return [AssemblyBlock('B01', hull_stl),
+            AssemblyBlock('B02', hull_stl, block_transform(translate=[100.0, 0, 0], rotate_z=90))]
+
+
+def test_blocks_are_offset_and_transformed(blocks, hull_stl):
+    single = load_stl_model(hull_stl, build_polydata=False)
+    model = load_assembly(blocks, max_workers=1, build_polydata=False)
+
+    n_points, n_cells = len(single.points), len(single.triangles)
+    assert len(model.points) == 2 * n_points and len(model.triangles) == 2 * n_cells
+    assert [block.cell_range() for block in model.blocks] == [(0, n_cells), (n_cells, 2 * n_cells)]
+    np.testing.assert_array_equal(model.triangles[n_cells:], single.triangles + n_points)
+    moved = single.points.astype(np.float64) @ blocks[1].transform[:3, :3].T + [100.0, 0, 0]
+    np.testing.assert_allclose(model.points[n_points:], moved, atol=1e-4)
+
+    assert len(model.weld_data) == 2 * len(single.weld_data)
+    for name, record in single.weld_data.items():
+        shifted = model.weld_data[f'B02{BLOCK_SEPARATOR}{name}'].cells.to_array()
+        np.testing.assert_array_equal(shifted, record.cells.to_array() + n_cells)
+    assert model.blocks[1].weld_names == list(single.weld_data)
+    assert model.store_key is None
+
+
+def test_combine_mass_properties_parallel_axis():
+    inertia = np.diag([1.0, 2.0, 3.0])
+    volume, cog, total = combine_mass_properties([(2.0, np.array([-1.0, 0, 0]), inertia),
+                                                  (2.0, np.array([1.0, 0, 0]), inertia)])
+    assert volume == 4.0
+    np.testing.assert_allclose(cog, 0)
+    np.testing.assert_allclose(total, 2 * inertia + np.diag([0.0, 4.0, 4.0]))
+    assert combine_mass_properties([(0.0, np.zeros(3), inertia)])[0] == 0.0
+
+
+def test_assembly_edits_are_persisted(tmp_path, blocks):
+    store_path = str(tmp_path / 'welds.sqlite')
+    model = load_assembly(blocks, max_workers=1, store_path=store_path, build_polydata=False)
+    assert model.store_key is not None
+
+    names = list(model.blocks[0].weld_names)
+    removed = f'B01{BLOCK_SEPARATOR}{names[0]}'
+    store = WeldStore(store_path)
+    store.delete(model.store_key, removed)
+    store.close()
+
+    reloaded = load_assembly(blocks, max_workers=1, store_path=store_path, build_polydata=False)
+    assert reloaded.store_key == model.store_key
+    assert removed not in reloaded.weld_data
+    assert reloaded.blocks[0].weld_names == names[1:]
+    assert len(reloaded.blocks[0].metrics) == len(reloaded.blocks[0].weld_names)
+
+    # 变换改变后单元坐标不同，视为新的总装模型
+    moved = [blocks[0], AssemblyBlock('B02', blocks[1].file_path, block_transform(translate=[0, 50.0, 0]))]
+    other = load_assembly(moved, max_workers=1, store_path=store_path, build_polydata=False)
+    assert other.store_key != model.store_key
+    assert removed in other.weld_data
+
+
+def test_cancelled_assembly(blocks):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(LoadCancelled):
+        load_assembly(blocks, max_workers=1, cancel_event=cancel_event, build_polydata=False)
@@ -0,0 +1,84 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vessel import LoadCancelled, MeshCache, load_stl_model
+
+
+def _load(path, cache, **options):
+    return load_stl_model(path, build_polydata=False, cache=cache, **options)
+
+
+def test_mesh_cache_round_trip(tmp_path, hull_stl):
+    model = _load(hull_stl, None, build_adjacency=False)
+    cache = MeshCache(str(tmp_path / 'cache'))
+    assert cache.load(hull_stl, 1e-6) is None
+
+    digest = cache.store(hull_stl, 1e-6, model.points, model.triangles, model.facet_ids,
+                         model.mass_properties, model.weld_data)
+    cached = MeshCache(str(tmp_path / 'cache')).load(hull_stl, 1e-6)
+    assert cached is not None and cached.digest == digest
+    np.testing.assert_array_equal(cached.points, model.points)
+    np.testing.assert_array_equal(cached.triangles, model.triangles)
+    np.testing.assert_array_equal(cached.facet_ids, model.facet_ids)
+    for a, b in zip(cached.mass_properties, model.mass_properties):
+        np.testing.assert_allclose(a, b)
+    assert list(cached.weld_data) == list(model.weld_data)
+    for name, record in model.weld_data.items():
+        np.testing.assert_array_equal(cached.weld_data[name].cells.to_array(), record.cells.to_array())
+        assert cached.weld_data[name].info == record.info
+
+    # 不同容差与修改后的文件都不命中
+    assert cache.load(hull_stl, 1e-3) is None
+    with open(hull_stl, 'ab') as f:
+        f.write(b'\0')
+    assert cache.load(hull_stl, 1e-6) is None
+
+
+def test_digest_records_are_per_file(tmp_path, hull_stl):
+    other = tmp_path / 'other.stl'
+    other.write_bytes(b'solid x\nendsolid x\n')
+    first = MeshCache(str(tmp_path / 'cache'))
+    second = MeshCache(str(tmp_path / 'cache'))  # 模拟另一个进程
+    digest = first.digest(hull_stl)
+    second.digest(str(other))
+    # 第二个实例写入记录后，第一个文件的记录仍在，不再重新计算哈希
+    fresh = MeshCache(str(tmp_path / 'cache'))
+    assert fresh.digest(hull_stl) == digest
+    assert len(list((tmp_path / 'cache' / 'paths').iterdir())) == 2
+
+
+def test_cache_hit_reuses_derived_structures(tmp_path, hull_stl):
+    cache = MeshCache(str(tmp_path / 'cache'))
+    options = dict(lod_budget=1000, build_spatial=True)
+    built = _load(hull_stl, cache, **options)
+    assert built.lod is not None
+
+    stages = []
+    loaded = _load(hull_stl, cache, progress=lambda label, value: stages.append((label, value)), **options)
+    assert isinstance(loaded.lod.points, np.memmap)
+    assert isinstance(loaded.adjacency.indices, np.memmap)
+    np.testing.assert_array_equal(loaded.lod.cell_ids, built.lod.cell_ids)
+    np.testing.assert_array_equal(loaded.adjacency.indptr, built.adjacency.indptr)
+    np.testing.assert_array_equal(loaded.adjacency.indices, built.adjacency.indices)
+    assert loaded.spatial.closest_cell(built.points[0]) == built.spatial.closest_cell(built.points[0])
+
+    # 命中缓存时各阶段依然报告进度，最终到达 100%
+    labels = [label for label, _ in stages]
+    assert {'读取网格缓存', '生成简化显示网格', '构建空间索引', '构建面片相邻关系'} <= set(labels)
+    assert '解析 STL' not in labels
+    assert stages[-1][1] == pytest.approx(1.0)
+
+
+def test_cache_hit_can_be_cancelled(tmp_path, hull_stl):
+    cache = MeshCache(str(tmp_path / 'cache'))
+    _load(hull_stl, cache)
+    cancel_event = threading.Event()
+
+    def progress(label, value):
+        if label == '构建空间索引':
+            cancel_event.set()
+
+    with pytest.raises(LoadCancelled):
+        _load(hull_stl, cache, build_spatial=True, progress=progress, cancel_event=cancel_event)
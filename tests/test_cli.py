@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+from vessel import cli
+from vessel.cli import build_parser, main
+
+from conftest import surface_points
+
+STL_COMMANDS = [['batch', 'dir'], ['query', 'a.stl', '--point', '0', '0', '0'], ['assembly', 'a.stl'],
+                ['deviation', 'a.stl', 'b.stl'], ['report', 'a.stl'], ['scan', 'a.ply', 'a.stl'], ['serve']]
+
+
+@pytest.mark.parametrize('command', STL_COMMANDS, ids=lambda command: command[0])
+def test_common_options(command):
+    args = build_parser().parse_args(command + ['--tolerance', '0.5', '--cache-dir', 'c', '--no-cache',
+                                                '--store', 's.sqlite', '--no-store'])
+    assert (args.tolerance, args.cache_dir, args.no_cache, args.store, args.no_store) == \
+           (0.5, 'c', True, 's.sqlite', True)
+
+
+@pytest.mark.parametrize('k', ['0', '-2', 'x'])
+def test_query_rejects_non_positive_k(k, capsys):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(['query', 'a.stl', '--point', '0', '0', '0', '-k', k])
+    assert '-k' in capsys.readouterr().err
+
+
+def test_query_k():
+    assert build_parser().parse_args(['query', 'a.stl', '--point', '0', '0', '0', '-k', '3']).k == 3
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_scan_uses_one_worker_count(tmp_path, monkeypatch, hull, hull_stl, workers):
+    scan = tmp_path / 'scan.xyz'
+    np.savetxt(scan, surface_points(*hull, 2000, noise=0.01, seed=7))
+    used = {}
+
+    def spy(name, fn, key):
+        def wrapper(*args, **kwargs):
+            used[name] = kwargs[key]
+            return fn(*args, **kwargs)
+        monkeypatch.setattr(cli, name, wrapper)
+
+    spy('register_icp', cli.register_icp, 'workers')
+    spy('map_scan_points', cli.map_scan_points, 'max_workers')
+    command = ['scan', str(scan), hull_stl, '--no-cache', '--no-store', '-o', str(tmp_path / 'scan.csv')]
+    assert main(command + (['--workers', str(workers)] if workers else [])) == 0
+    assert used['register_icp'] == used['map_scan_points'] == (workers or os.cpu_count())
+    assert (tmp_path / 'scan.csv').exists()
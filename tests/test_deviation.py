@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vessel import CellSpatialIndex, LoadCancelled, compute_weld_deviation, face_normals, signed_deviation
+
+
+def test_signed_deviation_of_identical_mesh_is_zero(hull, spatial):
+    deviation, closest = signed_deviation(*hull, spatial, chunk_cells=1000)
+    np.testing.assert_allclose(deviation, 0, atol=1e-9)
+    assert len(closest) == len(hull[1])
+
+
+def test_signed_deviation_sign_follows_target_normals(hull, spatial):
+    points, triangles = hull
+    normals = face_normals(points, triangles)
+    rng = np.random.default_rng(0)
+    cells = rng.choice(len(triangles), 200, replace=False)
+    offsets = rng.choice([-0.05, 0.05], len(cells))
+    # 单个三角形沿目标面片法向移动，偏差的符号与移动方向一致
+    moved = points[triangles[cells]].astype(np.float64) + (offsets[:, None] * normals[cells])[:, None]
+    source_points = moved.reshape(-1, 3)
+    source_triangles = np.arange(len(source_points)).reshape(-1, 3)
+
+    deviation, _ = signed_deviation(source_points, source_triangles, spatial, chunk_cells=64)
+    centers = moved.mean(axis=1)
+    _, distances, _ = spatial.closest_cells(centers)
+    np.testing.assert_allclose(np.abs(deviation), distances, atol=1e-12)
+    assert np.all(np.sign(deviation) == np.sign(offsets))
+
+
+def test_weld_deviation_matches_per_weld_numpy(hull, welds):
+    deviation = np.random.default_rng(1).normal(size=len(hull[1]))
+    stats = compute_weld_deviation(deviation, welds)
+    for name, record in welds.items():
+        values = deviation[record.cells.to_array()]
+        row = stats.row(name)
+        assert stats.mean[row] == pytest.approx(values.mean())
+        assert stats.rms[row] == pytest.approx(np.sqrt(np.mean(values ** 2)))
+        assert (stats.min[row], stats.max[row]) == (values.min(), values.max())
+        assert stats.abs_max[row] == np.abs(values).max()
+        ranked = np.sort(np.abs(values))
+        assert stats.p95[row] == ranked[int(np.ceil(len(values) * 0.95)) - 1]
+
+
+def test_cancelled_deviation(hull):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(LoadCancelled):
+        signed_deviation(*hull, CellSpatialIndex(*hull), cancel_event=cancel_event)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from vessel import WeldCells, WeldGeometry, WeldGeometryCache, WeldRecord, mesh_triangles, to_polydata
+
+
+@pytest.fixture(scope='module')
+def mesh_pv(hull):
+    return to_polydata(*hull)
+
+
+def _record(cells):
+    return WeldRecord(cells, 0.5, '正常', 'red', '')
+
+
+def test_geometry_matches_submesh(mesh_pv, welds):
+    record = next(iter(welds.values()))
+    submesh = mesh_pv.extract_cells(record.cells.to_array())
+    expected = WeldGeometry.from_mesh(submesh)
+    points, triangles = np.asarray(mesh_pv.points), mesh_triangles(mesh_pv)
+    geometry = WeldGeometry.from_cells(points, triangles, record.cells)
+    np.testing.assert_allclose(geometry.bounds, expected.bounds)
+    np.testing.assert_allclose(geometry.eig_vals, expected.eig_vals, rtol=1e-9)
+
+
+def test_empty_and_single_point_geometry():
+    empty = WeldGeometry(np.empty((0, 3)))
+    assert empty.empty
+    assert np.isnan(empty.bounds).all() and np.isnan(empty.centroid).all()
+
+    single = WeldGeometry(np.ones((1, 3)))
+    assert not single.empty
+    assert single.max_dim == 0.0
+    assert np.isnan(single.eig_vals).all()
+
+
+def test_cache_hits_and_invalidates_replaced_cells(mesh_pv):
+    cache = WeldGeometryCache()
+    record = _record(WeldCells.from_range(0, 50))
+    first = cache.get('W', record, mesh_pv)
+    assert cache.get('W', record, mesh_pv) is first
+
+    record.cells = WeldCells.from_range(100, 200)  # save_weld 换成新的 WeldCells 对象
+    second = cache.get('W', record, mesh_pv)
+    assert second is not first
+    assert second.bounds != first.bounds
+    assert len(cache) == 1 and cache.total_bytes == second.nbytes
+
+    cache.invalidate()
+    assert len(cache) == 0 and cache.total_bytes == 0
+
+
+def test_cache_evicts_least_recently_used(mesh_pv):
+    records = {f'W{i}': _record(WeldCells.from_range(i * 10, i * 10 + 10)) for i in range(5)}
+    entry_bytes = WeldGeometryCache().get('W0', records['W0'], mesh_pv).nbytes
+    cache = WeldGeometryCache(max_bytes=3 * entry_bytes)
+    for name in ('W0', 'W1', 'W2'):
+        cache.get(name, records[name], mesh_pv)
+    cache.get('W0', records['W0'], mesh_pv)  # W0 变为最近使用
+    cache.get('W3', records['W3'], mesh_pv)
+    assert list(cache._entries) == ['W2', 'W0', 'W3']  # 淘汰最久未用的 W1
+    assert cache.total_bytes <= cache.max_bytes
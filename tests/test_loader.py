@@ -0,0 +1,56 @@
+import pytest
+
+from vessel import BackgroundTask, LoadCancelled
+
+
+class FakeRoot:
+    """代替 Tk 根窗口：记录 after 回调，由测试手动执行"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def run_pending(self):
+        while self.pending:
+            self.pending.pop(0)()
+
+
+class ValueTask(BackgroundTask):
+    def __init__(self, tk_root, value, **callbacks):
+        super().__init__(tk_root, **callbacks)
+        self.value = value
+
+    def work(self, progress):
+        progress('计算', 0.5)
+        return self.value
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+def _task(events, value=42):
+    return ValueTask(FakeRoot(), value,
+                     on_progress=lambda label, value: events.append(('progress', value)),
+                     on_done=lambda result: events.append(('done', result)),
+                     on_error=lambda error, trace_text: events.append(('error', type(error))))
+
+
+def test_result_is_delivered_on_the_polling_thread(events):
+    task = _task(events)
+    task.start()
+    task._thread.join()
+    task.tk_root.run_pending()
+    assert events == [('progress', 0.5), ('done', 42)]
+
+
+def test_queued_result_is_dropped_after_cancel(events):
+    task = _task(events)
+    task.start()
+    task._thread.join()  # 结果已在队列中
+    task.cancel()
+    task.tk_root.run_pending()
+    assert events == [('error', LoadCancelled)]
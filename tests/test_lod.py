@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from vessel import build_display_lod, cluster_vertices
+
+
+@pytest.fixture(scope='module')
+def lod(hull):
+    return cluster_vertices(*hull, resolution=64)
+
+
+def test_lod_cells_map_to_original_cells(hull, lod):
+    points, triangles = hull
+    assert len(lod) < len(triangles)
+    assert np.all(np.diff(lod.cell_ids) > 0)  # 升序且不重复
+    assert lod.cell_ids[0] >= 0 and lod.cell_ids[-1] < len(triangles)
+
+    # 每个显示单元的顶点是其原始单元对应顶点所在体素的聚类点
+    voxel = np.linalg.norm(points.max(axis=0) - points.min(axis=0)) / lod.resolution
+    offset = np.linalg.norm(lod.points[lod.triangles] - points[triangles[lod.cell_ids]], axis=2)
+    assert offset.max() <= np.sqrt(3) * voxel + 1e-9
+
+
+def test_lod_has_no_degenerate_or_duplicate_cells(lod):
+    tri = lod.triangles
+    assert np.all((tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & (tri[:, 0] != tri[:, 2]))
+    assert len(np.unique(np.sort(tri, axis=1), axis=0)) == len(tri)
+
+
+def test_display_lod_picks_finest_level_within_budget(hull):
+    points, triangles = hull
+    assert build_display_lod(points, triangles, budget=len(triangles)) is None
+    levels = {resolution: len(cluster_vertices(points, triangles, resolution)) for resolution in (64, 32, 8)}
+    budget = levels[32]
+    lod = build_display_lod(points, triangles, budget=budget, resolutions=(64, 32, 8))
+    assert lod.resolution == 32 and len(lod) <= budget
+    # 所有级别都超出预算时退回最粗一级
+    assert build_display_lod(points, triangles, budget=1, resolutions=(64, 32, 8)).resolution == 8
+
+
+def test_pick_on_lod_surface_maps_to_nearby_original_cell(hull, spatial, lod):
+    """拾取点落在简化网格上，到全分辨率网格找最近单元，结果与显示单元的原始单元相邻"""
+    points, triangles = hull
+    voxel = np.linalg.norm(points.max(axis=0) - points.min(axis=0)) / lod.resolution
+    picks = lod.points[lod.triangles].mean(axis=1)
+    cell_ids, distances, _ = spatial.closest_cells(picks)
+    assert distances.max() <= np.sqrt(3) * voxel
+    # 原始单元被拾取到的点恰好位于其表面时映射回自身
+    exact = points[triangles[lod.cell_ids]].astype(np.float64).mean(axis=1)
+    found, found_distances, _ = spatial.closest_cells(exact)
+    np.testing.assert_allclose(found_distances, 0.0, atol=1e-9)
+    np.testing.assert_array_equal(found, lod.cell_ids)
@@ -0,0 +1,37 @@
+import numpy as np
+
+from vessel import WeldCells, WeldGeometry, WeldRecord, compute_weld_metrics, weld_segments
+
+
+def test_weld_metrics_match_weld_geometry(hull, welds):
+    points, triangles = hull
+    welds = dict(welds)
+    welds['空焊缝'] = WeldRecord(WeldCells.from_range(0, 0), 0.5, '正常', 'red', '')
+    welds['越界焊缝'] = WeldRecord(WeldCells.from_range(len(triangles), len(triangles) + 5), 0.5, '正常', 'red', '')
+    metrics = compute_weld_metrics(points, triangles, welds)
+
+    for name, record in welds.items():
+        geometry = WeldGeometry.from_cells(points, triangles, record.cells.clip(len(triangles)))
+        i = metrics.row(name)
+        np.testing.assert_allclose(metrics.bounds[i], geometry.bounds, rtol=1e-9)
+        np.testing.assert_allclose(metrics.max_dim[i], geometry.max_dim, rtol=1e-9)
+        np.testing.assert_allclose(metrics.centroid[i], geometry.centroid, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(metrics.eig_vals[i], geometry.eig_vals, rtol=1e-6, atol=1e-9)
+        if not geometry.empty:
+            # 主方向只确定到符号
+            alignment = np.abs(np.sum(metrics.eig_vecs[i] * geometry.eig_vecs, axis=0))
+            np.testing.assert_allclose(alignment, 1.0, atol=1e-6)
+
+    assert WeldGeometry.from_cells(points, triangles, WeldCells.from_range(0, 0)).empty
+    assert np.isnan(metrics.bounds[metrics.row('空焊缝')]).all()
+
+
+def test_weld_segments_concatenates_clipped_cells():
+    welds = {'a': WeldRecord(WeldCells.from_range(5, 8), 0.5, '正常', 'red', ''),
+             'b': WeldRecord(WeldCells.from_range(0, 0), 0.5, '正常', 'red', ''),
+             'c': WeldRecord(WeldCells.from_ids([1, 9, 12]), 0.5, '正常', 'red', '')}
+    names, cells, labels, counts = weld_segments(welds, 10)
+    assert names == ['a', 'b', 'c']
+    np.testing.assert_array_equal(cells, [5, 6, 7, 1, 9])
+    np.testing.assert_array_equal(labels, [0, 0, 0, 2, 2])
+    np.testing.assert_array_equal(counts, [3, 0, 2])
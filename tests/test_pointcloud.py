@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from vessel import compute_weld_scan, map_scan_points, read_point_cloud, register_icp, transform_points
+from vessel.pointcloud import _rotation
+
+from conftest import surface_points
+
+
+@pytest.fixture(scope='module')
+def scan():
+    return np.random.default_rng(3).uniform(-50, 50, size=(1000, 3)).astype(np.float32)
+
+
+def test_binary_ply_with_extra_property(tmp_path, scan):
+    records = np.zeros(len(scan), dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('intensity', 'u1')])
+    records['x'], records['y'], records['z'] = scan.T
+    path = tmp_path / 'scan.ply'
+    with open(path, 'wb') as f:
+        f.write(b'ply\nformat binary_little_endian 1.0\ncomment test\n'
+                b'element vertex %d\nproperty float x\nproperty float y\nproperty float z\n'
+                b'property uchar intensity\nend_header\n' % len(scan))
+        f.write(records.tobytes())
+    np.testing.assert_array_equal(read_point_cloud(str(path), chunk_points=300), scan)
+
+
+def test_ascii_ply_with_face_element(tmp_path, scan):
+    path = tmp_path / 'scan_ascii.ply'
+    with open(path, 'w') as f:
+        f.write('ply\nformat ascii 1.0\nelement vertex %d\nproperty float x\nproperty float y\nproperty float z\n'
+                'element face 1\nproperty list uchar int vertex_indices\nend_header\n' % len(scan))
+        np.savetxt(f, scan, fmt='%.9g')
+        f.write('3 0 1 2\n')
+    np.testing.assert_array_equal(read_point_cloud(str(path), chunk_points=300), scan)
+
+
+def test_xyz_with_header(tmp_path, scan):
+    path = tmp_path / 'scan.xyz'
+    np.savetxt(path, scan, fmt='%.9g', header='X Y Z')
+    np.testing.assert_array_equal(read_point_cloud(str(path), chunk_points=300), scan)
+
+
+def test_icp_recovers_known_transform(hull, spatial):
+    points, triangles = hull
+    samples = surface_points(points, triangles, 20000, noise=0.002, seed=4)
+    truth = np.eye(4)
+    truth[:3, :3] = _rotation(np.array([0.01, -0.02, 0.015]))
+    truth[:3, 3] = [0.3, -0.2, 0.1]
+    result = register_icp(transform_points(samples, truth), spatial)
+    assert result.converged
+    np.testing.assert_allclose(result.transform @ truth, np.eye(4), atol=1e-3)
+
+
+def test_map_scan_points_matches_closest_cells(spatial, hull):
+    query_points = surface_points(*hull, 500, noise=0.05, seed=5)
+    _, expected_distances, _ = spatial.closest_cells(query_points)
+    cell_ids, distances = map_scan_points(query_points, spatial, chunk_points=64)
+    np.testing.assert_allclose(distances, expected_distances, rtol=0, atol=1e-12)
+    for point, cell_id, distance in zip(query_points, cell_ids, distances):
+        assert spatial._distances(point, [cell_id])[0] == pytest.approx(distance, abs=1e-12)
+
+    limit = float(np.median(distances))
+    limited, _ = map_scan_points(query_points, spatial, max_distance=limit, chunk_points=64)
+    np.testing.assert_array_equal(limited >= 0, distances <= limit)
+
+
+def test_weld_scan_counts_points_per_weld(hull, welds):
+    n_cells = len(hull[1])
+    rng = np.random.default_rng(6)
+    cell_ids = rng.integers(-1, n_cells, 5000)
+    distances = rng.uniform(0, 1, 5000)
+    stats = compute_weld_scan(cell_ids, distances, welds, n_cells)
+    for name, record in welds.items():
+        hit = np.isin(cell_ids, record.cells.to_array())
+        row = stats.row(name)
+        assert stats.points[row] == hit.sum()
+        assert stats.covered_cells[row] == len(np.unique(cell_ids[hit]))
+        if hit.any():
+            assert stats.mean_distance[row] == pytest.approx(distances[hit].mean())
+            assert stats.max_distance[row] == distances[hit].max()
@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vessel import QUALITY_FIELDS, LoadCancelled, compute_facet_quality
+
+
+def test_single_triangle_fields():
+    points = np.array([[0, 0, 0], [1, 0, 0], [0.5, np.sqrt(3) / 2, 0],
+                       [2, 0, 0], [3, 0, 0], [2, 1, 0],
+                       [4, 0, 0], [5, 0, 0], [6, 0, 0]], dtype=np.float64)
+    triangles = np.arange(9).reshape(3, 3)
+    quality = compute_facet_quality(points, triangles)
+
+    np.testing.assert_allclose(quality.area[:2], [np.sqrt(3) / 4, 0.5])
+    assert quality.aspect_ratio[0] == pytest.approx(1.0)
+    np.testing.assert_allclose(quality.min_angle[:2], [60.0, 45.0])
+    np.testing.assert_allclose(quality.normals[:2], [[0, 0, 1], [0, 0, 1]])
+    # 退化面片：面积为 0，法向、长宽比与曲率为 NaN，按范围筛选时不会被选中
+    assert quality.area[2] == 0
+    assert np.isnan(quality.normals[2]).all() and np.isnan(quality.mean_curvature[2])
+    np.testing.assert_array_equal(quality.mask(aspect_ratio=(None, 5.0)), [True, True, False])
+
+
+def test_flat_plate_has_zero_curvature():
+    x, y = np.meshgrid(np.arange(6.0), np.arange(6.0))
+    points = np.column_stack([x.ravel(), y.ravel(), np.zeros(36)])
+    quads = (np.arange(5)[:, None] * 6 + np.arange(5)).ravel()
+    triangles = np.concatenate([np.column_stack([quads, quads + 1, quads + 7]),
+                                np.column_stack([quads, quads + 7, quads + 6])])
+    quality = compute_facet_quality(points, triangles)
+    np.testing.assert_allclose(quality.mean_curvature, 0, atol=1e-12)
+    np.testing.assert_allclose(quality.gaussian_curvature, 0, atol=1e-12)
+
+
+def test_chunked_matches_single_pass_and_reports_progress(hull):
+    single = compute_facet_quality(*hull)
+    reports = []
+    chunked = compute_facet_quality(*hull, chunk_cells=500, max_workers=2,
+                                    progress=lambda label, value: reports.append((label, value)))
+    for name in QUALITY_FIELDS + ('normals',):
+        np.testing.assert_array_equal(getattr(chunked, name), getattr(single, name))
+
+    values = [value for _, value in reports]
+    assert values == sorted(values) and values[-1] == 1.0
+    labels = ' '.join(label for label, _ in reports)
+    for text in ('面积', '长宽比', '最小内角', '高斯曲率', '平均曲率'):
+        assert text in labels
+    assert sum('(' in label for label, _ in reports) == -(-len(hull[1]) // 500)
+
+
+def test_cancelled_quality(hull):
+    cancel_event = threading.Event()
+    reports = []
+
+    def progress(label, value):
+        reports.append(label)
+        if '高斯曲率' in label:
+            cancel_event.set()
+
+    with pytest.raises(LoadCancelled):
+        compute_facet_quality(*hull, progress=progress, cancel_event=cancel_event)
+    assert not any('平均曲率' in label for label in reports)
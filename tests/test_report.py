@@ -0,0 +1,31 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vessel import LoadCancelled, compute_weld_metrics
+from vessel.report import REPORT_FRAME_MARGIN, render_weld_report, weld_cameras
+
+
+def test_weld_cameras_frame_each_weld(hull, welds):
+    points, triangles = hull
+    metrics = compute_weld_metrics(points, triangles, welds)
+    focal, position, up, scale = weld_cameras(points, triangles, welds, metrics, aspect=4 / 3)
+
+    np.testing.assert_allclose(focal, 0.5 * (metrics.bounds[:, 0::2] + metrics.bounds[:, 1::2]))
+    view = position - focal
+    view /= np.linalg.norm(view, axis=1)[:, None]
+    np.testing.assert_allclose(np.linalg.norm(up, axis=1), 1.0)
+    np.testing.assert_allclose(np.einsum('ij,ij->i', view, up), 0.0, atol=1e-9)
+    size = metrics.bounds[:, 1::2] - metrics.bounds[:, 0::2]
+    assert np.all(scale > 0)
+    assert np.all(scale <= 0.5 * REPORT_FRAME_MARGIN * np.linalg.norm(size, axis=1) + 1e-9)
+
+
+def test_cancelled_report_does_not_wait_for_workers(tmp_path, hull, welds, spatial):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(LoadCancelled):
+        render_weld_report(*hull, welds, str(tmp_path), max_workers=1, cancel_event=cancel_event,
+                           spatial=spatial)
+    assert not (tmp_path / 'weld_report.csv').exists()
@@ -0,0 +1,53 @@
+import numpy as np
+
+from vessel import CORNER_WELD_PREFIX, build_corner_weld_data, detect_corner_seams
+
+
+def _folded_plate(n=20, fold=90.0):
+    """n×n 网格的平板，沿 u = 0 折出 fold 度的角"""
+    u, v = np.meshgrid(np.linspace(-1, 1, n + 1), np.linspace(0, 1, n + 1), indexing='ij')
+    angle = np.radians(fold)
+    bent = u < 0
+    x = np.where(bent, u * np.cos(angle), u)
+    z = np.where(bent, -u * np.sin(angle), 0.0)
+    points = np.column_stack([x.ravel(), v.ravel(), z.ravel()])
+    ids = np.arange((n + 1) ** 2).reshape(n + 1, n + 1)
+    a, b, c, d = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel(), ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+    triangles = np.concatenate([np.column_stack([a, b, c]), np.column_stack([a, c, d])])
+    return points, triangles
+
+
+def test_flat_plate_has_no_seams():
+    points, triangles = _folded_plate(fold=0.0)
+    assert detect_corner_seams(points, triangles) == []
+
+
+def test_fold_is_one_seam_along_the_edge():
+    points, triangles = _folded_plate(n=20, fold=90.0)
+    seams = detect_corner_seams(points, triangles)
+    assert len(seams) == 1
+    cells, mean_angle = seams[0]
+    assert abs(mean_angle - 90.0) < 1e-6
+    # 包含所有以折线为边的面片，扩展一圈后仍紧贴折线（网格间距 0.1）
+    corners = points[triangles]
+    on_fold = np.flatnonzero((np.abs(corners[:, :, 0]) + np.abs(corners[:, :, 2]) < 1e-9).sum(axis=1) == 2)
+    assert len(on_fold) == 2 * 20
+    assert np.isin(on_fold, cells).all()
+    centroids = corners[cells].mean(axis=1)
+    assert np.all(np.abs(centroids[:, 0]) + np.abs(centroids[:, 2]) < 0.25)
+
+
+def test_shallow_fold_and_small_regions_are_ignored():
+    points, triangles = _folded_plate(fold=20.0)
+    assert detect_corner_seams(points, triangles, angle_threshold=30.0) == []
+    points, triangles = _folded_plate(fold=90.0)
+    assert detect_corner_seams(points, triangles, min_cells=10 ** 6) == []
+
+
+def test_corner_weld_records():
+    points, triangles = _folded_plate(fold=90.0)
+    welds = build_corner_weld_data(points, triangles)
+    assert list(welds) == [f'{CORNER_WELD_PREFIX}1']
+    cells = welds[f'{CORNER_WELD_PREFIX}1'].cells.to_array()
+    grown = detect_corner_seams(points, triangles)[0][0]
+    np.testing.assert_array_equal(cells, np.sort(grown))
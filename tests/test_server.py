@@ -0,0 +1,70 @@
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pytest
+
+from vessel import AnalysisServer, AnalysisSession
+
+
+@pytest.fixture
+def request_json(hull_stl):
+    session = AnalysisSession()
+    session.load(hull_stl, 'hull')
+    server = AnalysisServer(session, host='127.0.0.1', port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    def request(path, data=None, method=None):
+        body = None if data is None else json.dumps(data).encode()
+        req = urllib.request.Request(base + path, data=body, method=method)
+        try:
+            with urllib.request.urlopen(req) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_routes_return_data(request_json):
+    status, models = request_json('/models')
+    assert status == 200 and [model['id'] for model in models] == ['hull']
+    status, welds = request_json('/models/hull/welds')
+    assert status == 200 and welds
+    name = urllib.parse.quote(welds[0]['weld'])
+    assert request_json(f'/models/hull/welds/{name}')[0] == 200
+    assert request_json('/models/hull/cells/5')[0] == 200
+
+    status, closest = request_json('/models/hull/closest?point=50,8,0&k=2')
+    assert status == 200
+    assert len(closest['nearest_welds']) <= 2
+    if closest['nearest_welds']:
+        assert closest['nearest_welds'][0]['distance'] == pytest.approx(closest['distance'])
+
+
+@pytest.mark.parametrize('path, data, method, expected', [
+    ('/models/nope/welds', None, None, 404),
+    ('/models/hull/welds/no-such-weld', None, None, 404),
+    ('/models/hull/bogus', None, None, 404),
+    ('/nothing', None, None, 404),
+    ('/models/nope', None, 'DELETE', 404),
+    ('/models/hull/closest?point=50,8,0&k=0', None, None, 400),
+    ('/models/hull/closest?point=50,8,0&k=x', None, None, 400),
+    ('/models/hull/region?box=1,2', None, None, 400),
+    ('/models', {}, 'POST', 400),
+])
+def test_error_status_codes(request_json, path, data, method, expected):
+    status, body = request_json(path, data, method)
+    assert status == expected
+    assert 'error' in body
+
+
+def test_unload_model(request_json):
+    assert request_json('/models/hull', method='DELETE')[0] == 200
+    assert request_json('/models') == (200, [])
+    assert request_json('/models/hull/welds')[0] == 404
@@ -0,0 +1,90 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vessel import LoadCancelled, WeldCellIndex
+
+from conftest import surface_points
+
+
+def _brute_force(spatial, points):
+    """每个点到全部三角形的精确距离的最小值与对应单元"""
+    all_cells = np.arange(len(spatial))
+    distances = np.array([spatial._distances(point, all_cells) for point in points])
+    return distances.argmin(axis=1), distances.min(axis=1)
+
+
+@pytest.fixture(scope='module')
+def expected_distances(spatial, query_points):
+    return _brute_force(spatial, query_points)[1]
+
+
+@pytest.fixture(scope='module')
+def query_points(hull):
+    points, triangles = hull
+    near = surface_points(points, triangles, 300, noise=0.02, seed=1)
+    far = near[:100] + np.random.default_rng(2).normal(scale=3.0, size=(100, 3))
+    return np.vstack([near, far])
+
+
+def test_closest_cell_matches_brute_force(spatial, query_points, expected_distances):
+    for point, distance in zip(query_points, expected_distances):
+        cell_id, found = spatial.closest_cell(point, return_distance=True)
+        assert found == pytest.approx(distance, abs=1e-12)
+        assert spatial._distances(point, [cell_id])[0] == found
+
+
+@pytest.mark.parametrize('k', [1, 4, 24])
+def test_closest_cells_matches_brute_force(spatial, query_points, expected_distances, k):
+    cell_ids, distances, nearest = spatial.closest_cells(query_points, k=k)
+    np.testing.assert_allclose(distances, expected_distances, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(np.linalg.norm(nearest - query_points, axis=1), distances, atol=1e-12)
+    for point, cell_id, distance in zip(query_points, cell_ids, distances):
+        assert spatial._distances(point, [cell_id])[0] == pytest.approx(distance, abs=1e-12)
+
+
+def test_closest_cells_chunked_matches_single_batch(spatial, query_points, expected_distances):
+    reports = []
+    cell_ids, distances, nearest = spatial.closest_cells_chunked(
+        query_points, chunk=64, max_workers=2, progress=lambda label, value: reports.append(value))
+    np.testing.assert_allclose(distances, expected_distances, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(np.linalg.norm(nearest - query_points, axis=1), distances, atol=1e-12)
+    for point, cell_id, distance in zip(query_points, cell_ids, distances):
+        assert spatial._distances(point, [cell_id])[0] == pytest.approx(distance, abs=1e-12)
+    assert len(reports) == 7 and reports[-1] == 1.0
+
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(LoadCancelled):
+        spatial.closest_cells_chunked(query_points, chunk=64, cancel_event=cancel_event)
+
+
+def test_region_queries_match_brute_force(spatial, welds):
+    index = WeldCellIndex.from_weld_data(len(spatial), welds)
+    centers = spatial.centers
+    center, radius = centers[100], 6.0
+    inside = np.flatnonzero(np.linalg.norm(centers - center, axis=1) <= radius)
+    np.testing.assert_array_equal(spatial.cells_in_sphere(center, radius), inside)
+
+    bounds = (20.0, 45.0, -3.0, 5.0, -20.0, 20.0)
+    lower, upper = np.array(bounds[0::2]), np.array(bounds[1::2])
+    inside = np.flatnonzero(np.all((centers >= lower) & (centers <= upper), axis=1))
+    np.testing.assert_array_equal(spatial.cells_in_box(bounds), inside)
+
+    expected = {name for name, record in welds.items() if np.isin(record.cells.to_array(), inside).any()}
+    assert set(spatial.welds_in_box(index, bounds)) == expected
+
+
+def test_closest_welds_matches_brute_force(spatial, welds, query_points):
+    index = WeldCellIndex.from_weld_data(len(spatial), welds)
+    all_cells = np.arange(len(spatial))
+    for point in query_points[::20]:
+        distances = spatial._distances(point, all_cells)
+        weld_distances = {name: float(distances[record.cells.to_array()].min()) for name, record in welds.items()}
+        found = spatial.closest_welds(index, point, k=3)
+        # 顶点或边上的等距单元可能属于不同焊缝，只比较距离
+        assert len({name for name, _ in found}) == 3
+        np.testing.assert_allclose([d for _, d in found], sorted(weld_distances.values())[:3], atol=1e-12)
+        np.testing.assert_allclose([d for _, d in found], [weld_distances[name] for name, _ in found], atol=1e-12)
+    assert spatial.closest_welds(index, query_points[0], k=0) == []
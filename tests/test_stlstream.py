@@ -0,0 +1,44 @@
+import numpy as np
+
+from vessel import StlStream, load_stl_model
+
+
+def _load(path, streaming):
+    return load_stl_model(path, build_polydata=False, streaming=streaming, build_adjacency=False)
+
+
+def test_streaming_load_matches_in_memory(hull_stl):
+    streamed = _load(hull_stl, True)
+    loaded = _load(hull_stl, False)
+    np.testing.assert_array_equal(streamed.points, loaded.points)
+    np.testing.assert_array_equal(streamed.triangles, loaded.triangles)
+    np.testing.assert_array_equal(streamed.facet_ids, loaded.facet_ids)
+    for a, b in zip(streamed.mass_properties, loaded.mass_properties):
+        np.testing.assert_allclose(a, b, rtol=1e-9, atol=1e-6)
+    assert list(streamed.weld_data) == list(loaded.weld_data)
+
+
+def test_ascii_stream_matches_binary(tmp_path, hull_stl, hull_vectors):
+    path = tmp_path / 'hull_ascii.stl'
+    with open(path, 'w') as f:
+        f.write('solid hull\n')
+        for facet in hull_vectors[:500]:
+            f.write('facet normal 0 0 0\nouter loop\n')
+            for vertex in facet:
+                f.write('vertex {:.9g} {:.9g} {:.9g}\n'.format(*vertex))
+            f.write('endloop\nendfacet\n')
+        f.write('endsolid hull\n')
+
+    ascii_stream = StlStream(str(path), chunk_facets=64)
+    assert not ascii_stream.binary
+    points, triangles, facet_ids = ascii_stream.build_indexed_mesh()
+    expected = hull_vectors[:500][facet_ids]
+    np.testing.assert_array_equal(points[triangles], expected)
+
+
+def test_chunked_binary_stream_matches_single_chunk(hull_stl):
+    single = StlStream(hull_stl).build_indexed_mesh()
+    chunked = StlStream(hull_stl, chunk_facets=333).build_indexed_mesh()
+    for a, b in zip(single, chunked):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_allclose(StlStream(hull_stl, chunk_facets=333).scan()[0], StlStream(hull_stl).scan()[0])
@@ -0,0 +1,56 @@
+import numpy as np
+
+from vessel import WeldCells, WeldRecord, WeldStore, load_stl_model, weld_store_key
+
+
+def _assert_same_welds(found, expected):
+    assert list(found) == list(expected)
+    for name, record in expected.items():
+        other = found[name]
+        np.testing.assert_array_equal(other.cells.to_array(), record.cells.to_array())
+        assert (other.strength, other.status, other.color, other.info) == \
+               (record.strength, record.status, record.color, record.info)
+
+
+def test_weld_store_round_trip(tmp_path, welds):
+    store = WeldStore(str(tmp_path / 'welds.sqlite'))
+    key = weld_store_key('abc', 1e-6)
+    assert store.load(key) is None
+
+    store.save(key, 4000, welds)
+    _assert_same_welds(store.load(key), welds)
+
+    names = list(welds)
+    added = WeldRecord(WeldCells.from_ids([3, 7, 9]), None, '需检查', 'blue', '新增',
+                       bounds=[0, 1, 0, 1, 0, 1], max_dim=1.5)
+    changed = WeldRecord(welds[names[1]].cells, 0.25, '正常', 'green', '已修改')
+    store.write(key, updated={'新焊缝': added, names[1]: changed}, deleted=[names[0]])
+
+    expected = {name: welds[name] for name in names[1:]}
+    expected[names[1]] = changed
+    expected['新焊缝'] = added
+    loaded = store.load(key)
+    _assert_same_welds(loaded, expected)
+    assert loaded['新焊缝'].bounds == [0, 1, 0, 1, 0, 1]
+    assert loaded['新焊缝'].max_dim == 1.5
+
+    store.forget(key)
+    assert store.load(key) is None
+    store.close()
+
+
+def test_loader_reads_saved_edits(tmp_path, hull_stl):
+    store = WeldStore(str(tmp_path / 'welds.sqlite'))
+    model = load_stl_model(hull_stl, build_polydata=False, store=store)
+    assert model.store_key is not None
+
+    name = next(iter(model.weld_data))
+    store.delete(model.store_key, name)
+    store.upsert(model.store_key, '手工焊缝', WeldRecord(WeldCells.from_range(0, 5), 0.9, '需修复', 'red', ''))
+
+    reloaded = load_stl_model(hull_stl, build_polydata=False, store=store)
+    assert reloaded.store_key == model.store_key
+    assert name not in reloaded.weld_data
+    assert reloaded.weld_data['手工焊缝'].status == '需修复'
+    assert list(reloaded.weld_data)[-1] == '手工焊缝'
+    store.close()
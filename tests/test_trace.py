@@ -0,0 +1,86 @@
+import json
+import threading
+
+import pytest
+
+from vessel import Tracer, load_stl_model, traced, tracer
+
+
+def test_disabled_tracer_records_nothing():
+    t = Tracer()
+    with t.span('idle'):
+        pass
+    t.count('hits')
+    assert t.events == [] and t.summary() == {} and t.counters == {}
+
+
+def test_spans_counters_and_chrome_trace(tmp_path):
+    t = Tracer(enabled=True)
+    for i in range(3):
+        with t.span('step', 'test', index=i, label='a'):
+            pass
+    with t.span('other'):
+        pass
+    t.count('hits')
+    t.count('hits', 2)
+
+    assert t.summary()['step'][0] == 3
+    assert [name for name, _ in t.recent()] == ['other', 'step']
+    assert t.counters == {'hits': 3}
+
+    path = tmp_path / 'trace.json'
+    t.write(path)
+    events = json.loads(path.read_text(encoding='utf-8'))['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    assert len(spans) == 4 and all(event['dur'] >= 0 for event in spans)
+    assert spans[0]['args'] == {'index': 0, 'label': 'a'}
+    assert events[-1]['ph'] == 'C' and events[-1]['args'] == {'hits': 3}
+
+    t.clear()
+    assert t.events == [] and t.summary() == {}
+
+
+def test_span_recorded_when_body_raises():
+    t = Tracer(enabled=True)
+    with pytest.raises(ValueError):
+        with t.span('failing'):
+            raise ValueError
+    assert t.summary()['failing'][0] == 1
+
+
+def test_spans_from_threads():
+    t = Tracer(enabled=True)
+
+    def work():
+        for _ in range(100):
+            with t.span('worker'):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert t.summary()['worker'][0] == 400
+
+
+@pytest.fixture
+def global_tracer():
+    enabled = tracer.enabled
+    tracer.enable()
+    tracer.clear()
+    yield tracer
+    tracer.enable(enabled)
+    tracer.clear()
+
+
+def test_traced_decorator_and_load_stages(global_tracer, hull_stl):
+    @traced('decorated')
+    def add(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    load_stl_model(hull_stl, build_polydata=False)
+    summary = global_tracer.summary()
+    assert summary['decorated'][0] == 1
+    assert {'parse', 'mass', 'convert', 'welds'} <= set(summary)
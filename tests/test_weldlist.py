@@ -0,0 +1,60 @@
+import pytest
+
+from vessel import WELD_STATUSES, WeldCells, WeldListFilter, WeldListModel, WeldRecord
+
+
+def _record(status='正常', strength=0.5, info=''):
+    return WeldRecord(WeldCells.from_range(0, 3), strength, status, 'red', info)
+
+
+@pytest.fixture
+def model():
+    welds = {f'焊缝{i}': _record(WELD_STATUSES[i % 3], strength=i / 10, info=f'第{i}条')
+             for i in range(10)}
+    welds['无强度'] = _record(strength=None)
+    model = WeldListModel()
+    model.reset(welds)
+    return model
+
+
+def _names(model):
+    return [model.name_at(row) for row in range(len(model))]
+
+
+@pytest.mark.parametrize('status', WELD_STATUSES)
+def test_every_status_can_be_filtered(model, status):
+    model.set_filter(status=status)
+    assert len(model) > 0
+    assert all(model._records[model._ids[name]].status == status for name in _names(model))
+
+
+def test_strength_filter_excludes_unknown_strength(model):
+    model.set_filter(min_strength=0.5)
+    assert _names(model) == [f'焊缝{i}' for i in range(5, 10)]
+    model.set_filter(max_strength=0.2)
+    assert _names(model) == ['焊缝0', '焊缝1', '焊缝2']
+    model.set_filter()
+    assert '无强度' in _names(model)
+    assert not WeldListFilter(min_strength=0.0).matches('无强度', _record(strength=None))
+
+
+def test_text_filter_matches_name_and_info(model):
+    model.set_filter(text='第3')
+    assert _names(model) == ['焊缝3']
+    model.set_filter(text='  焊缝1 ')
+    assert _names(model) == ['焊缝1']
+
+
+def test_incremental_updates_keep_row_order(model):
+    model.set_filter(status='正常')
+    before = _names(model)
+    assert model.upsert('焊缝1', _record('正常')) is not None  # 由“需检查”改为“正常”，插回原位置
+    assert _names(model) == sorted(before + ['焊缝1'], key=lambda name: model._ids[name])
+    assert model.upsert('焊缝0', _record('需修复')) is None
+    assert model.row_of('焊缝0') is None
+
+    model.upsert('新焊缝', _record('正常'))
+    assert _names(model)[-1] == '新焊缝'
+    model.remove('焊缝3')
+    assert '焊缝3' not in model and model.row_of('焊缝3') is None
+    assert model.text_at(0).startswith('✓')
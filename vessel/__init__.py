@@ -0,0 +1,43 @@
+"""船舰焊缝检测核心：网格转换、焊缝数据与几何分析
+
+只依赖 NumPy；numpy-stl、PyVista 与 SciPy 在真正需要时才导入，GUI 工具包从不导入，
+因此可直接用于批处理脚本（见 ``python -m vessel``）。
+"""
+from .adjacency import (SEGMENT_MIN_CELLS, FacetAdjacency, connected_components, facet_edge_pairs,
+                        segment_weld_data)
+from .assembly import (BLOCK_SEPARATOR, AssemblyBlock, AssemblyLoader, assembly_store_key, block_transform,
+                       blocks_from_files, combine_mass_properties, load_assembly, read_assembly_manifest)
+from .bench import BENCH_REGRESSION_THRESHOLD, BENCH_SIZES, bench_size, compare_reports, run_benchmarks
+from .cache import MESH_CACHE_DIR, CachedMesh, MeshCache, file_digest
+from .deviation import (DEVIATION_ARRAY, DEVIATION_CHUNK_CELLS, DEVIATION_FIELDS, DeviationTask, WeldDeviation,
+                        compute_weld_deviation, deviation_rows, signed_deviation, write_deviation)
+from .geometry import WELD_GEOMETRY_CACHE_BYTES, WeldGeometry, WeldGeometryCache
+from .loader import (LOAD_STAGES, BackgroundLoader, BackgroundTask, LoadCancelled, LoadedModel,
+                     load_stl_model)
+from .lod import LOD_CELL_BUDGET, LOD_RESOLUTIONS, LodMesh, build_display_lod, cluster_vertices
+from .mesh import (MESH_INDEX_DTYPE, VERTEX_MERGE_TOLERANCE, as_mesh_buffers, build_indexed_mesh, face_normals,
+                   facets_to_cells, mesh_triangles, to_polydata, triangles_to_faces)
+from .metrics import METRIC_FIELDS, WeldMetrics, compute_weld_metrics, metric_rows, write_metrics
+from .pointcloud import (ICP_MAX_ITERATIONS, ICP_SAMPLE_POINTS, POINTCLOUD_CHUNK_POINTS, POINTCLOUD_SUFFIXES,
+                         SCAN_FIELDS, IcpResult, PointCloudStream, ScanRegistrationTask, WeldScan,
+                         compute_weld_scan, map_scan_points, read_point_cloud, register_icp, scan_rows,
+                         transform_points, write_scan)
+from .quality import (QUALITY_ASPECT_LIMIT, QUALITY_CHUNK_CELLS, QUALITY_FIELDS, QUALITY_NORMAL_ARRAY,
+                      FacetQuality, QualityTask, compute_facet_quality)
+from .report import (REPORT_FIELDS, REPORT_IMAGE_SIZE, ReportTask, render_weld_report,
+                     weld_cameras)
+from .seams import (CORNER_ANGLE_THRESHOLD, CORNER_GROW_RINGS, CORNER_MIN_CELLS, CORNER_WELD_PREFIX,
+                    build_corner_weld_data, detect_corner_seams)
+from .server import (SERVER_HOST, SERVER_PORT, SERVER_WORKERS, AnalysisServer, AnalysisSession, NotFound,
+                     ServedModel, route)
+from .spatial import (SPATIAL_BATCH_K, SPATIAL_CHUNK_POINTS, SPATIAL_LEAF_SIZE, CellSpatialIndex,
+                      closest_points_on_triangles)
+from .stlstream import (STL_CHUNK_FACETS, STL_RECORD, STL_STREAM_THRESHOLD_BYTES, StlStream, mass_integrals,
+                        mass_properties_from_integrals, mesh_mass_properties, read_stl_streaming,
+                        stl_facet_count)
+from .store import WELD_STORE_PATH, WeldStore, weld_store_key
+from .synthetic import hull_grid_shape, synthetic_hull, write_binary_stl
+from .trace import Tracer, count, span, traced, tracer
+from .weldlist import WeldListFilter, WeldListModel, weld_row_text
+from .welds import (WELD_STATUSES, WeldCellIndex, WeldCells, WeldRecord, WeldTable, build_weld_data, pack_weld_cells,
+                    pack_weld_table, unpack_weld_cells, unpack_weld_table, weld_segments)
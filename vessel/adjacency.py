@@ -0,0 +1,225 @@
+"""面片相邻关系：共享边构成的 CSR 图，以及在其上的连通分割与区域生长"""
+import numpy as np
+
+from .trace import traced
+from .welds import WeldCells, WeldRecord
+
+SEGMENT_MIN_CELLS = 4  # 焊缝分段时单元数少于该值的片段视为噪声
+
+
+def facet_edge_pairs(triangles):
+    """返回通过共享边相邻的面片对 (face_a, face_b)
+
+    对所有边排序后比较相邻键值；非流形边上的多个面片依次两两相连。
+    """
+    n_faces = len(triangles)
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    edges.sort(axis=1)
+    n_points = int(triangles.max()) + 1 if n_faces else 0
+    keys = edges[:, 0].astype(np.int64) * n_points + edges[:, 1]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    faces = np.tile(np.arange(n_faces), 3)[order]
+    shared = keys[1:] == keys[:-1]
+    return faces[:-1][shared], faces[1:][shared]
+
+
+def connected_components(n_nodes, a, b):
+    """向量化并查集，返回每个节点所在连通分量的标签（分量内最小节点号）
+
+    每轮把跨分量边两端的根挂到较小的根上，再做指针跳跃压缩路径，
+    通常只需 O(log n) 轮 NumPy 运算。
+    """
+    parent = np.arange(n_nodes)
+    a = np.asarray(a)
+    b = np.asarray(b)
+    while True:
+        pa = parent[a]
+        pb = parent[b]
+        crossing = pa != pb
+        if not crossing.any():
+            return parent
+        a, b = a[crossing], b[crossing]
+        pa, pb = pa[crossing], pb[crossing]
+        np.minimum.at(parent, np.maximum(pa, pb), np.minimum(pa, pb))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+class FacetAdjacency:
+    """面片相邻图
+
+    indptr / indices 为对称的 CSR 邻接表（单元 c 的邻居是 indices[indptr[c]:indptr[c + 1]]），
+    face_a / face_b 保留原始相邻面片对，供按边计算的算法（如二面角）直接使用。
+    """
+
+    __slots__ = ('n_cells', 'indptr', 'indices', 'face_a', 'face_b')
+
+    def __init__(self, n_cells, face_a, face_b):
+        self.n_cells = n_cells
+        self.face_a = face_a
+        self.face_b = face_b
+        source = np.concatenate([face_a, face_b])
+        target = np.concatenate([face_b, face_a])
+        order = np.argsort(source, kind='stable')
+        self.indices = target[order].astype(np.int32)
+        self.indptr = np.zeros(n_cells + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=n_cells), out=self.indptr[1:])
+
+    @classmethod
+    @traced('adjacency_build', 'load')
+    def from_triangles(cls, triangles):
+        triangles = np.asarray(triangles)
+        face_a, face_b = facet_edge_pairs(triangles)
+        return cls(len(triangles), face_a, face_b)
+
+    @classmethod
+    def from_arrays(cls, n_cells, face_a, face_b, indptr, indices):
+        """由已构建的数组（如网格缓存中内存映射的数组）直接组装，不重新排序"""
+        adjacency = cls.__new__(cls)
+        adjacency.n_cells = n_cells
+        adjacency.face_a = face_a
+        adjacency.face_b = face_b
+        adjacency.indptr = indptr
+        adjacency.indices = indices
+        return adjacency
+
+    def __len__(self):
+        return self.n_cells
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.face_a.nbytes + self.face_b.nbytes
+
+    def degrees(self):
+        """每个单元的相邻单元数"""
+        return np.diff(self.indptr)
+
+    def neighbors(self, cell_id):
+        return self.indices[self.indptr[cell_id]:self.indptr[cell_id + 1]]
+
+    def gather(self, cell_ids):
+        """批量展开邻居，返回 (来源在 cell_ids 中的位置, 邻居单元)"""
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        starts = self.indptr[cell_ids]
+        counts = self.indptr[cell_ids + 1] - starts
+        source = np.repeat(np.arange(len(cell_ids)), counts)
+        first = np.cumsum(counts) - counts
+        positions = np.repeat(starts - first, counts) + np.arange(int(counts.sum()))
+        return source, self.indices[positions]
+
+    def components(self, mask=None):
+        """连通分量标签；给定 mask 时只沿两端都在 mask 内的边连通"""
+        a, b = self.face_a, self.face_b
+        if mask is not None:
+            linked = mask[a] & mask[b]
+            a, b = a[linked], b[linked]
+        return connected_components(self.n_cells, a, b)
+
+    def split(self, cell_ids, min_cells=1):
+        """把单元集合拆分为连续片段，按单元数降序返回有序单元数组列表"""
+        return _split_memberships(self, [np.asarray(cell_ids)], min_cells)[0]
+
+    def grow(self, mask, rings=1):
+        """把布尔掩码沿相邻关系向外扩展 rings 圈"""
+        for _ in range(rings):
+            grown = mask.copy()
+            grown[self.face_a[mask[self.face_b]]] = True
+            grown[self.face_b[mask[self.face_a]]] = True
+            mask = grown
+        return mask
+
+    def grow_regions(self, seeds):
+        """从种子单元同时做广度优先生长，返回每个单元的种子序号（不可达为 -1）
+
+        每个单元从先到达的相邻区域继承标签，因此每个区域都是连续的。
+        """
+        labels = np.full(self.n_cells, -1, dtype=np.int32)
+        frontier = np.asarray(seeds, dtype=np.int64)
+        labels[frontier] = np.arange(len(frontier), dtype=np.int32)
+        while len(frontier):
+            source, reached = self.gather(frontier)
+            free = labels[reached] < 0
+            reached, first = np.unique(reached[free], return_index=True)
+            labels[reached] = labels[frontier[source[free][first]]]
+            frontier = reached
+        return labels
+
+
+def _split_memberships(adjacency, cell_arrays, min_cells=1):
+    """同时拆分多个单元集合：节点是 (集合序号, 单元)，只连接同一集合内相邻的单元
+
+    返回与 cell_arrays 对应的片段列表，每项按单元数降序。
+    """
+    n_cells = adjacency.n_cells
+    cell_arrays = [np.unique(np.asarray(cells, dtype=np.int64)) for cells in cell_arrays]
+    cell_arrays = [cells[(cells >= 0) & (cells < n_cells)] for cells in cell_arrays]
+    lengths = np.array([len(cells) for cells in cell_arrays], dtype=np.int64)
+    if not lengths.sum():
+        return [[] for _ in cell_arrays]
+
+    owners = np.repeat(np.arange(len(cell_arrays)), lengths)
+    cells = np.concatenate(cell_arrays)
+    keys = owners * n_cells + cells  # 每个集合内单元有序，键整体有序
+
+    source, reached = adjacency.gather(cells)
+    wanted = owners[source] * n_cells + reached
+    position = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    hit = keys[position] == wanted
+    labels = connected_components(len(keys), source[hit], position[hit])
+
+    order = np.argsort(labels, kind='stable')
+    roots, starts, counts = np.unique(labels[order], return_index=True, return_counts=True)
+    parts = [[] for _ in cell_arrays]
+    for k in np.argsort(-counts, kind='stable'):
+        if counts[k] < min_cells:
+            break
+        # 同一分量内节点按 (集合, 单元) 键有序，取出的单元已经升序
+        parts[owners[roots[k]]].append(cells[order[starts[k]:starts[k] + counts[k]]])
+    return parts
+
+
+@traced('seam_segmentation', 'welds')
+def segment_weld_data(adjacency, welds, min_cells=SEGMENT_MIN_CELLS, merge=False):
+    """把焊缝拆分为连续的焊缝段，返回新的焊缝字典
+
+    只有一段的焊缝保持原名与原记录；多段时按单元数降序命名为 "原名-1"、"原名-2" ...
+    单元数少于 min_cells 的片段视为噪声丢弃。merge=True 时再把相互接触（共享边或
+    共享单元）的焊缝段合并为一条，沿用其中最大一段的名称与属性。
+    """
+    names = list(welds)
+    parts = _split_memberships(adjacency, [welds[name].cells.to_array() for name in names], min_cells)
+
+    segments = []  # (名称, 原记录, 单元数组)
+    for name, pieces in zip(names, parts):
+        if len(pieces) == 1:
+            segments.append((name, welds[name], pieces[0]))
+        else:
+            segments.extend((f'{name}-{k}', welds[name], cells) for k, cells in enumerate(pieces, start=1))
+
+    if merge and segments:
+        mask = np.zeros(adjacency.n_cells, dtype=bool)
+        for _, _, cells in segments:
+            mask[cells] = True
+        labels = adjacency.components(mask)
+        groups = {}
+        for segment in segments:
+            groups.setdefault(int(labels[segment[2][0]]), []).append(segment)
+        segments = []
+        for group in groups.values():
+            name, record, cells = max(group, key=lambda segment: len(segment[2]))
+            if len(group) > 1:
+                cells = np.unique(np.concatenate([segment[2] for segment in group]))  # 合并后仍有序去重
+            segments.append((name, record, cells))
+
+    result = {}
+    for name, record, cells in segments:
+        if name in welds and record is welds[name] and len(cells) == len(record.cells):
+            result[name] = record
+            continue
+        result[name] = WeldRecord(WeldCells.from_ids(cells, presorted=True), record.strength, record.status,
+                                  record.color, record.info)
+    return result
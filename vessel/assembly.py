@@ -0,0 +1,268 @@
+"""全船分段总装：多进程并行加载分段 STL 并合并为一个场景
+
+每个分段在独立进程中完成解析、索引网格、坐标变换与焊缝指标计算，
+主进程只负责按顺序拼接数组：顶点/单元 ID 加上全局偏移，焊缝名加上
+"分段名/" 前缀，因此合并后的单元 ID 与焊缝名全局唯一。
+合并后的焊缝表以 assembly_store_key 为键保存在焊缝数据库中，编辑结果下次总装时读回。
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .adjacency import FacetAdjacency
+from .cache import MeshCache
+from .loader import BackgroundTask, LoadCancelled, LoadedModel, load_stl_model
+from .lod import build_display_lod
+from .mesh import VERTEX_MERGE_TOLERANCE, as_mesh_buffers, to_polydata
+from .metrics import compute_weld_metrics
+from .spatial import CellSpatialIndex
+from .store import WeldStore, weld_store_key
+from .trace import span
+from .welds import WeldCellIndex, WeldRecord
+
+BLOCK_SEPARATOR = '/'  # 合并后焊缝名：分段名 + BLOCK_SEPARATOR + 原焊缝名
+
+
+class AssemblyBlock:
+    """总装中的一个分段：来源文件、变换矩阵及其在合并网格中的位置"""
+
+    __slots__ = ('name', 'file_path', 'transform', 'point_offset', 'cell_offset',
+                 'n_points', 'n_cells', 'weld_names', 'metrics')
+
+    def __init__(self, name, file_path, transform=None):
+        self.name = name
+        self.file_path = file_path
+        self.transform = np.eye(4) if transform is None else np.asarray(transform, dtype=np.float64)
+        self.point_offset = 0
+        self.cell_offset = 0
+        self.n_points = 0
+        self.n_cells = 0
+        self.weld_names = []  # 分段内的原焊缝名
+        self.metrics = None   # 分段内焊缝的 WeldMetrics（变换后的坐标）
+
+    def cell_range(self):
+        return self.cell_offset, self.cell_offset + self.n_cells
+
+
+def block_transform(translate=None, rotate_z=None, matrix=None):
+    """由平移、绕 z 轴旋转角（度）或 4x4 矩阵构造分段变换"""
+    if matrix is not None:
+        return np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+    transform = np.eye(4)
+    if rotate_z:
+        angle = np.radians(rotate_z)
+        transform[:2, :2] = [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+    if translate is not None:
+        transform[:3, 3] = translate
+    return transform
+
+
+def read_assembly_manifest(manifest_path):
+    """读取总装清单 JSON，返回 [AssemblyBlock]
+
+    格式：{"blocks": [{"file": "B01.stl", "name": "B01", "translate": [x, y, z],
+    "rotate_z": 角度, "matrix": 4x4}]}，除 file 外均可省略，相对路径相对于清单文件。
+    """
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    blocks = []
+    for entry in manifest['blocks']:
+        file_path = os.path.join(base_dir, entry['file'])
+        name = entry.get('name') or os.path.splitext(os.path.basename(file_path))[0]
+        transform = block_transform(entry.get('translate'), entry.get('rotate_z'), entry.get('matrix'))
+        blocks.append(AssemblyBlock(name, file_path, transform))
+    return blocks
+
+
+def blocks_from_files(file_paths):
+    """不带变换的分段列表，分段名取文件名"""
+    return [AssemblyBlock(os.path.splitext(os.path.basename(path))[0], path) for path in file_paths]
+
+
+def assembly_store_key(blocks, digests, tolerance):
+    """总装模型在焊缝数据库中的键：由各分段名、文件摘要与变换矩阵共同决定
+
+    任一分段的文件、名称、变换或分段顺序变化时合并后的单元编号随之改变，视为新模型。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for block, block_digest in zip(blocks, digests):
+        digest.update(f'{block.name}\0{block_digest}\0'.encode('utf-8'))
+        digest.update(np.ascontiguousarray(block.transform, dtype=np.float64).tobytes())
+    return weld_store_key(f'assembly-{digest.hexdigest()}', tolerance)
+
+
+def _load_block(file_path, transform, tolerance, cache_dir, store_path):
+    """工作进程：加载一个分段并变换到总装坐标系，返回可序列化的数组、焊缝表与文件摘要"""
+    cache = MeshCache(cache_dir) if cache_dir else None
+    store = WeldStore(store_path) if store_path else None
+    model = load_stl_model(file_path, tolerance, build_polydata=False, cache=cache, store=store)
+
+    rotation = transform[:3, :3]
+    points = (np.asarray(model.points, dtype=np.float64) @ rotation.T + transform[:3, 3]).astype(model.points.dtype)
+    triangles = np.asarray(model.triangles)
+    metrics = compute_weld_metrics(points, triangles, model.weld_data)
+
+    volume, cog, inertia = model.mass_properties
+    mass_properties = (float(volume), rotation @ np.asarray(cog) + transform[:3, 3],
+                       rotation @ np.asarray(inertia) @ rotation.T)
+    return (points, triangles, np.asarray(model.facet_ids), mass_properties,
+            model.weld_data, metrics, model.digest)
+
+
+def _regroup_block_welds(blocks, welds, points, triangles):
+    """焊缝表读自数据库（可能已编辑）时按名称前缀重新归属分段并重算各分段的焊缝指标
+
+    不带分段前缀的焊缝（如在总装模型上新建的焊缝）不归属任何分段。
+    """
+    for block in blocks:
+        prefix = f'{block.name}{BLOCK_SEPARATOR}'
+        block_welds = {name[len(prefix):]: record for name, record in welds.items() if name.startswith(prefix)}
+        block.weld_names = list(block_welds)
+        block.metrics = compute_weld_metrics(points, triangles, block_welds)
+
+
+def combine_mass_properties(parts):
+    """合并各分段的 (体积, 质心, 质心处惯性张量)，惯性张量按平行轴定理移到总质心"""
+    volumes = np.array([volume for volume, _, _ in parts])
+    total = float(volumes.sum())
+    if total == 0:
+        return 0.0, np.zeros(3), np.zeros((3, 3))
+    cogs = np.array([cog for _, cog, _ in parts])
+    cog = (volumes[:, None] * cogs).sum(axis=0) / total
+    inertia = np.zeros((3, 3))
+    for volume, part_cog, part_inertia in parts:
+        d = part_cog - cog
+        inertia += part_inertia + volume * (np.dot(d, d) * np.eye(3) - np.outer(d, d))
+    return total, cog, inertia
+
+
+def load_assembly(blocks, tolerance=VERTEX_MERGE_TOLERANCE, max_workers=None, progress=None,
+                  cancel_event=None, cache_dir=None, store_path=None, build_polydata=True,
+                  lod_budget=None, build_spatial=False, build_adjacency=True, point_dtype=None):
+    """用进程池并行加载各分段并合并，返回 LoadedModel（blocks 为 AssemblyBlock 列表）
+
+    cache_dir / store_path 传给各工作进程分别打开网格缓存与焊缝数据库；
+    给出 store_path 时合并后的焊缝表按 assembly_store_key 读取或保存，结果的 store_key 即该键。
+    progress(文本, 0~1) 在每个分段完成时调用；point_dtype 见 as_mesh_buffers。
+    """
+    results = [None] * len(blocks)
+    with span('assembly_blocks', 'load', blocks=len(blocks)):
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {executor.submit(_load_block, block.file_path, block.transform, tolerance,
+                                       cache_dir, store_path): i
+                       for i, block in enumerate(blocks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LoadCancelled(blocks[futures[future]].file_path)
+                i = futures[future]
+                results[i] = future.result()
+                if progress is not None:
+                    progress(f"已加载分段 {blocks[i].name} ({done}/{len(blocks)})", 0.8 * done / len(blocks))
+        except BaseException:
+            # 取消或出错时丢弃排队的分段，不等待正在加载的分段完成
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+    point_offset = cell_offset = facet_offset = 0
+    points, triangles, facet_ids, mass_parts = [], [], [], []
+    welds = {}
+    digests = []
+    for block, (block_points, block_triangles, block_facets, mass_properties,
+                block_welds, metrics, digest) in zip(blocks, results):
+        block.point_offset, block.cell_offset = point_offset, cell_offset
+        block.n_points, block.n_cells = len(block_points), len(block_triangles)
+        block.weld_names = list(block_welds)
+        block.metrics = metrics
+        digests.append(digest)
+
+        points.append(block_points)
+        triangles.append(block_triangles + point_offset)
+        facet_ids.append(block_facets + facet_offset)
+        mass_parts.append(mass_properties)
+        for name, record in block_welds.items():
+            welds[f'{block.name}{BLOCK_SEPARATOR}{name}'] = WeldRecord(
+                record.cells.shifted(cell_offset), record.strength, record.status,
+                record.color, record.info, record.bounds, record.max_dim)
+
+        point_offset += block.n_points
+        cell_offset += block.n_cells
+        facet_offset += int(block_facets.max()) + 1 if len(block_facets) else 0
+
+    points = np.concatenate(points) if points else np.empty((0, 3), dtype=np.float32)
+    triangles = np.concatenate(triangles) if triangles else np.empty((0, 3), dtype=np.int64)
+    facet_ids = np.concatenate(facet_ids) if facet_ids else np.empty(0, dtype=np.int64)
+    points, triangles = as_mesh_buffers(points, triangles, point_dtype)
+
+    store_key = None
+    if store_path:
+        store_key = assembly_store_key(blocks, digests, tolerance)
+        store = WeldStore(store_path)
+        try:
+            saved = store.load(store_key)
+            if saved is None:
+                store.save(store_key, len(triangles), welds)
+            else:
+                print(f"从焊缝数据库读取总装焊缝 {len(saved)} 条")
+                welds = saved
+                _regroup_block_welds(blocks, welds, points, triangles)
+        except sqlite3.Error as e:
+            print(f"读写焊缝数据库失败: {str(e)}")
+        finally:
+            store.close()
+    print(f"总装: {len(blocks)} 个分段，{len(points)} 个顶点，{len(triangles)} 个单元，{len(welds)} 条焊缝")
+
+    if progress is not None:
+        progress("合并分段", 0.9)
+    with span('assembly_merge', 'load'):
+        index = WeldCellIndex.from_weld_data(len(triangles), welds)
+        mesh_pv = None
+        if build_polydata:
+            mesh_pv = to_polydata(points, triangles, facet_ids)
+            mesh_pv.cell_data['block_id'] = np.repeat(np.arange(len(blocks), dtype=np.int32),
+                                                      [block.n_cells for block in blocks])
+        lod = build_display_lod(points, triangles, lod_budget) if lod_budget else None
+        spatial = CellSpatialIndex(points, triangles) if build_spatial else None
+        adjacency = FacetAdjacency.from_triangles(triangles) if build_adjacency else None
+    if progress is not None:
+        progress("合并分段", 1.0)
+
+    file_path = blocks[0].file_path if blocks else ''
+    model = LoadedModel(file_path, points, triangles, facet_ids, mesh_pv,
+                        combine_mass_properties(mass_parts), welds, index, lod=lod, spatial=spatial,
+                        store_key=store_key, blocks=blocks, adjacency=adjacency)
+    return model
+
+
+class AssemblyLoader(BackgroundTask):
+    """在工作线程中调度总装加载（实际解析在进程池中进行）"""
+
+    thread_name = 'assembly-loader'
+
+    def __init__(self, tk_root, blocks, on_progress, on_done, on_error, file_path='',
+                 tolerance=VERTEX_MERGE_TOLERANCE, max_workers=None, cache_dir=None, store_path=None,
+                 lod_budget=None, build_spatial=False, poll_ms=50):
+        super().__init__(tk_root, on_progress, on_done, on_error, poll_ms)
+        self.blocks = blocks
+        self.file_path = file_path
+        self.tolerance = tolerance
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.store_path = store_path
+        self.lod_budget = lod_budget
+        self.build_spatial = build_spatial
+
+    def work(self, progress):
+        model = load_assembly(self.blocks, self.tolerance, self.max_workers, progress, self.cancel_event,
+                              self.cache_dir, self.store_path, lod_budget=self.lod_budget,
+                              build_spatial=self.build_spatial)
+        if self.file_path:
+            model.file_path = self.file_path
+        return model
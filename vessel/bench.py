@@ -0,0 +1,198 @@
+"""热点路径基准测试（命令行：python -m vessel bench / bench-compare）
+
+用合成船体（见 synthetic.py）与带种子的焊缝数据计时 STL 加载（整体与流式）、面片构建、
+焊缝生成、相邻图与连续分段、面片质量场、单元拾取、扫描-设计偏差、点云 ICP 配准与映射、焊缝高亮与焊缝几何计算，
+结果写成 JSON 报告，两份报告可按用例逐项比较。
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .adjacency import FacetAdjacency, segment_weld_data
+from .deviation import signed_deviation
+from .geometry import WeldGeometry
+from .loader import load_stl_model
+from .mesh import to_polydata, triangles_to_faces
+from .pointcloud import map_scan_points, register_icp
+from .quality import compute_facet_quality
+from .spatial import CellSpatialIndex
+from .synthetic import synthetic_hull, write_binary_stl
+from .welds import WeldCellIndex, build_weld_data
+
+BENCH_REPORT_VERSION = 1
+BENCH_SIZES = (10_000, 100_000)
+BENCH_REGRESSION_THRESHOLD = 0.10  # 中位数变慢超过 10% 视为退化
+
+_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(text):
+    """'10k' / '1M' / '250000' -> 整数"""
+    text = text.strip().lower()
+    if text[-1:] in _SUFFIXES:
+        return int(float(text[:-1]) * _SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _result(case, n_facets, n_welds, times, per=1):
+    """per > 1 时 times 是 per 次操作的总时间，记录单次时间"""
+    times = [t / per for t in times]
+    return {'case': f'{case}/{n_facets}', 'name': case, 'facets': n_facets, 'welds': n_welds,
+            'repeat': len(times), 'best': min(times), 'median': statistics.median(times),
+            'mean': statistics.fmean(times)}
+
+
+def bench_size(n_facets, n_welds, repeat=3, seed=0, work_dir=None, log=print):
+    """对一种网格规模运行全部用例，返回结果列表"""
+    rng = np.random.default_rng(seed)
+    results = []
+
+    def record(case, times, per=1):
+        results.append(_result(case, n_facets, n_welds, times, per))
+        log(f"  {case:<16} median {results[-1]['median'] * 1e3:10.3f} ms")
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        stl_path = os.path.join(tmp_dir, 'hull.stl')
+        write_binary_stl(stl_path, synthetic_hull(n_facets, seed=seed))
+
+        models = []
+
+        def load(streaming=False):
+            with contextlib.redirect_stdout(io.StringIO()):  # 加载流水线的日志不计入输出
+                models.append(load_stl_model(stl_path, build_polydata=False, cache=None, streaming=streaming))
+
+        record('stl_load', _measure(load, repeat))
+        record('stl_stream_load', _measure(lambda: load(streaming=True), repeat))
+    model = models[-1]
+    points, triangles = np.asarray(model.points), np.asarray(model.triangles)
+    n_cells = len(triangles)
+
+    record('faces', _measure(lambda: triangles_to_faces(triangles), repeat))
+    if importlib.util.find_spec('pyvista') is not None:
+        record('polydata', _measure(lambda: to_polydata(points, triangles, model.facet_ids), repeat))
+
+    welds = {}
+    record('weld_generation', _measure(lambda: welds.update(
+        build_weld_data(n_cells, n_welds, seed=seed, verbose=False)), repeat))
+    indexes = []
+    record('weld_index', _measure(lambda: indexes.append(WeldCellIndex.from_weld_data(n_cells, welds)), repeat))
+    weld_index = indexes[-1]
+
+    adjacencies = []
+    record('adjacency_build', _measure(lambda: adjacencies.append(FacetAdjacency.from_triangles(triangles)), repeat))
+    adjacency = adjacencies[-1]
+    record('seam_generation', _measure(lambda: build_weld_data(n_cells, n_welds, seed=seed, verbose=False,
+                                                               adjacency=adjacency), repeat))
+    record('seam_segmentation', _measure(lambda: segment_weld_data(adjacency, welds), repeat))
+    record('facet_quality', _measure(lambda: compute_facet_quality(points, triangles, adjacency=adjacency), repeat))
+
+    spatial_indexes = []
+    record('spatial_build', _measure(lambda: spatial_indexes.append(CellSpatialIndex(points, triangles)), repeat))
+    spatial = spatial_indexes[-1]
+
+    # 拾取：在随机单元表面上取点，与 on_cell_pick 相同的 最近单元 + 焊缝查询
+    n_picks = 200
+    picked = rng.integers(0, n_cells, n_picks)
+    weights = rng.dirichlet(np.ones(3), n_picks)
+    pick_points = np.einsum('ij,ijk->ik', weights, points[triangles[picked]].astype(np.float64))
+
+    def pick_all():
+        for point in pick_points:
+            weld_index.weld_at(spatial.closest_cell(point))
+
+    record('cell_pick', _measure(pick_all, repeat), per=n_picks)
+
+    # 偏差：放大 0.1% 的副本作为扫描模型，与 signed_deviation 的分块多线程查询相同
+    scan_points = points * 1.001
+    record('scan_deviation', _measure(lambda: signed_deviation(scan_points, triangles, spatial), repeat))
+
+    # 点云：在单元表面上均匀取点并平移 1%（船长方向）作为扫描，配准后映射回单元
+    n_scan = min(n_cells, 200_000)
+    scan_cells = rng.integers(0, n_cells, n_scan)
+    scan_weights = rng.dirichlet(np.ones(3), n_scan)
+    cloud = np.einsum('ij,ijk->ik', scan_weights, points[triangles[scan_cells]].astype(np.float64))
+    cloud[:, 0] += 0.01 * float(np.ptp(cloud[:, 0]))
+    record('scan_icp', _measure(lambda: register_icp(cloud, spatial), repeat))
+    record('scan_map', _measure(lambda: map_scan_points(cloud, spatial), repeat), per=n_scan)
+
+    # 高亮：与 highlight_weld / repaint_weld_overlay 相同的覆盖数组写入
+    names = list(welds)
+    sample = [names[i] for i in rng.integers(0, len(names), min(100, len(names)))]
+    overlay = np.zeros(n_cells, dtype=np.uint8)
+
+    def highlight_sample():
+        for name in sample:
+            welds[name].cells.put(overlay, 1)
+
+    def highlight_all():
+        overlay[:] = 0
+        for record_ in welds.values():
+            record_.cells.put(overlay, 1)
+
+    record('highlight_weld', _measure(highlight_sample, repeat), per=len(sample))
+    record('highlight_all', _measure(highlight_all, repeat))
+
+    # 焊缝几何：display_weld_info 中的边界 / 最大尺寸 / PCA
+    def geometry_sample():
+        for name in sample:
+            WeldGeometry.from_cells(points, triangles, welds[name].cells)
+
+    record('weld_geometry', _measure(geometry_sample, repeat), per=len(sample))
+    return results
+
+
+def run_benchmarks(sizes=BENCH_SIZES, n_welds=1000, repeat=3, seed=0, log=print):
+    """运行全部规模，返回报告字典"""
+    # 预先导入延迟加载的依赖，避免第一种规模的计时包含导入时间
+    for module in ('stl', 'scipy.spatial', 'pyvista'):
+        if importlib.util.find_spec(module.split('.')[0]) is not None:
+            importlib.import_module(module)
+
+    results = []
+    for n_facets in sizes:
+        log(f"面片数 {n_facets}，焊缝数 {n_welds}")
+        results.extend(bench_size(n_facets, n_welds, repeat, seed, log=log))
+    return {
+        'version': BENCH_REPORT_VERSION,
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'welds': n_welds,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_reports(baseline, current, threshold=BENCH_REGRESSION_THRESHOLD):
+    """按用例比较两份报告的中位数，返回 [(用例, 基准, 当前, 比值, 是否退化)]"""
+    old = {result['case']: result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        previous = old.get(result['case'])
+        if previous is None:
+            continue
+        ratio = result['median'] / previous['median'] if previous['median'] > 0 else float('inf')
+        rows.append((result['case'], previous['median'], result['median'], ratio, ratio > 1 + threshold))
+    return rows
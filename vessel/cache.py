@@ -0,0 +1,170 @@
+"""STL 网格的二进制缓存：按文件内容哈希保存索引网格、质量属性与焊缝表
+
+每个缓存条目是一个目录，数组以 .npy 保存，读取时通过内存映射按需加载，
+未修改的文件重新打开几乎不需要计算。由网格派生的结构（面片相邻图、简化显示网格）
+作为条目下的子目录单独保存，首次需要时生成并写入。
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .welds import pack_weld_table, unpack_weld_table
+
+MESH_CACHE_DIR = os.environ.get('VESSEL_CACHE_DIR',
+                                os.path.join(os.path.expanduser('~'), '.cache', 'vessel'))
+MESH_CACHE_VERSION = 3  # 缓存格式或缓存的焊缝生成方式变化时递增，旧条目自动失效
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+
+_ARRAYS = ('points', 'triangles', 'facet_ids', 'weld_kinds', 'weld_offsets', 'weld_cells')
+
+
+def _write_arrays(cache_dir, target_dir, arrays, meta):
+    """把数组与 meta.json 写到临时目录再整体改名为 target_dir，读取方不会看到写了一半的目录"""
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.makedirs(os.path.dirname(target_dir), exist_ok=True)
+        if os.path.isdir(target_dir):
+            shutil.rmtree(target_dir)
+        os.replace(tmp_dir, target_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _read_arrays(source_dir, names):
+    """读取 meta.json 与内存映射的数组；缺失或版本不符时抛出 OSError / ValueError"""
+    with open(os.path.join(source_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != MESH_CACHE_VERSION:
+        raise ValueError(f'缓存版本不符: {source_dir}')
+    return meta, {name: np.load(os.path.join(source_dir, f'{name}.npy'), mmap_mode='r') for name in names}
+
+
+def file_digest(file_path):
+    """计算文件内容的 BLAKE2b 摘要（分块读取）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedMesh:
+    """从缓存读出的网格数据，数组均为只读内存映射"""
+
+    __slots__ = ('points', 'triangles', 'facet_ids', 'mass_properties', 'weld_data', 'digest')
+
+    def __init__(self, points, triangles, facet_ids, mass_properties, weld_data, digest):
+        self.points = points
+        self.triangles = triangles
+        self.facet_ids = facet_ids
+        self.mass_properties = mass_properties
+        self.weld_data = weld_data
+        self.digest = digest
+
+
+class MeshCache:
+    """内容哈希的网格缓存
+
+    paths/ 下每个源文件一条记录（文件名为路径的哈希），保存 (大小, 修改时间, 摘要)，
+    文件未变化时无需重新计算哈希；记录各自原子替换，多个进程同时写不同文件的记录互不覆盖。
+    条目目录名由摘要与顶点合并容差组成，同一文件不同容差分别缓存。
+    """
+
+    def __init__(self, cache_dir=MESH_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _record_path(self, file_path):
+        name = hashlib.blake2b(file_path.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, 'paths', f'{name}.json')
+
+    def digest(self, file_path):
+        """返回文件内容摘要；大小与修改时间未变时直接使用记录的摘要"""
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        record_path = self._record_path(file_path)
+        try:
+            with open(record_path, encoding='utf-8') as f:
+                known = json.load(f)
+            if (known['path'] == file_path and known['size'] == stat.st_size
+                    and known['mtime_ns'] == stat.st_mtime_ns):
+                return known['digest']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        digest = file_digest(file_path)
+        record = {'path': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+        try:
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(record_path), suffix='.json')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, record_path)
+        except OSError as e:
+            print(f"写入缓存记录失败: {str(e)}")
+        return digest
+
+    def _entry_dir(self, digest, tolerance):
+        return os.path.join(self.cache_dir, f'{digest}-{tolerance:g}')
+
+    def load(self, file_path, tolerance):
+        """读取缓存条目，未命中或条目损坏时返回 None"""
+        digest = self.digest(file_path)
+        try:
+            meta, arrays = _read_arrays(self._entry_dir(digest, tolerance), _ARRAYS)
+        except (OSError, ValueError):
+            return None
+
+        volume, cog, inertia = meta['mass_properties']
+        mass_properties = (volume, np.array(cog), np.array(inertia))
+        weld_data = unpack_weld_table(meta['welds'], arrays['weld_kinds'],
+                                      arrays['weld_offsets'], arrays['weld_cells'])
+        return CachedMesh(arrays['points'], arrays['triangles'], arrays['facet_ids'],
+                          mass_properties, weld_data, digest)
+
+    def store(self, file_path, tolerance, points, triangles, facet_ids, mass_properties, weld_data):
+        """写入缓存条目：先写临时目录再整体改名，读取方不会看到写了一半的条目"""
+        digest = self.digest(file_path)
+        entry_dir = self._entry_dir(digest, tolerance)
+        attributes, kinds, offsets, cells = pack_weld_table(weld_data)
+        volume, cog, inertia = mass_properties
+        meta = {
+            'version': MESH_CACHE_VERSION,
+            'source': os.path.abspath(file_path),
+            'tolerance': tolerance,
+            'mass_properties': [float(volume), np.asarray(cog).tolist(), np.asarray(inertia).tolist()],
+            'welds': attributes,
+        }
+
+        _write_arrays(self.cache_dir, entry_dir,
+                      dict(points=points, triangles=triangles, facet_ids=facet_ids,
+                           weld_kinds=kinds, weld_offsets=offsets, weld_cells=cells), meta)
+        return digest
+
+    def load_part(self, digest, tolerance, part, names):
+        """读取条目下的派生数据 part，返回 (meta, {名称: 数组})；未命中时返回 None"""
+        try:
+            return _read_arrays(os.path.join(self._entry_dir(digest, tolerance), part), names)
+        except (OSError, ValueError):
+            return None
+
+    def store_part(self, digest, tolerance, part, arrays, **meta):
+        """把派生数据写入已有条目；条目不存在（如从未 store）时不写"""
+        entry_dir = self._entry_dir(digest, tolerance)
+        if not os.path.isdir(entry_dir):
+            return
+        _write_arrays(self.cache_dir, os.path.join(entry_dir, part), arrays,
+                      dict(meta, version=MESH_CACHE_VERSION))
+
+    def clear(self):
+        """删除全部缓存"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
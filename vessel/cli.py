@@ -0,0 +1,360 @@
+"""命令行入口：python -m vessel [--trace 文件] batch <目录> / query <STL> / assembly <清单或STL...> /
+deviation <扫描STL> <设计STL> / report <STL> / scan <点云> <STL> / serve [STL...] / bench"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from .assembly import BLOCK_SEPARATOR, blocks_from_files, load_assembly, read_assembly_manifest
+from .bench import BENCH_REGRESSION_THRESHOLD, compare_reports, parse_size, run_benchmarks
+from .cache import MESH_CACHE_DIR, MeshCache
+from .deviation import compute_weld_deviation, deviation_rows, signed_deviation, write_deviation
+from .loader import load_stl_model
+from .mesh import VERTEX_MERGE_TOLERANCE
+from .metrics import compute_weld_metrics, metric_rows, write_metrics
+from .pointcloud import (ICP_MAX_ITERATIONS, compute_weld_scan, map_scan_points, read_point_cloud,
+                         register_icp, scan_rows, transform_points, write_scan)
+from .report import REPORT_IMAGE_SIZE, render_weld_report
+from .adjacency import SEGMENT_MIN_CELLS, segment_weld_data
+from .seams import build_corner_weld_data
+from .server import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, AnalysisServer, AnalysisSession
+from .store import WELD_STORE_PATH, WeldStore
+from .trace import tracer
+from .welds import WeldCellIndex
+
+
+def run_batch(args):
+    pattern = os.path.join(args.directory, args.pattern)
+    files = sorted(glob.glob(pattern))
+    if not files:
+        print(f"未找到匹配的文件: {pattern}", file=sys.stderr)
+        return 1
+
+    output = args.output or os.path.join(args.directory, f'weld_metrics.{args.format}')
+    cache = None if args.no_cache else MeshCache(args.cache_dir)
+    store = None if args.no_store else WeldStore(args.store)
+    rows = []
+    failed = 0
+    for file_path in files:
+        start = time.perf_counter()
+        try:
+            model = load_stl_model(file_path, tolerance=args.tolerance, build_polydata=False, cache=cache,
+                                   store=store)
+            if args.corner_welds:
+                model.weld_data.update(build_corner_weld_data(model.points, model.triangles,
+                                                              adjacency=model.adjacency))
+            if args.segment_welds:
+                model.weld_data = segment_weld_data(model.adjacency, model.weld_data, args.segment_min_cells,
+                                                    merge=args.segment_welds == 'merge')
+            metrics = compute_weld_metrics(model.points, model.triangles, model.weld_data)
+            rows.extend(metric_rows(os.path.basename(file_path), model.weld_data, metrics))
+            print(f"{os.path.basename(file_path)}: {len(model.weld_data)} 条焊缝，"
+                  f"用时 {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            failed += 1
+            print(f"处理 {file_path} 出错: {str(e)}", file=sys.stderr)
+            traceback.print_exc()
+
+    write_metrics(rows, output, args.format)
+    print(f"已写入 {len(rows)} 条焊缝指标: {output}")
+    return 1 if failed else 0
+
+
+def run_query(args):
+    cache = None if args.no_cache else MeshCache(args.cache_dir)
+    store = None if args.no_store else WeldStore(args.store)
+    model = load_stl_model(args.file, tolerance=args.tolerance, build_polydata=False, cache=cache,
+                           build_spatial=True, store=store)
+    if args.corner_welds:
+        model.weld_data.update(build_corner_weld_data(model.points, model.triangles, adjacency=model.adjacency))
+        model.weld_index = WeldCellIndex.from_weld_data(len(model.triangles), model.weld_data)
+    spatial = model.spatial
+
+    if args.box:
+        for name in spatial.welds_in_box(model.weld_index, args.box):
+            print(name)
+    elif args.sphere:
+        for name in spatial.welds_in_sphere(model.weld_index, args.sphere[:3], args.sphere[3]):
+            print(name)
+    else:
+        cell_id, distance = spatial.closest_cell(args.point, return_distance=True)
+        print(f"最近单元: {cell_id}（距离 {distance:.6g}）")
+        for name, distance in spatial.closest_welds(model.weld_index, args.point, args.k):
+            print(f"{name}\t{distance:.6g}")
+    return 0
+
+
+def run_assembly(args):
+    if len(args.files) == 1 and args.files[0].lower().endswith('.json'):
+        blocks = read_assembly_manifest(args.files[0])
+    else:
+        blocks = blocks_from_files(args.files)
+
+    start = time.perf_counter()
+    model = load_assembly(blocks, tolerance=args.tolerance, max_workers=args.workers,
+                          progress=lambda label, value: print(label),
+                          cache_dir=None if args.no_cache else args.cache_dir,
+                          store_path=None if args.no_store else args.store,
+                          build_polydata=False)
+    print(f"总装用时 {time.perf_counter() - start:.2f}s")
+
+    rows = []
+    for block in model.blocks:
+        block_welds = {name: model.weld_data[f'{block.name}{BLOCK_SEPARATOR}{name}'] for name in block.weld_names}
+        rows.extend(metric_rows(block.name, block_welds, block.metrics))
+    output = args.output or f'assembly_metrics.{args.format}'
+    write_metrics(rows, output, args.format)
+    print(f"已写入 {len(rows)} 条焊缝指标: {output}")
+    return 0
+
+
+def run_deviation(args):
+    cache = None if args.no_cache else MeshCache(args.cache_dir)
+    store = None if args.no_store else WeldStore(args.store)
+    scan = load_stl_model(args.scan, tolerance=args.tolerance, build_polydata=False, cache=cache, store=store)
+    design = load_stl_model(args.design, tolerance=args.tolerance, build_polydata=False, cache=cache,
+                            build_spatial=True, build_adjacency=False)
+
+    start = time.perf_counter()
+    deviation, _ = signed_deviation(scan.points, scan.triangles, design.spatial, max_workers=args.workers)
+    print(f"{len(deviation)} 个单元偏差用时 {time.perf_counter() - start:.2f}s，"
+          f"范围 [{deviation.min():.6g}, {deviation.max():.6g}]，"
+          f"RMS {float((deviation ** 2).mean()) ** 0.5:.6g}")
+
+    stats = compute_weld_deviation(deviation, scan.weld_data)
+    output = args.output or f'weld_deviation.{args.format}'
+    write_deviation(deviation_rows(os.path.basename(args.scan), scan.weld_data, stats), output, args.format)
+    print(f"已写入 {len(stats)} 条焊缝偏差: {output}")
+    return 0
+
+
+def run_report(args):
+    cache = None if args.no_cache else MeshCache(args.cache_dir)
+    store = None if args.no_store else WeldStore(args.store)
+    model = load_stl_model(args.file, tolerance=args.tolerance, build_polydata=False, cache=cache, store=store,
+                           build_spatial=True)
+    if args.corner_welds:
+        model.weld_data.update(build_corner_weld_data(model.points, model.triangles, adjacency=model.adjacency))
+    welds = model.weld_data
+    if args.welds:
+        missing = [name for name in args.welds if name not in welds]
+        if missing:
+            print(f"未找到焊缝: {', '.join(missing)}", file=sys.stderr)
+            return 1
+        welds = {name: welds[name] for name in args.welds}
+
+    output_dir = args.output or os.path.splitext(args.file)[0] + '_report'
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    start = time.perf_counter()
+    table = render_weld_report(model.points, model.triangles, welds, output_dir, os.path.basename(args.file),
+                               args.format, (width, height), args.workers,
+                               progress=lambda label, value: print(label), spatial=model.spatial)
+    print(f"已渲染 {len(welds)} 条焊缝截图，用时 {time.perf_counter() - start:.2f}s；指标表: {table}")
+    return 0
+
+
+def run_scan(args):
+    cache = None if args.no_cache else MeshCache(args.cache_dir)
+    store = None if args.no_store else WeldStore(args.store)
+    model = load_stl_model(args.model, tolerance=args.tolerance, build_polydata=False, cache=cache,
+                           build_spatial=True, store=store)
+
+    start = time.perf_counter()
+    points = read_point_cloud(args.scan, args.voxel)
+    print(f"读取点云 {len(points)} 点（体素 {args.voxel or '无'}），用时 {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    workers = args.workers or os.cpu_count()  # ICP 的 KD 树查询与扫描点映射使用同样的线程数
+    initial = np.loadtxt(args.initial).reshape(4, 4) if args.initial else None
+    result = register_icp(points, model.spatial, initial, max_iterations=args.iterations,
+                          max_distance=args.max_distance, workers=workers)
+    print(f"ICP {'收敛' if result.converged else '未收敛'}：{result.iterations} 次迭代，"
+          f"RMSE {result.rmse:.6g}，内点 {result.fitness:.1%}，用时 {time.perf_counter() - start:.2f}s")
+    print(np.array2string(result.transform, precision=6, suppress_small=True))
+    if args.transform:
+        np.savetxt(args.transform, result.transform)
+
+    aligned = transform_points(points, result.transform)
+    limit = np.inf if args.max_distance is None else args.max_distance
+    cell_ids, distances = map_scan_points(aligned, model.spatial, limit, max_workers=workers)
+    stats = compute_weld_scan(cell_ids, distances, model.weld_data, len(model.triangles))
+    output = args.output or f'weld_scan.{args.format}'
+    write_scan(scan_rows(os.path.basename(args.scan), model.weld_data, stats), output, args.format)
+    print(f"{int((cell_ids >= 0).sum())}/{len(cell_ids)} 个扫描点映射到单元，已写入 {len(stats)} 条焊缝覆盖: {output}")
+    return 0
+
+
+def run_serve(args):
+    session = AnalysisSession(args.tolerance, cache=None if args.no_cache else MeshCache(args.cache_dir),
+                              store=None if args.no_store else WeldStore(args.store),
+                              corner_welds=args.corner_welds)
+    for file_path in args.files:
+        start = time.perf_counter()
+        summary = session.load(file_path)
+        print(f"已加载 {summary['id']}：{summary['cells']} 个单元，{summary['welds']} 条焊缝，"
+              f"用时 {time.perf_counter() - start:.2f}s")
+
+    server = AnalysisServer(session, args.host, args.port, args.workers, verbose=args.verbose)
+    print(f"分析服务已启动: http://{args.host}:{server.server_address[1]}/models（Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def run_bench(args):
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    report = run_benchmarks(sizes, args.welds, args.repeat, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"基准结果已写入: {args.output}")
+    return 0
+
+
+def run_compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.threshold)
+    print(f"{'用例':<28}{'基准 ms':>12}{'当前 ms':>12}{'比值':>8}")
+    for case, old, new, ratio, regressed in rows:
+        print(f"{case:<28}{old * 1e3:12.3f}{new * 1e3:12.3f}{ratio:8.2f}{'  ← 变慢' if regressed else ''}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"共 {len(rows)} 个用例，{regressions} 个变慢超过 {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def positive_int(value):
+    """argparse 的正整数类型"""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f'需要正整数: {value}')
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m vessel', description='船舰焊缝检测批处理工具')
+    parser.add_argument('--trace', metavar='PATH', help='记录各阶段耗时并写出 Chrome trace JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # 读取 STL 的子命令共用的选项
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--tolerance', type=float, default=VERTEX_MERGE_TOLERANCE, help='顶点合并容差')
+    common.add_argument('--cache-dir', default=MESH_CACHE_DIR, help='网格缓存目录')
+    common.add_argument('--no-cache', action='store_true', help='不读写网格缓存')
+    common.add_argument('--store', default=WELD_STORE_PATH, help='焊缝数据库路径')
+    common.add_argument('--no-store', action='store_true', help='不使用焊缝数据库（每次重新生成焊缝）')
+
+    batch = commands.add_parser('batch', help='处理目录中的 STL 文件并输出焊缝指标', parents=[common])
+    batch.add_argument('directory', help='STL 文件所在目录')
+    batch.add_argument('-o', '--output', help='输出文件路径（默认写到输入目录）')
+    batch.add_argument('--pattern', default='*.stl', help='文件匹配模式（默认 *.stl）')
+    batch.add_argument('--format', choices=['csv', 'json'], default='csv')
+    batch.add_argument('--corner-welds', action='store_true', help='同时检测角焊缝')
+    batch.add_argument('--segment-welds', nargs='?', const='split', choices=['split', 'merge'],
+                       help='按面片相邻关系把焊缝拆分为连续焊缝段（merge：再合并相互接触的焊缝段）')
+    batch.add_argument('--segment-min-cells', type=int, default=SEGMENT_MIN_CELLS,
+                       help=f'单元数少于该值的焊缝段视为噪声丢弃（默认 {SEGMENT_MIN_CELLS}）')
+    batch.set_defaults(handler=run_batch)
+
+    query = commands.add_parser('query', help='按位置或区域查询 STL 模型中的焊缝', parents=[common])
+    query.add_argument('file', help='STL 文件')
+    region = query.add_mutually_exclusive_group(required=True)
+    region.add_argument('--point', type=float, nargs=3, metavar=('X', 'Y', 'Z'),
+                        help='最近单元与最近的 k 条焊缝')
+    region.add_argument('--box', type=float, nargs=6, metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX', 'ZMIN', 'ZMAX'),
+                        help='包围盒内的焊缝')
+    region.add_argument('--sphere', type=float, nargs=4, metavar=('X', 'Y', 'Z', 'R'), help='球内的焊缝')
+    query.add_argument('-k', type=positive_int, default=1, help='--point 时返回的焊缝数（默认 1）')
+    query.add_argument('--corner-welds', action='store_true', help='同时检测角焊缝')
+    query.set_defaults(handler=run_query)
+
+    assembly = commands.add_parser('assembly', help='并行加载全船分段并输出各分段焊缝指标', parents=[common])
+    assembly.add_argument('files', nargs='+', help='总装清单 (JSON) 或多个分段 STL 文件')
+    assembly.add_argument('-o', '--output', help='输出文件路径（默认 assembly_metrics.<格式>）')
+    assembly.add_argument('--format', choices=['csv', 'json'], default='csv')
+    assembly.add_argument('--workers', type=int, help='工作进程数（默认 CPU 核数）')
+    assembly.set_defaults(handler=run_assembly)
+
+    deviation = commands.add_parser('deviation', help='计算扫描模型到设计模型的带符号偏差并按焊缝统计', parents=[common])
+    deviation.add_argument('scan', help='实测扫描 STL（焊缝取自该模型）')
+    deviation.add_argument('design', help='设计 STL')
+    deviation.add_argument('-o', '--output', help='输出文件路径（默认 weld_deviation.<格式>）')
+    deviation.add_argument('--format', choices=['csv', 'json'], default='csv')
+    deviation.add_argument('--workers', type=int, help='查询线程数（默认 CPU 核数）')
+    deviation.set_defaults(handler=run_deviation)
+
+    report = commands.add_parser('report', help='多进程离屏渲染每条焊缝的截图并输出指标表', parents=[common])
+    report.add_argument('file', help='STL 文件')
+    report.add_argument('-o', '--output', help='输出目录（默认 <STL 文件名>_report）')
+    report.add_argument('--format', choices=['csv', 'json'], default='csv', help='指标表格式')
+    report.add_argument('--size', default='x'.join(map(str, REPORT_IMAGE_SIZE)), help='截图尺寸，如 800x600')
+    report.add_argument('--welds', nargs='+', metavar='NAME', help='只渲染指定焊缝（默认全部）')
+    report.add_argument('--workers', type=int, help='渲染进程数（默认 CPU 核数）')
+    report.add_argument('--corner-welds', action='store_true', help='同时检测角焊缝')
+    report.set_defaults(handler=run_report)
+
+    scan = commands.add_parser('scan', help='读取点云扫描，ICP 配准到 STL 模型并按焊缝统计扫描覆盖', parents=[common])
+    scan.add_argument('scan', help='点云文件（PLY / XYZ / TXT / PTS / CSV）')
+    scan.add_argument('model', help='STL 模型（焊缝取自该模型）')
+    scan.add_argument('-o', '--output', help='输出文件路径（默认 weld_scan.<格式>）')
+    scan.add_argument('--format', choices=['csv', 'json'], default='csv')
+    scan.add_argument('--voxel', type=float, help='体素下采样尺寸（默认不下采样）')
+    scan.add_argument('--initial', help='初始 4×4 变换矩阵文本文件（默认单位阵）')
+    scan.add_argument('--transform', help='把配准得到的 4×4 变换写到该文件')
+    scan.add_argument('--iterations', type=int, default=ICP_MAX_ITERATIONS, help='ICP 最大迭代次数')
+    scan.add_argument('--max-distance', type=float,
+                      help='对应点最大距离，超过的点不参与配准也不映射到单元（默认按距离中位数自适应）')
+    scan.add_argument('--workers', type=int, help='KD 树查询线程数（默认 CPU 核数）')
+    scan.set_defaults(handler=run_scan)
+
+    serve = commands.add_parser('serve', help='常驻内存的分析服务，通过本机 HTTP 接口查询焊缝', parents=[common])
+    serve.add_argument('files', nargs='*', help='启动时预先加载的 STL 文件（也可运行中 POST /models 加载）')
+    serve.add_argument('--host', default=SERVER_HOST, help='监听地址（默认只监听本机）')
+    serve.add_argument('--port', type=int, default=SERVER_PORT, help='监听端口（0 为自动分配）')
+    serve.add_argument('--workers', type=int, default=SERVER_WORKERS, help='并发处理请求的线程数')
+    serve.add_argument('--verbose', action='store_true', help='打印每个请求的访问日志')
+    serve.add_argument('--corner-welds', action='store_true', help='同时检测角焊缝')
+    serve.set_defaults(handler=run_serve)
+
+    bench = commands.add_parser('bench', help='用合成船体运行热点路径基准测试')
+    bench.add_argument('-o', '--output', default='bench_report.json', help='JSON 报告路径')
+    bench.add_argument('--sizes', default='10k,100k', help='面片数，逗号分隔，如 10k,100k,1M,10M')
+    bench.add_argument('--welds', type=int, default=1000, help='焊缝数（最多约 100k）')
+    bench.add_argument('--repeat', type=int, default=3, help='每个用例的重复次数')
+    bench.add_argument('--seed', type=int, default=0, help='随机种子')
+    bench.set_defaults(handler=run_bench)
+
+    compare = commands.add_parser('bench-compare', help='比较两份基准报告')
+    compare.add_argument('baseline', help='基准报告 JSON')
+    compare.add_argument('current', help='当前报告 JSON')
+    compare.add_argument('--threshold', type=float, default=BENCH_REGRESSION_THRESHOLD,
+                         help='中位数变慢超过该比例视为退化（默认 0.1）')
+    compare.set_defaults(handler=run_compare)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.trace:
+        return args.handler(args)
+
+    tracer.enable()
+    try:
+        return args.handler(args)
+    finally:
+        tracer.write(args.trace)
+        for name, (calls, total) in sorted(tracer.summary().items(), key=lambda item: -item[1][1]):
+            print(f"{name:<20} {calls:>6} 次 {total * 1e3:12.1f} ms", file=sys.stderr)
+        print(f"性能追踪已写入 {args.trace}", file=sys.stderr)
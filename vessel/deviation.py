@@ -0,0 +1,130 @@
+"""扫描模型与设计模型的偏差分析
+
+源模型（通常是实测扫描）每个单元中心到目标模型（设计模型）表面的带符号最近距离：
+沿目标面片法向一侧为正（鼓出），另一侧为负（凹入）。最近点查询用目标模型的
+CellSpatialIndex.closest_cells_chunked，源单元分块后在线程池中并行计算。
+"""
+import numpy as np
+
+from .loader import BackgroundTask, load_stl_model
+from .mesh import VERTEX_MERGE_TOLERANCE, face_normals
+from .metrics import write_metrics
+from .trace import span, traced
+from .welds import WeldTable, weld_segments
+
+DEVIATION_CHUNK_CELLS = 65536  # 每个线程任务处理的源单元数
+DEVIATION_ARRAY = 'deviation'  # 网格上保存带符号偏差的单元数组名
+DEVIATION_PERCENTILE = 95  # 焊缝偏差统计中的绝对值分位数
+DEVIATION_FIELDS = ['file', 'weld', 'cells', 'strength', 'status',
+                    'mean', 'rms', 'min', 'max', 'abs_max', 'p95']
+
+
+@traced('signed_deviation', 'deviation')
+def signed_deviation(points, triangles, target, chunk_cells=DEVIATION_CHUNK_CELLS, max_workers=None,
+                     progress=None, cancel_event=None):
+    """源网格每个单元中心到目标模型的带符号距离，返回 (偏差, 目标最近单元)
+
+    target 是目标模型的 CellSpatialIndex，单元中心按 chunk_cells 分块并行查询
+    （见 CellSpatialIndex.closest_cells_chunked）。
+    progress(文本, 0~1) 每完成一块调用一次；cancel_event 置位后抛出 LoadCancelled。
+    """
+    if not len(triangles):
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    with span('deviation_centers', 'deviation'):
+        centers = sum(np.asarray(points[triangles[:, k]], dtype=np.float64) for k in range(3)) / 3.0
+    closest, distances, nearest = target.closest_cells_chunked(centers, chunk_cells, max_workers, progress,
+                                                               cancel_event, label='计算偏差')
+    side = np.einsum('ij,ij->i', centers - nearest, face_normals(target.points, target.triangles)[closest])
+    return np.where(side < 0, -distances, distances), closest
+
+
+class WeldDeviation(WeldTable):
+    """按列存放的焊缝偏差统计，第 i 行对应 names[i]；没有单元的焊缝对应行为 NaN"""
+
+    __slots__ = ('mean', 'rms', 'min', 'max', 'abs_max', 'p95')
+
+    def __init__(self, names, cell_count, mean, rms, minimum, maximum, abs_max, p95):
+        super().__init__(names, cell_count)
+        self.mean = mean
+        self.rms = rms
+        self.min = minimum
+        self.max = maximum
+        self.abs_max = abs_max
+        self.p95 = p95  # 绝对偏差的 DEVIATION_PERCENTILE 分位数（最近秩）
+
+
+@traced('weld_deviation', 'deviation')
+def compute_weld_deviation(deviation, welds):
+    """按焊缝（{名称: WeldRecord}）分段归约单元偏差，返回 WeldDeviation"""
+    names, cells, labels, cell_count = weld_segments(welds, len(deviation))
+    n_welds = len(names)
+    values = deviation[cells]
+
+    stats = {key: np.full(n_welds, np.nan) for key in ('mean', 'rms', 'min', 'max', 'abs_max', 'p95')}
+    nonempty = cell_count > 0
+    if nonempty.any():
+        counts = cell_count[nonempty]
+        stats['mean'][nonempty] = np.bincount(labels, weights=values, minlength=n_welds)[nonempty] / counts
+        stats['rms'][nonempty] = np.sqrt(np.bincount(labels, weights=values * values,
+                                                     minlength=n_welds)[nonempty] / counts)
+        starts = (np.cumsum(cell_count) - cell_count)[nonempty]  # 单元按焊缝顺序拼接，天然分段
+        stats['min'][nonempty] = np.minimum.reduceat(values, starts)
+        stats['max'][nonempty] = np.maximum.reduceat(values, starts)
+        magnitude = np.abs(values)
+        stats['abs_max'][nonempty] = np.maximum.reduceat(magnitude, starts)
+        # 分段内按绝对值排序后直接取最近秩分位数
+        ranked = magnitude[np.lexsort((magnitude, labels))]
+        rank = np.ceil(counts * DEVIATION_PERCENTILE / 100).astype(np.int64) - 1
+        stats['p95'][nonempty] = ranked[starts + rank]
+
+    return WeldDeviation(names, cell_count, stats['mean'], stats['rms'], stats['min'], stats['max'],
+                         stats['abs_max'], stats['p95'])
+
+
+def deviation_rows(file_name, welds, stats):
+    """把 WeldDeviation 转为与 DEVIATION_FIELDS 对应的字典列表"""
+    rows = []
+    for i, name in enumerate(stats.names):
+        record = welds[name]
+        row = {'file': file_name, 'weld': name, 'cells': int(stats.cell_count[i]),
+               'strength': record.strength, 'status': record.status}
+        if stats.cell_count[i]:
+            row.update((key, float(getattr(stats, key)[i])) for key in DEVIATION_FIELDS[5:])
+        rows.append(row)
+    return rows
+
+
+def write_deviation(rows, output, fmt='csv'):
+    """把偏差统计行写为 CSV 或 JSON"""
+    write_metrics(rows, output, fmt, fields=DEVIATION_FIELDS)
+
+
+class DeviationTask(BackgroundTask):
+    """在工作线程中加载设计模型并计算当前模型到它的带符号偏差
+
+    结果为 (偏差数组, WeldDeviation, 设计模型 LoadedModel)。
+    """
+
+    thread_name = 'deviation'
+
+    def __init__(self, tk_root, points, triangles, welds, design_path, on_progress, on_done, on_error,
+                 tolerance=VERTEX_MERGE_TOLERANCE, cache=None, max_workers=None, poll_ms=50):
+        super().__init__(tk_root, on_progress, on_done, on_error, poll_ms)
+        self.points = points
+        self.triangles = triangles
+        self.welds = dict(welds)  # 工作线程只读快照，主线程可以继续修改焊缝
+        self.design_path = design_path
+        self.tolerance = tolerance
+        self.cache = cache
+        self.max_workers = max_workers
+
+    def work(self, progress):
+        design = load_stl_model(self.design_path, self.tolerance,
+                                progress=lambda label, value: progress(f"设计模型: {label}", 0.3 * value),
+                                cancel_event=self.cancel_event, cache=self.cache, build_polydata=False,
+                                build_spatial=True, build_adjacency=False)
+        deviation, _ = signed_deviation(self.points, self.triangles, design.spatial,
+                                        max_workers=self.max_workers,
+                                        progress=lambda label, value: progress(label, 0.3 + 0.7 * value),
+                                        cancel_event=self.cancel_event)
+        return deviation, compute_weld_deviation(deviation, self.welds), design
@@ -0,0 +1,119 @@
+"""焊缝几何属性（边界、最大尺寸、PCA）及其 LRU 缓存"""
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from .mesh import mesh_triangles
+from .trace import count, span
+
+WELD_GEOMETRY_CACHE_BYTES = 256 * 1024 * 1024  # 焊缝几何缓存内存上限
+
+
+class WeldGeometry:
+    """焊缝几何属性：边界、最大尺寸与 PCA 结果；由 from_mesh 构造时同时持有子网格
+
+    与 compute_weld_metrics 一致：没有顶点时边界、最大尺寸与质心为 NaN，
+    顶点不足两个时 PCA 结果为 NaN。
+    """
+
+    __slots__ = ('mesh', 'bounds', 'max_dim', 'centroid', 'eig_vals', 'eig_vecs', 'nbytes')
+
+    def __init__(self, points, weld_mesh=None):
+        self.mesh = weld_mesh
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        n_points = len(points)
+        if n_points:
+            lower = points.min(axis=0)
+            upper = points.max(axis=0)
+            self.centroid = points.mean(axis=0)
+        else:
+            lower = upper = self.centroid = np.full(3, np.nan)
+        self.bounds = (float(lower[0]), float(upper[0]), float(lower[1]),
+                       float(upper[1]), float(lower[2]), float(upper[2]))  # (xmin, xmax, ymin, ymax, zmin, zmax)
+        self.max_dim = float((upper - lower).max())
+
+        if n_points > 1:
+            cov = np.cov(points - self.centroid, rowvar=False)
+            eig_vals, eig_vecs = np.linalg.eigh(cov)  # 协方差矩阵对称，特征值为实数
+            order = np.argsort(eig_vals)[::-1]
+            self.eig_vals = eig_vals[order]
+            self.eig_vecs = eig_vecs[:, order]
+        else:
+            self.eig_vals = np.full(3, np.nan)
+            self.eig_vecs = np.full((3, 3), np.nan)
+
+        # 实际持有的数组与边界元组；子网格按 VTK 报告的内存计
+        self.nbytes = sum(sys.getsizeof(value) for value in (self.bounds, self.centroid, self.eig_vals,
+                                                             self.eig_vecs))
+        if weld_mesh is not None:
+            self.nbytes += weld_mesh.actual_memory_size * 1024
+
+    @property
+    def empty(self):
+        """焊缝在当前网格中没有顶点"""
+        return bool(np.isnan(self.max_dim))
+
+    @classmethod
+    def from_mesh(cls, weld_mesh):
+        """由 extract_cells 得到的焊缝子网格计算"""
+        return cls(weld_mesh.points, weld_mesh)
+
+    @classmethod
+    def from_cells(cls, points, triangles, cells):
+        """直接由索引网格计算，无需 PyVista；与子网格的点集一致（去重后的单元顶点）"""
+        point_ids = np.unique(triangles[cells.to_array()])
+        return cls(points[point_ids])
+
+
+class WeldGeometryCache:
+    """按焊缝缓存几何属性，LRU 淘汰并限制总内存
+
+    条目记录生成时所用的网格与 WeldCells 对象；WeldCells 不可变，
+    save_weld 修改单元时会替换为新对象，旧条目在下次访问时自动失效。
+    焊缝子网格不进入缓存：几何属性直接由索引数组计算，界面高亮走单元标量，
+    没有调用方需要子网格；需要时用 extract_cells 现取（见 report._submesh）。
+    """
+
+    def __init__(self, max_bytes=WELD_GEOMETRY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # 焊缝名 -> (网格, WeldCells, WeldGeometry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, weld_name, record, mesh_pv):
+        """返回焊缝几何属性，未命中或已失效时重新计算
+
+        直接在 mesh_pv 的顶点与连接数组视图上计算，不提取、不缓存焊缝子网格。
+        """
+        entry = self._entries.get(weld_name)
+        if entry is not None:
+            if entry[0] is mesh_pv and entry[1] is record.cells:
+                self._entries.move_to_end(weld_name)
+                count('weld_geometry_hits')
+                return entry[2]
+            self.invalidate(weld_name)
+
+        count('weld_geometry_misses')
+        cells = record.cells.clip(mesh_pv.n_cells)
+        with span('weld_geometry', 'geometry', weld=weld_name):
+            geometry = WeldGeometry.from_cells(np.asarray(mesh_pv.points), mesh_triangles(mesh_pv), cells)
+        if geometry.nbytes <= self.max_bytes:
+            self._entries[weld_name] = (mesh_pv, record.cells, geometry)
+            self.total_bytes += geometry.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+        return geometry
+
+    def invalidate(self, weld_name=None):
+        """使指定焊缝（或全部焊缝）的缓存失效"""
+        if weld_name is None:
+            self._entries.clear()
+            self.total_bytes = 0
+            return
+        entry = self._entries.pop(weld_name, None)
+        if entry is not None:
+            self.total_bytes -= entry[2].nbytes
@@ -0,0 +1,348 @@
+"""STL 加载流水线：可在工作线程中运行，并把进度回传给 Tk 主循环"""
+import os
+import queue
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+
+from .adjacency import FacetAdjacency
+from .cache import file_digest
+from .lod import LodMesh, build_display_lod
+from .mesh import VERTEX_MERGE_TOLERANCE, as_mesh_buffers, build_indexed_mesh, to_polydata
+from .spatial import CellSpatialIndex
+from .stlstream import STL_STREAM_THRESHOLD_BYTES, StlStream, mesh_mass_properties
+from .store import weld_store_key
+from .trace import count, span
+from .welds import WeldCellIndex, build_weld_data
+
+
+class LoadCancelled(Exception):
+    """加载流水线被取消"""
+
+
+class LoadedModel:
+    """加载流水线的结果，在工作线程中生成后交给主线程显示
+
+    points / triangles 是唯一的几何数据，mesh_pv、spatial 与 adjacency 都直接引用它们；
+    解析 STL 用的 numpy-stl 网格在转换后即释放。
+    """
+
+    __slots__ = ('file_path', 'points', 'triangles', 'facet_ids', 'mesh_pv',
+                 'mass_properties', 'weld_data', 'weld_index', 'digest', 'lod',
+                 'spatial', 'store_key', 'blocks', 'adjacency')
+
+    def __init__(self, file_path, points, triangles, facet_ids, mesh_pv,
+                 mass_properties, weld_data, weld_index, digest=None, lod=None,
+                 spatial=None, store_key=None, blocks=None, adjacency=None):
+        self.digest = digest  # 文件内容摘要，仅在使用缓存或焊缝数据库时可用
+        self.store_key = store_key  # 焊缝数据库中的模型键，未使用数据库时为 None
+        self.blocks = blocks  # 总装模型的分段列表 (AssemblyBlock)，单个 STL 时为 None
+        self.lod = lod  # 简化显示网格 (LodMesh)，模型较小时为 None
+        self.spatial = spatial  # 单元空间索引 (CellSpatialIndex)，未请求时为 None
+        self.adjacency = adjacency  # 面片相邻图 (FacetAdjacency)，未请求时为 None
+        self.file_path = file_path
+        self.points = points
+        self.triangles = triangles
+        self.facet_ids = facet_ids
+        self.mesh_pv = mesh_pv
+        self.mass_properties = mass_properties
+        self.weld_data = weld_data
+        self.weld_index = weld_index
+
+
+# 加载阶段：(阶段名, 显示文本, 进度权重)；命中网格缓存时跳过 parse / mass / convert
+LOAD_STAGES = [
+    ('cache', '读取网格缓存', 0.0),
+    ('parse', '解析 STL', 0.30),
+    ('mass', '计算质量属性', 0.10),
+    ('convert', '构建索引网格', 0.20),
+    ('lod', '生成简化显示网格', 0.10),
+    ('spatial', '构建空间索引', 0.05),
+    ('adjacency', '构建面片相邻关系', 0.05),
+    ('welds', '生成焊缝数据', 0.20),
+]
+
+
+def load_stl_model(file_path, tolerance=VERTEX_MERGE_TOLERANCE, progress=None, cancel_event=None,
+                   build_polydata=True, cache=None, lod_budget=None,
+                   build_spatial=False, store=None, streaming=None, build_adjacency=True, point_dtype=None):
+    """执行 STL 加载流水线，不访问任何 GUI 对象，可在工作线程中运行
+
+    progress(阶段显示文本, 总进度 0~1) 在每个阶段开始和结束时调用；
+    cancel_event 被置位后在下一个阶段开始前抛出 LoadCancelled。
+    build_polydata=False 时不导入 PyVista，只返回 NumPy 索引网格（批处理使用）。
+    cache 为 MeshCache 时，文件未变化则直接从缓存内存映射读取，否则加载后写入缓存；
+    简化显示网格与面片相邻图同样从缓存条目读取，缺少时生成后补写。
+    lod_budget 不为 None 且单元数超出时，同时生成不超过该单元数的简化显示网格。
+    build_spatial=True 时同时构建单元空间索引，用于拾取与区域查询。
+    build_adjacency=True 时构建面片相邻图，新生成的焊缝沿相邻关系生长为连续区域。
+    store 为 WeldStore 时按文件摘要读取已保存的焊缝表，没有记录时生成后写入。
+    streaming=True 时用 StlStream 分块读取（不构造 numpy-stl 网格），
+    None 时文件不小于 STL_STREAM_THRESHOLD_BYTES 才分块读取。
+    point_dtype=np.float32 时顶点坐标统一为 float32（见 as_mesh_buffers）。
+    """
+    done = 0.0
+
+    @contextmanager
+    def stage(name):
+        """一个加载阶段：开始前检查取消，阶段内记录 span，正常结束后推进进度"""
+        nonlocal done
+        if cancel_event is not None and cancel_event.is_set():
+            raise LoadCancelled(file_path)
+        label = next(text for stage_name, text, _ in LOAD_STAGES if stage_name == name)
+        if progress is not None:
+            progress(label, done)
+        with span(name, 'load'):
+            yield
+        done += next(weight for stage_name, _, weight in LOAD_STAGES if stage_name == name)
+        if progress is not None:
+            progress(label, done)
+
+    cached = None
+    if cache is not None:
+        with stage('cache'):
+            cached = cache.load(file_path, tolerance)
+        count('mesh_cache_hits' if cached is not None else 'mesh_cache_misses')
+
+    if cached is not None:
+        print(f"从缓存加载: {os.path.basename(file_path)} ({cached.digest})")
+        done += sum(weight for name, _, weight in LOAD_STAGES if name in ('parse', 'mass', 'convert'))
+        points, triangles = as_mesh_buffers(cached.points, cached.triangles, point_dtype)
+        facet_ids = cached.facet_ids
+        volume, cog, inertia = cached.mass_properties
+        digest = cached.digest
+        mesh_pv = to_polydata(points, triangles, facet_ids) if build_polydata else None
+    else:
+        points, triangles, facet_ids, (volume, cog, inertia), mesh_pv = _parse_stl(
+            file_path, tolerance, stage, streaming, build_polydata, point_dtype)
+        digest = None
+
+    with stage('lod'):
+        lod = cached_lod = None
+        if lod_budget and len(triangles) > lod_budget:
+            lod = cached_lod = _cached_lod(cache, digest, tolerance, lod_budget)
+            if lod is None:
+                lod = build_display_lod(points, triangles, lod_budget)
+            print(f"简化显示网格: {len(lod)} 个单元（精度 {lod.resolution}）")
+
+    with stage('spatial'):
+        spatial = CellSpatialIndex(points, triangles) if build_spatial else None
+
+    with stage('adjacency'):
+        adjacency = cached_adjacency = None
+        if build_adjacency:
+            adjacency = cached_adjacency = _cached_adjacency(cache, digest, tolerance)
+            if adjacency is None:
+                adjacency = FacetAdjacency.from_triangles(triangles)
+
+    with stage('welds'):
+        store_key = None
+        if cached is not None:
+            store_key = weld_store_key(digest, tolerance) if store is not None else None
+            welds = _stored_welds(store, store_key, len(triangles), lambda: cached.weld_data)
+        else:
+            if store is not None:
+                digest = cache.digest(file_path) if cache is not None else file_digest(file_path)
+                store_key = weld_store_key(digest, tolerance)
+            welds = _stored_welds(store, store_key, len(triangles),
+                                  lambda: build_weld_data(len(triangles), adjacency=adjacency))
+        index = WeldCellIndex.from_weld_data(len(triangles), welds)
+
+    if cache is not None:
+        try:
+            if cached is None:
+                with span('cache_store', 'load'):
+                    digest = cache.store(file_path, tolerance, points, triangles, facet_ids,
+                                         (volume, cog, inertia), welds)
+            _store_derived(cache, digest, tolerance, lod_budget,
+                           lod if lod is not cached_lod else None,
+                           adjacency if adjacency is not cached_adjacency else None)
+        except OSError as e:
+            print(f"写入网格缓存失败: {str(e)}")
+
+    return LoadedModel(file_path, points, triangles, facet_ids, mesh_pv,
+                       (volume, cog, inertia), welds, index, digest, lod, spatial, store_key,
+                       adjacency=adjacency)
+
+
+def _parse_stl(file_path, tolerance, stage, streaming, build_polydata, point_dtype):
+    """未命中缓存时的 parse / mass / convert 阶段，返回 (points, triangles, facet_ids, 质量属性, mesh_pv)"""
+    if streaming is None:
+        streaming = os.path.getsize(file_path) >= STL_STREAM_THRESHOLD_BYTES
+
+    with stage('parse'):
+        print(f"正在加载: {os.path.basename(file_path)}")
+        if streaming:
+            stream = StlStream(file_path)
+            if stream.binary:
+                print(f"Number of facets: {len(stream)}（流式读取）")
+        else:
+            from stl import mesh
+
+            stl_mesh = mesh.Mesh.from_file(file_path)
+            print(f"Number of facets: {len(stl_mesh)}")
+
+    with stage('mass'):
+        if streaming:
+            volume, cog, inertia = stream.scan()
+        else:
+            volume, cog, inertia = mesh_mass_properties(stl_mesh.vectors)
+        print(f"Volume: {volume}")
+        print(f"Center of mass: {cog}")
+        print(f"Moments of inertia: {inertia}")
+
+    with stage('convert'):
+        if streaming:
+            points, triangles, facet_ids = stream.build_indexed_mesh(tolerance)
+        else:
+            points, triangles, facet_ids = build_indexed_mesh(stl_mesh.vectors, tolerance=tolerance)
+            del stl_mesh  # 之后只保留索引网格
+        points, triangles = as_mesh_buffers(points, triangles, point_dtype)
+        mesh_pv = to_polydata(points, triangles, facet_ids) if build_polydata else None
+        print(f"合并后顶点数: {len(points)}，有效单元数: {len(triangles)}")
+    return points, triangles, facet_ids, (volume, cog, inertia), mesh_pv
+
+
+_ADJACENCY_ARRAYS = ('face_a', 'face_b', 'indptr', 'indices')
+_LOD_ARRAYS = ('points', 'triangles', 'cell_ids')
+
+
+def _cached_lod(cache, digest, tolerance, lod_budget):
+    """从缓存条目读取按 lod_budget 生成的简化显示网格，未命中时返回 None"""
+    if cache is None or digest is None:
+        return None
+    part = cache.load_part(digest, tolerance, f'lod-{lod_budget}', _LOD_ARRAYS)
+    if part is None:
+        return None
+    meta, arrays = part
+    return LodMesh(arrays['points'], arrays['triangles'], arrays['cell_ids'], meta['resolution'])
+
+
+def _cached_adjacency(cache, digest, tolerance):
+    """从缓存条目读取面片相邻图，未命中时返回 None"""
+    if cache is None or digest is None:
+        return None
+    part = cache.load_part(digest, tolerance, 'adjacency', _ADJACENCY_ARRAYS)
+    if part is None:
+        return None
+    meta, arrays = part
+    return FacetAdjacency.from_arrays(meta['n_cells'], *(arrays[name] for name in _ADJACENCY_ARRAYS))
+
+
+def _store_derived(cache, digest, tolerance, lod_budget, lod, adjacency):
+    """把新生成的简化显示网格与面片相邻图写入缓存条目（None 的跳过）"""
+    if lod is not None:
+        cache.store_part(digest, tolerance, f'lod-{lod_budget}',
+                         dict(points=lod.points, triangles=lod.triangles, cell_ids=lod.cell_ids),
+                         resolution=lod.resolution)
+    if adjacency is not None:
+        cache.store_part(digest, tolerance, 'adjacency',
+                         {name: getattr(adjacency, name) for name in _ADJACENCY_ARRAYS}, n_cells=adjacency.n_cells)
+
+
+def _stored_welds(store, key, n_cells, build):
+    """从焊缝数据库读取焊缝表，没有记录时调用 build() 生成并写入"""
+    if store is None:
+        return build()
+    try:
+        welds = store.load(key)
+        if welds is not None:
+            print(f"从焊缝数据库读取 {len(welds)} 条焊缝")
+            return welds
+        welds = build()
+        store.save(key, n_cells, welds)
+    except sqlite3.Error as e:
+        print(f"读写焊缝数据库失败: {str(e)}")
+        welds = build()
+    return welds
+
+
+class BackgroundTask:
+    """在工作线程中运行一项计算，通过队列把进度和结果交回 Tk 主循环
+
+    工作线程只做计算；on_progress / on_done / on_error 都在主线程中由
+    root.after 轮询调用，因此可以安全地操作 Tk 控件和绘图窗口。
+    子类实现 work(progress)，返回值交给 on_done。取消后不再调用 on_done：
+    即使结果已经排在队列中，也改为以 LoadCancelled 调用 on_error。
+    """
+
+    thread_name = 'background-task'
+
+    def __init__(self, tk_root, on_progress, on_done, on_error, poll_ms=50):
+        self.tk_root = tk_root
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.cancel_event = threading.Event()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.tk_root.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def work(self, progress):
+        raise NotImplementedError
+
+    def _run(self):
+        try:
+            result = self.work(lambda label, value: self._queue.put(('progress', label, value)))
+            if self.cancel_event.is_set():
+                raise LoadCancelled(self.thread_name)
+            self._queue.put(('done', result))
+        except Exception as e:
+            self._queue.put(('error', e, traceback.format_exc()))
+
+    def _poll(self):
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == 'progress':
+                if not self.cancel_event.is_set():
+                    self.on_progress(message[1], message[2])
+            elif kind == 'done':
+                if self.cancel_event.is_set():
+                    self.on_error(LoadCancelled(self.thread_name), '')
+                else:
+                    self.on_done(message[1])
+                return
+            else:
+                self.on_error(message[1], message[2])
+                return
+        self.tk_root.after(self.poll_ms, self._poll)
+
+
+class BackgroundLoader(BackgroundTask):
+    """在工作线程中运行 STL 加载流水线"""
+
+    thread_name = 'stl-loader'
+
+    def __init__(self, tk_root, file_path, on_progress, on_done, on_error,
+                 tolerance=VERTEX_MERGE_TOLERANCE, cache=None, lod_budget=None, build_spatial=False,
+                 store=None, point_dtype=None, poll_ms=50):
+        super().__init__(tk_root, on_progress, on_done, on_error, poll_ms)
+        self.file_path = file_path
+        self.point_dtype = point_dtype
+        self.tolerance = tolerance
+        self.cache = cache
+        self.lod_budget = lod_budget
+        self.build_spatial = build_spatial
+        self.store = store
+
+    def work(self, progress):
+        return load_stl_model(self.file_path, self.tolerance, progress=progress,
+                              cancel_event=self.cancel_event, cache=self.cache,
+                              lod_budget=self.lod_budget, build_spatial=self.build_spatial,
+                              store=self.store, point_dtype=self.point_dtype)
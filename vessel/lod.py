@@ -0,0 +1,64 @@
+"""大模型的简化显示网格（顶点聚类 LOD）
+
+按网格尺寸把顶点聚类到体素，合并后退化或重复的三角形被去掉，
+保留下来的每个显示单元都是某个原始单元，cell_ids 记录其原始单元 ID，
+因此焊缝覆盖色与拾取结果都能精确映射回全分辨率网格。
+"""
+import numpy as np
+
+from .mesh import unique_rows
+
+LOD_CELL_BUDGET = 500_000  # 超过该单元数的模型使用简化网格显示
+LOD_RESOLUTIONS = (4096, 2048, 1024, 512, 256, 128)  # 各级精度：包围盒对角线上的体素数，由细到粗
+
+
+class LodMesh:
+    """简化显示网格"""
+
+    __slots__ = ('points', 'triangles', 'cell_ids', 'resolution')
+
+    def __init__(self, points, triangles, cell_ids, resolution):
+        self.points = points
+        self.triangles = triangles
+        self.cell_ids = cell_ids      # 显示单元 -> 原始单元 ID（升序）
+        self.resolution = resolution
+
+    def __len__(self):
+        return len(self.triangles)
+
+
+def cluster_vertices(points, triangles, resolution):
+    """按体素聚类顶点，返回 LodMesh；聚类点取成员顶点的平均位置"""
+    points = np.asarray(points)
+    lower = points.min(axis=0)
+    diagonal = float(np.linalg.norm(points.max(axis=0) - lower)) or 1.0
+    voxel = diagonal / resolution
+
+    keys = np.floor((points - lower) / voxel).astype(np.int64)
+    _, cluster = unique_rows(keys)
+    counts = np.bincount(cluster)
+    cluster_points = np.empty((len(counts), 3), dtype=points.dtype)
+    for axis in range(3):
+        cluster_points[:, axis] = np.bincount(cluster, weights=points[:, axis], minlength=len(counts)) / counts
+
+    tri = cluster[triangles]
+    valid = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & (tri[:, 0] != tri[:, 2])
+    cell_ids = np.flatnonzero(valid)
+    tri = tri[valid]
+
+    # 聚类后重合的三角形只保留一个（按排序后的顶点三元组去重）
+    first, _ = unique_rows(np.sort(tri, axis=1))
+    first.sort()
+    return LodMesh(cluster_points, tri[first], cell_ids[first], resolution)
+
+
+def build_display_lod(points, triangles, budget=LOD_CELL_BUDGET, resolutions=LOD_RESOLUTIONS):
+    """选择单元数不超过 budget 的最精细一级简化网格；模型本身不超预算时返回 None"""
+    if len(triangles) <= budget:
+        return None
+    lod = None
+    for resolution in resolutions:
+        lod = cluster_vertices(points, triangles, resolution)
+        if len(lod) <= budget:
+            break
+    return lod
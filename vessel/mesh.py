@@ -0,0 +1,124 @@
+"""STL 网格转换：顶点合并、索引网格与 PyVista 面数组
+
+索引网格 (points, triangles) 是唯一的几何数据：PyVista 网格、空间索引、焊缝几何与
+质量属性都直接引用这两个数组，不再各自保存副本。
+"""
+import numpy as np
+
+VERTEX_MERGE_TOLERANCE = 1e-5  # 顶点合并容差（模型单位），<= 0 表示只合并完全重合的顶点
+MESH_INDEX_DTYPE = np.int64  # 三角形索引类型，与 VTK 的 vtkIdType 相同，PolyData 可直接引用
+
+
+def unique_rows(keys):
+    """按行去重，返回 (first_index, inverse)
+
+    整数键的取值范围允许时压缩为单个 int64 再排序，否则按字节视图去重，
+    都比 np.unique(axis=0) 快得多。唯一行的顺序不保证与数值顺序一致。
+    """
+    keys = np.ascontiguousarray(keys)
+    if keys.dtype.kind in 'iu' and len(keys):
+        lower = keys.min(axis=0)
+        span = keys.max(axis=0) - lower + 1
+        if np.prod(span.astype(np.float64)) < 2.0 ** 62:
+            packed = np.zeros(len(keys), dtype=np.int64)
+            for column in range(keys.shape[1]):
+                packed = packed * int(span[column]) + (keys[:, column] - lower[column])
+            _, first_index, inverse = np.unique(packed, return_index=True, return_inverse=True)
+            return first_index, inverse.ravel()
+    rows = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first_index, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first_index, inverse.ravel()
+
+
+def build_indexed_mesh(vectors, tolerance=VERTEX_MERGE_TOLERANCE, drop_degenerate=True):
+    """将 STL 面片顶点 (n, 3, 3) 转换为共享顶点的索引网格
+
+    按容差量化坐标后合并重合顶点，全部使用 NumPy 向量化运算。
+    返回 (points, triangles, facet_ids)：
+      points     -- (m, 3) 合并后的顶点坐标
+      triangles  -- (k, 3) 每个三角形的顶点索引
+      facet_ids  -- (k,) 每个三角形对应的原始 STL 面片序号（升序）
+    """
+    vectors = np.asarray(vectors)
+    n_facets = len(vectors)
+    flat = vectors.reshape(-1, 3)
+
+    if tolerance > 0:
+        keys = np.round(flat / tolerance).astype(np.int64)
+    else:
+        keys = flat
+    first_index, inverse = unique_rows(keys)
+
+    points = flat[first_index]
+    triangles = inverse.reshape(n_facets, 3)
+    facet_ids = np.arange(n_facets)
+
+    if drop_degenerate:
+        # 合并顶点后退化为线或点的面片不再参与显示
+        valid = ((triangles[:, 0] != triangles[:, 1]) &
+                 (triangles[:, 1] != triangles[:, 2]) &
+                 (triangles[:, 0] != triangles[:, 2]))
+        if not valid.all():
+            triangles = triangles[valid]
+            facet_ids = facet_ids[valid]
+
+    return points, triangles, facet_ids
+
+
+def triangles_to_faces(triangles):
+    """将 (k, 3) 三角形索引转换为 PyVista 的面数组 [3, i, j, k, 3, ...]"""
+    faces = np.empty((len(triangles), 4), dtype=np.int64)
+    faces[:, 0] = 3
+    faces[:, 1:] = triangles
+    return faces.ravel()
+
+
+def facets_to_cells(facet_indices, facet_ids):
+    """将原始 STL 面片序号映射为索引网格中的单元 ID，已被剔除的面片返回 -1"""
+    facet_indices = np.asarray(facet_indices, dtype=np.int64)
+    if len(facet_ids) == 0:
+        return np.full(facet_indices.shape, -1, dtype=np.int64)
+    cells = np.searchsorted(facet_ids, facet_indices)
+    cells = np.minimum(cells, len(facet_ids) - 1)
+    found = facet_ids[cells] == facet_indices
+    return np.where(found, cells, -1)
+
+
+def mesh_triangles(mesh_pv):
+    """返回三角网格的 (n_cells, 3) 顶点索引数组（VTK 连接数组的视图，不复制）"""
+    return mesh_pv.regular_faces
+
+
+def as_mesh_buffers(points, triangles, point_dtype=None):
+    """把索引网格整理为可共享的连续数组，已满足要求时不复制
+
+    point_dtype 为 None 时保持坐标精度（STL 本身是 float32），np.float32 时把
+    float64 坐标降为 float32，显示与分析时顶点内存减半。
+    """
+    points = np.ascontiguousarray(points, dtype=point_dtype)
+    triangles = np.ascontiguousarray(triangles, dtype=MESH_INDEX_DTYPE)
+    return points, triangles
+
+
+def face_normals(points, triangles):
+    """批量计算单位面法向，退化面片为 NaN"""
+    p0 = points[triangles[:, 0]].astype(np.float64)
+    normals = np.cross(points[triangles[:, 1]] - p0, points[triangles[:, 2]] - p0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normals /= np.linalg.norm(normals, axis=1)[:, None]
+    return normals
+
+
+def to_polydata(points, triangles, facet_ids=None):
+    """由索引网格构造 PyVista PolyData（按需导入 PyVista）
+
+    顶点与连接数组直接引用 points / triangles（见 as_mesh_buffers），不复制；
+    调用方不应再原地修改这两个数组。
+    """
+    import pyvista as pv
+
+    points, triangles = as_mesh_buffers(points, triangles)
+    mesh_pv = pv.PolyData.from_regular_faces(points, triangles, deep=False)
+    if facet_ids is not None:
+        mesh_pv.cell_data['facet_id'] = facet_ids  # 单元 -> 原始面片序号
+    return mesh_pv
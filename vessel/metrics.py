@@ -0,0 +1,119 @@
+"""全部焊缝几何指标的批量计算
+
+把所有焊缝的 (焊缝, 顶点) 对一次性展开排序，再用 bincount / ufunc.reduceat
+做分段归约，协方差矩阵用批量 eigh 分解，不再逐条焊缝提取子网格。
+"""
+import csv
+import json
+
+import numpy as np
+
+from .trace import traced
+from .welds import WeldTable, weld_segments
+
+METRIC_FIELDS = ['file', 'weld', 'cells', 'strength', 'status',
+                 'xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax', 'max_dim',
+                 'cx', 'cy', 'cz', 'eig1', 'eig2', 'eig3']
+
+
+class WeldMetrics(WeldTable):
+    """按列存放的焊缝指标，第 i 行对应 names[i]
+
+    bounds 与 PCA 基于焊缝单元去重后的顶点，和 extract_cells 子网格的结果一致；
+    cell_center 是焊缝单元中心的平均值。没有单元的焊缝对应行为 NaN。
+    """
+
+    __slots__ = ('point_count', 'bounds', 'max_dim', 'centroid', 'cell_center', 'eig_vals', 'eig_vecs')
+
+    def __init__(self, names, cell_count, point_count, bounds, max_dim, centroid, cell_center,
+                 eig_vals, eig_vecs):
+        super().__init__(names, cell_count)
+        self.point_count = point_count
+        self.bounds = bounds        # (W, 6): xmin, xmax, ymin, ymax, zmin, zmax
+        self.max_dim = max_dim      # (W,)
+        self.centroid = centroid    # (W, 3) 顶点平均
+        self.cell_center = cell_center  # (W, 3) 单元中心平均
+        self.eig_vals = eig_vals    # (W, 3) 降序
+        self.eig_vecs = eig_vecs    # (W, 3, 3) 第 k 列为第 k 主方向
+
+
+@traced('weld_metrics', 'metrics')
+def compute_weld_metrics(points, triangles, welds):
+    """一次向量化计算 welds（{名称: WeldRecord}）中全部焊缝的几何指标"""
+    names, cells, cell_labels, cell_count = weld_segments(welds, len(triangles))
+    n_welds = len(names)
+    n_points = len(points)
+
+    # 单元中心的分段平均
+    tri = triangles[cells]
+    centers = points[tri].astype(np.float64).mean(axis=1)
+    cell_center = np.full((n_welds, 3), np.nan)
+    has_cells = cell_count > 0
+    for axis in range(3):
+        sums = np.bincount(cell_labels, weights=centers[:, axis], minlength=n_welds)
+        cell_center[has_cells, axis] = sums[has_cells] / cell_count[has_cells]
+
+    # 每条焊缝去重后的顶点：按 (焊缝, 顶点) 键排序去重后天然按焊缝分段
+    keys = np.unique(np.repeat(cell_labels, 3).astype(np.int64) * n_points + tri.ravel())
+    point_labels = keys // n_points
+    weld_points = points[keys % n_points].astype(np.float64)
+    point_count = np.bincount(point_labels, minlength=n_welds)
+    starts = np.searchsorted(point_labels, np.flatnonzero(point_count))
+    nonempty = point_count > 0
+
+    bounds = np.full((n_welds, 6), np.nan)
+    centroid = np.full((n_welds, 3), np.nan)
+    if len(starts):
+        bounds[nonempty, 0::2] = np.minimum.reduceat(weld_points, starts, axis=0)
+        bounds[nonempty, 1::2] = np.maximum.reduceat(weld_points, starts, axis=0)
+        centroid[nonempty] = np.add.reduceat(weld_points, starts, axis=0) / point_count[nonempty, None]
+    max_dim = np.max(bounds[:, 1::2] - bounds[:, 0::2], axis=1)
+
+    # 协方差（与 np.cov 一样除以 N-1），先减去各自均值保证数值稳定
+    centered = weld_points - centroid[point_labels]
+    cov = np.zeros((n_welds, 3, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            total = np.bincount(point_labels, weights=centered[:, i] * centered[:, j], minlength=n_welds)
+            cov[:, i, j] = cov[:, j, i] = total
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov /= (point_count - 1)[:, None, None]
+
+    eig_vals = np.full((n_welds, 3), np.nan)
+    eig_vecs = np.full((n_welds, 3, 3), np.nan)
+    valid = point_count > 1
+    if valid.any():
+        vals, vecs = np.linalg.eigh(cov[valid])
+        eig_vals[valid] = vals[:, ::-1]
+        eig_vecs[valid] = vecs[:, :, ::-1]
+
+    return WeldMetrics(names, cell_count, point_count, bounds, max_dim, centroid, cell_center,
+                       eig_vals, eig_vecs)
+
+
+def metric_rows(file_name, welds, metrics):
+    """把 WeldMetrics 转为与 METRIC_FIELDS 对应的字典列表"""
+    rows = []
+    for i, name in enumerate(metrics.names):
+        record = welds[name]
+        row = {'file': file_name, 'weld': name, 'cells': int(metrics.cell_count[i]),
+               'strength': record.strength, 'status': record.status}
+        if metrics.cell_count[i]:
+            row.update(zip(('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax'), metrics.bounds[i].tolist()))
+            row['max_dim'] = float(metrics.max_dim[i])
+            row.update(zip(('cx', 'cy', 'cz'), metrics.centroid[i].tolist()))
+            row.update(zip(('eig1', 'eig2', 'eig3'), metrics.eig_vals[i].tolist()))
+        rows.append(row)
+    return rows
+
+
+def write_metrics(rows, output, fmt='csv', fields=METRIC_FIELDS):
+    """把指标行写为 CSV（Excel 可直接打开）或 JSON；fields 为 CSV 列顺序"""
+    if fmt == 'json':
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=1)
+        return
+    with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
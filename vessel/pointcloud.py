@@ -0,0 +1,451 @@
+"""点云扫描导入与配准：流式读取 PLY / XYZ、体素下采样、KD 树 ICP 配准与焊缝映射
+
+扫描仪输出的点云按块读取（二进制 PLY 内存映射、文本格式分块解析），体素下采样在读取时
+逐块完成，常驻内存只有下采样结果与一个块的工作集。配准使用网格的 CellSpatialIndex：
+每次迭代对采样点批量查询最近单元中心，以该单元所在平面为目标做点到面 ICP；
+收敛后把扫描点映射到最近单元，并按焊缝统计扫描覆盖情况。
+"""
+import io
+import os
+
+import numpy as np
+
+from .loader import BackgroundTask, LoadCancelled
+from .mesh import face_normals
+from .metrics import write_metrics
+from .trace import span, traced
+from .welds import WeldTable, weld_segments
+
+POINTCLOUD_CHUNK_POINTS = 1 << 21  # 每块点数，float32 坐标约 24 MB
+SCAN_MAP_CHUNK_POINTS = 65536  # 映射扫描点时每个线程任务处理的点数
+POINTCLOUD_SUFFIXES = ('.ply', '.xyz', '.txt', '.pts', '.csv')
+ICP_SAMPLE_POINTS = 50_000  # 每次 ICP 迭代参与求解的采样点数
+ICP_MAX_ITERATIONS = 50
+ICP_TOLERANCE = 1e-6  # 相邻两次迭代的点到面 RMSE 相对变化小于该值视为收敛
+ICP_REJECT_FACTOR = 3.0  # 未指定 max_distance 时，距离超过中位数该倍数的对应点视为外点
+SCAN_FIELDS = ['file', 'weld', 'cells', 'strength', 'status',
+               'points', 'covered_cells', 'coverage', 'mean_distance', 'max_distance']
+
+_PLY_TYPES = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+              'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+              'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+              'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+_PLY_ENDIAN = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+_TEXT_POINT_BYTES = 48  # 文本点云每行的大致字节数，用于按点数估算每次读取的块大小
+_VOXEL_KEY_BITS = 21  # 体素坐标每轴的位数，三轴压缩为一个 int64 键
+
+
+def _read_ply_header(f, file_path):
+    """解析 PLY 头部，返回 (格式, [(元素名, 数量, [(属性名, 类型) 或 (属性名, None)])], 数据起始偏移)"""
+    if f.readline().strip() != b'ply':
+        raise ValueError(f"不是 PLY 文件: {file_path}")
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError(f"PLY 头部不完整: {file_path}")
+        words = line.decode('ascii', 'replace').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'end_header':
+            return fmt, elements, f.tell()
+        if words[0] == 'format':
+            fmt = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property' and elements:
+            # 列表属性（如面片的顶点索引）长度不定，类型记为 None
+            elements[-1][2].append((words[-1], None if words[1] == 'list' else _PLY_TYPES[words[1]]))
+
+
+class PointCloudStream:
+    """按块读取点云坐标
+
+    PLY（ASCII 或二进制）只读取 vertex 元素的 x / y / z；XYZ 等文本格式每行一个点，
+    前三列为坐标，开头的非数字行与只有一列的点数行被跳过。二进制 PLY 通过内存映射按块复制，
+    文本按字节块读取后解析；chunks() 每次产生 (起始点序号, (n, 3) float32)，不会一次读入整个文件。
+    """
+
+    def __init__(self, file_path, chunk_points=POINTCLOUD_CHUNK_POINTS):
+        self.file_path = file_path
+        self.chunk_points = max(1, int(chunk_points))
+        self.n_points = None  # PLY 由头部给出，文本格式在第一次完整读取后可用
+        self._binary = None   # 二进制 PLY 的 (顶点记录 dtype, 数据偏移)
+        self._text = None     # 文本数据的 (数据偏移, 跳过行数, 列号, 分隔符)
+        if os.path.splitext(file_path)[1].lower() == '.ply':
+            self._open_ply()
+        else:
+            self._open_text()
+
+    def __len__(self):
+        if self.n_points is None:
+            self.n_points = sum(len(chunk) for _, chunk in self.chunks())
+        return self.n_points
+
+    def _open_ply(self):
+        with open(self.file_path, 'rb') as f:
+            fmt, elements, offset = _read_ply_header(f, self.file_path)
+        skip_rows = 0
+        for name, count, properties in elements:
+            if name == 'vertex':
+                break
+            if fmt in _PLY_ENDIAN:
+                if any(dtype is None for _, dtype in properties):
+                    raise ValueError(f"PLY 顶点元素之前有变长元素，无法定位顶点数据: {self.file_path}")
+                offset += count * sum(np.dtype(dtype).itemsize for _, dtype in properties)
+            skip_rows += count
+        else:
+            raise ValueError(f"PLY 文件没有 vertex 元素: {self.file_path}")
+        names = [prop for prop, _ in properties]
+        if not {'x', 'y', 'z'} <= set(names) or any(dtype is None for _, dtype in properties):
+            raise ValueError(f"PLY 顶点缺少 x / y / z 或含有列表属性: {self.file_path}")
+        self.n_points = count
+        if fmt in _PLY_ENDIAN:
+            self._binary = (np.dtype([(prop, _PLY_ENDIAN[fmt] + dtype) for prop, dtype in properties]), offset)
+        elif fmt == 'ascii':
+            self._text = (offset, skip_rows, tuple(names.index(axis) for axis in 'xyz'), None)
+        else:
+            raise ValueError(f"不支持的 PLY 格式 {fmt}: {self.file_path}")
+
+    def _open_text(self):
+        offset = 0
+        delimiter = None
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                try:
+                    values = [float(field) for field in line.replace(b',', b' ').split()]
+                except ValueError:
+                    values = []
+                if len(values) >= 3:
+                    delimiter = ',' if b',' in line else None
+                    break
+                offset += len(line)  # 表头、注释或 .pts 开头的点数行
+            else:
+                self.n_points = 0
+        self._text = (offset, 0, (0, 1, 2), delimiter)
+
+    def chunks(self):
+        return self._binary_chunks() if self._binary is not None else self._text_chunks()
+
+    def _binary_chunks(self):
+        if not self.n_points:
+            return
+        dtype, offset = self._binary
+        records = np.memmap(self.file_path, dtype=dtype, mode='r', offset=offset, shape=(self.n_points,))
+        try:
+            for start in range(0, self.n_points, self.chunk_points):
+                block = records[start:start + self.chunk_points]
+                yield start, np.stack([block['x'], block['y'], block['z']], axis=1).astype(np.float32)
+        finally:
+            del records
+
+    def _text_chunks(self):
+        if self.n_points == 0:
+            return
+        offset, skip_rows, columns, delimiter = self._text
+        block_bytes = self.chunk_points * _TEXT_POINT_BYTES
+        limit = self.n_points  # ASCII PLY 只读取 vertex 元素的行
+        start = 0
+        tail = b''
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            for _ in range(skip_rows):
+                f.readline()
+            while limit is None or start < limit:
+                block = f.read(block_bytes)
+                data = tail + block
+                if block:
+                    cut = data.rfind(b'\n') + 1
+                    data, tail = data[:cut], data[cut:]
+                if data.strip():
+                    if limit is not None and data.count(b'\n') > limit - start:
+                        data = b''.join(data.splitlines(keepends=True)[:limit - start])
+                    points = np.loadtxt(io.BytesIO(data), dtype=np.float32, delimiter=delimiter,
+                                        usecols=columns, comments='#', ndmin=2)
+                    if len(points):
+                        yield start, points
+                        start += len(points)
+                if not block:
+                    break
+        if limit is not None and start < limit:
+            raise ValueError(f"PLY 顶点数少于头部声明的 {limit}: {self.file_path}")
+        self.n_points = start
+
+
+class _VoxelAccumulator:
+    """流式体素下采样：逐块累加每个体素内点的坐标和与点数，最后取重心
+
+    体素坐标每轴压缩为 _VOXEL_KEY_BITS 位，三轴拼成一个 int64 键；块内先用 unique + bincount
+    归约，累积的部分结果超过几个块的规模时再整体归约一次，内存与输出体素数同阶。
+    """
+
+    def __init__(self, voxel_size, chunk_points=POINTCLOUD_CHUNK_POINTS):
+        self.voxel_size = float(voxel_size)
+        self.merge_rows = 4 * chunk_points
+        self._parts = []  # [(键, 坐标和 (n, 3), 点数)]
+        self._rows = 0
+
+    def add(self, points):
+        cells = np.floor(np.asarray(points, dtype=np.float64) / self.voxel_size).astype(np.int64)
+        cells += 1 << (_VOXEL_KEY_BITS - 1)
+        if len(cells) and (cells.min() < 0 or cells.max() >= 1 << _VOXEL_KEY_BITS):
+            raise ValueError(f"体素尺寸 {self.voxel_size:g} 相对点云范围过小，每轴最多 {1 << _VOXEL_KEY_BITS} 个体素")
+        keys = (cells[:, 0] << (2 * _VOXEL_KEY_BITS)) | (cells[:, 1] << _VOXEL_KEY_BITS) | cells[:, 2]
+        self._parts.append(self._reduce(keys, points, np.ones(len(keys))))
+        self._rows += len(self._parts[-1][0])
+        if self._rows > self.merge_rows and len(self._parts) > 1:
+            self._merge()
+
+    @staticmethod
+    def _reduce(keys, sums, counts):
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        n = len(unique_keys)
+        reduced = np.stack([np.bincount(inverse, weights=sums[:, axis], minlength=n) for axis in range(3)], axis=1)
+        return unique_keys, reduced, np.bincount(inverse, weights=counts, minlength=n)
+
+    def _merge(self):
+        keys, sums, counts = (np.concatenate(part) for part in zip(*self._parts))
+        self._parts = [self._reduce(keys, sums, counts)]
+        self._rows = len(keys)
+
+    def result(self):
+        """各体素内点的重心 (n, 3) float32，按体素键排序"""
+        if not self._parts:
+            return np.empty((0, 3), dtype=np.float32)
+        self._merge()
+        _, sums, counts = self._parts[0]
+        return (sums / counts[:, None]).astype(np.float32)
+
+
+@traced('read_point_cloud', 'pointcloud')
+def read_point_cloud(file_path, voxel_size=None, chunk_points=POINTCLOUD_CHUNK_POINTS, progress=None,
+                     cancel_event=None):
+    """流式读取点云，返回 (n, 3) float32 坐标；voxel_size 给出时逐块做体素下采样（取体素内重心）
+
+    progress(文本, 0~1) 每读完一块调用一次（文本格式按文件位置估算）；cancel_event 置位后抛出 LoadCancelled。
+    """
+    stream = PointCloudStream(file_path, chunk_points)
+    accumulator = _VoxelAccumulator(voxel_size, chunk_points) if voxel_size else None
+    chunks = []
+    n_read = 0
+    file_size = os.path.getsize(file_path) or 1
+    for start, points in stream.chunks():
+        if cancel_event is not None and cancel_event.is_set():
+            raise LoadCancelled(file_path)
+        with span('pointcloud_chunk', 'pointcloud', points=len(points)):
+            if accumulator is not None:
+                accumulator.add(points)
+            else:
+                chunks.append(points)
+        n_read = start + len(points)
+        if progress is not None:
+            fraction = n_read / stream.n_points if stream.n_points else min(n_read * _TEXT_POINT_BYTES / file_size, 1.0)
+            progress(f"读取点云 {n_read} 点", fraction)
+    if accumulator is not None:
+        return accumulator.result()
+    return np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.float32)
+
+
+def transform_points(points, transform, dtype=np.float32):
+    """对 (n, 3) 点施加 4×4 刚体变换"""
+    transform = np.asarray(transform, dtype=np.float64)
+    moved = np.asarray(points, dtype=np.float64) @ transform[:3, :3].T + transform[:3, 3]
+    return moved.astype(dtype, copy=False)
+
+
+def _rotation(omega):
+    """旋转向量 -> 旋转矩阵（Rodrigues 公式）"""
+    angle = float(np.linalg.norm(omega))
+    if angle < 1e-12:
+        return np.eye(3)
+    x, y, z = omega / angle
+    skew = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    return np.eye(3) + np.sin(angle) * skew + (1.0 - np.cos(angle)) * skew @ skew
+
+
+class IcpResult:
+    """ICP 配准结果：transform 为把扫描点对齐到网格的 4×4 变换
+
+    rmse 为最后一次迭代内点的点到面距离均方根，fitness 为内点比例。
+    """
+
+    __slots__ = ('transform', 'rmse', 'fitness', 'iterations', 'converged')
+
+    def __init__(self, transform, rmse, fitness, iterations, converged):
+        self.transform = transform
+        self.rmse = rmse
+        self.fitness = fitness
+        self.iterations = iterations
+        self.converged = converged
+
+
+@traced('icp', 'pointcloud')
+def register_icp(points, spatial, initial=None, max_iterations=ICP_MAX_ITERATIONS, tolerance=ICP_TOLERANCE,
+                 max_distance=None, sample_points=ICP_SAMPLE_POINTS, seed=0, workers=-1, progress=None,
+                 cancel_event=None):
+    """点到面 ICP：求把扫描点对齐到网格的刚体变换，返回 IcpResult
+
+    spatial 为网格的 CellSpatialIndex。每次迭代从 points 中固定取 sample_points 个采样点，
+    用单元中心 KD 树批量找最近单元（workers 传给 cKDTree.query），以该单元平面为目标线性化求解
+    6 自由度增量。到单元中心的距离超过 max_distance（默认中位数的 ICP_REJECT_FACTOR 倍）的点不参与求解。
+    initial 为初始 4×4 变换（默认单位阵），ICP 只在其附近收敛。
+    """
+    transform = np.eye(4) if initial is None else np.array(initial, dtype=np.float64)
+    if not len(points) or not len(spatial):
+        return IcpResult(transform, np.nan, 0.0, 0, False)
+    if len(points) > sample_points:
+        rng = np.random.default_rng(seed)
+        points = points[np.sort(rng.choice(len(points), sample_points, replace=False))]
+    source = np.asarray(points, dtype=np.float64)
+    normals = np.nan_to_num(face_normals(spatial.points, spatial.triangles))  # 退化单元不产生约束
+
+    previous = np.inf
+    rmse, fitness, converged = np.nan, 0.0, False
+    for iteration in range(1, max_iterations + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise LoadCancelled('icp')
+        moved = transform_points(source, transform, np.float64)
+        distances, cells = spatial.nearest_cells(moved, workers=workers)
+        limit = max_distance if max_distance is not None else ICP_REJECT_FACTOR * float(np.median(distances))
+        inlier = distances <= limit
+        fitness = float(inlier.mean())
+        if not inlier.any():
+            break
+
+        # 以内点重心为原点线性化，避免大坐标下方程病态
+        center = moved[inlier].mean(axis=0)
+        p = moved[inlier] - center
+        n = normals[cells[inlier]]
+        residual = np.einsum('ij,ij->i', p - (spatial.centers[cells[inlier]] - center), n)
+        rmse = float(np.sqrt(np.mean(residual * residual)))
+        solution = np.linalg.lstsq(np.hstack([np.cross(p, n), n]), -residual, rcond=None)[0]
+        rotation = _rotation(solution[:3])
+        step = np.eye(4)
+        step[:3, :3] = rotation
+        step[:3, 3] = center + solution[3:] - rotation @ center
+        transform = step @ transform
+
+        if progress is not None:
+            progress(f"ICP 第 {iteration} 次迭代，RMSE {rmse:.4g}，内点 {fitness:.1%}", iteration / max_iterations)
+        if np.isfinite(previous) and abs(previous - rmse) <= tolerance * previous:
+            converged = True
+            break
+        previous = rmse
+    return IcpResult(transform, rmse, fitness, iteration, converged)
+
+
+@traced('map_scan_points', 'pointcloud')
+def map_scan_points(points, spatial, max_distance=np.inf, chunk_points=SCAN_MAP_CHUNK_POINTS, max_workers=None,
+                    progress=None, cancel_event=None):
+    """已配准的扫描点 -> 网格单元：返回 (最近单元 ID, 到该单元三角形的精确距离)
+
+    最近单元由 CellSpatialIndex.closest_cells_chunked 分块并行求得，与逐点 closest_cell 一致；
+    距离超过 max_distance 的点单元 ID 为 -1。progress(文本, 0~1) 每完成一块调用一次；
+    cancel_event 置位后抛出 LoadCancelled。
+    """
+    cell_ids, distances, _ = spatial.closest_cells_chunked(points, chunk_points, max_workers, progress,
+                                                           cancel_event, label='映射扫描点')
+    cell_ids[distances > max_distance] = -1
+    return cell_ids, distances
+
+
+class WeldScan(WeldTable):
+    """按列存放的焊缝扫描覆盖统计，第 i 行对应 names[i]
+
+    points 为映射到焊缝单元的扫描点数，covered_cells 为至少有一个扫描点的焊缝单元数；
+    没有扫描点的焊缝距离统计为 NaN。
+    """
+
+    __slots__ = ('points', 'covered_cells', 'mean_distance', 'max_distance')
+
+    def __init__(self, names, cell_count, points, covered_cells, mean_distance, max_distance):
+        super().__init__(names, cell_count)
+        self.points = points
+        self.covered_cells = covered_cells
+        self.mean_distance = mean_distance
+        self.max_distance = max_distance
+
+
+@traced('weld_scan', 'pointcloud')
+def compute_weld_scan(cell_ids, distances, welds, n_cells):
+    """按焊缝（{名称: WeldRecord}）汇总 map_scan_points 的结果，返回 WeldScan"""
+    mapped = cell_ids >= 0
+    cells_hit, hit_distances = cell_ids[mapped], distances[mapped]
+    cell_points = np.bincount(cells_hit, minlength=n_cells)
+    cell_distance = np.bincount(cells_hit, weights=hit_distances, minlength=n_cells)
+    cell_max = np.full(n_cells, -np.inf)
+    np.maximum.at(cell_max, cells_hit, hit_distances)
+
+    names, cells, labels, cell_count = weld_segments(welds, n_cells)
+    n_welds = len(names)
+
+    points = np.bincount(labels, weights=cell_points[cells], minlength=n_welds).astype(np.int64)
+    covered = np.bincount(labels, weights=(cell_points[cells] > 0).astype(np.float64), minlength=n_welds).astype(np.int64)
+    mean_distance = np.full(n_welds, np.nan)
+    max_distance = np.full(n_welds, np.nan)
+    scanned = points > 0
+    if scanned.any():
+        mean_distance[scanned] = (np.bincount(labels, weights=cell_distance[cells], minlength=n_welds)[scanned]
+                                  / points[scanned])
+        nonempty = cell_count > 0
+        starts = (np.cumsum(cell_count) - cell_count)[nonempty]  # 单元按焊缝顺序拼接，天然分段
+        segment_max = np.full(n_welds, -np.inf)
+        segment_max[nonempty] = np.maximum.reduceat(cell_max[cells], starts)
+        max_distance[scanned] = segment_max[scanned]
+    return WeldScan(names, cell_count, points, covered, mean_distance, max_distance)
+
+
+def scan_rows(file_name, welds, stats):
+    """把 WeldScan 转为与 SCAN_FIELDS 对应的字典列表"""
+    rows = []
+    for i, name in enumerate(stats.names):
+        record = welds[name]
+        cells = int(stats.cell_count[i])
+        row = {'file': file_name, 'weld': name, 'cells': cells, 'strength': record.strength,
+               'status': record.status, 'points': int(stats.points[i]),
+               'covered_cells': int(stats.covered_cells[i]),
+               'coverage': float(stats.covered_cells[i] / cells) if cells else 0.0}
+        if stats.points[i]:
+            row.update(mean_distance=float(stats.mean_distance[i]), max_distance=float(stats.max_distance[i]))
+        rows.append(row)
+    return rows
+
+
+def write_scan(rows, output, fmt='csv'):
+    """把焊缝扫描覆盖统计行写为 CSV 或 JSON"""
+    write_metrics(rows, output, fmt, fields=SCAN_FIELDS)
+
+
+class ScanRegistrationTask(BackgroundTask):
+    """在工作线程中读取点云、ICP 配准到当前网格并映射到焊缝单元
+
+    结果为 (配准后的点 float32, 单元 ID, 距离, IcpResult, WeldScan)。
+    """
+
+    thread_name = 'scan-registration'
+
+    def __init__(self, tk_root, scan_path, spatial, welds, on_progress, on_done, on_error,
+                 voxel_size=None, initial=None, max_distance=None, poll_ms=50):
+        super().__init__(tk_root, on_progress, on_done, on_error, poll_ms)
+        self.scan_path = scan_path
+        self.spatial = spatial
+        self.welds = dict(welds)  # 工作线程只读快照
+        self.voxel_size = voxel_size
+        self.initial = initial
+        self.max_distance = max_distance
+
+    def work(self, progress):
+        points = read_point_cloud(self.scan_path, self.voxel_size,
+                                  progress=lambda label, value: progress(label, 0.4 * value),
+                                  cancel_event=self.cancel_event)
+        result = register_icp(points, self.spatial, self.initial, max_distance=self.max_distance,
+                              progress=lambda label, value: progress(label, 0.4 + 0.5 * value),
+                              cancel_event=self.cancel_event)
+        aligned = transform_points(points, result.transform)
+        limit = np.inf if self.max_distance is None else self.max_distance
+        cell_ids, distances = map_scan_points(aligned, self.spatial, limit,
+                                              progress=lambda label, value: progress(label, 0.9 + 0.1 * value),
+                                              cancel_event=self.cancel_event)
+        stats = compute_weld_scan(cell_ids, distances, self.welds, len(self.spatial))
+        return aligned, cell_ids, distances, result, stats
@@ -0,0 +1,187 @@
+"""面片质量场：单位法向、面积、长宽比、最小内角与离散曲率
+
+逐面片的量按块在线程池中计算（NumPy 的大数组运算释放 GIL）；曲率需要跨面片的
+信息，用 bincount 对顶点与相邻面片对做一次分段归约。结果按列存放，可直接作为
+PyVista 单元数组着色，也可用 mask 按范围筛选单元。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .adjacency import FacetAdjacency
+from .loader import BackgroundTask, LoadCancelled
+from .trace import traced
+
+QUALITY_CHUNK_CELLS = 1 << 20  # 每个线程任务处理的面片数
+QUALITY_NORMAL_ARRAY = 'normal'
+QUALITY_ASPECT_LIMIT = 5.0  # 长宽比超过此值视为劣质面片
+QUALITY_FIELDS = ('area', 'aspect_ratio', 'min_angle', 'mean_curvature', 'gaussian_curvature')
+
+
+class FacetQuality:
+    """按列存放的面片质量，第 i 行对应单元 i；退化面片的法向、长宽比与曲率为 NaN
+
+    aspect_ratio = 最长边 × 周长 / (4√3 × 面积)，等边三角形为 1；min_angle 为角度制。
+    mean_curvature 由相邻面片的二面角 × 公共边长估计（外法向下凸为正），
+    gaussian_curvature 取三个顶点角亏密度的平均（边界顶点记为 0）。
+    """
+
+    __slots__ = QUALITY_FIELDS + ('normals',)
+
+    def __init__(self, normals, area, aspect_ratio, min_angle, mean_curvature, gaussian_curvature):
+        self.normals = normals
+        self.area = area
+        self.aspect_ratio = aspect_ratio
+        self.min_angle = min_angle
+        self.mean_curvature = mean_curvature
+        self.gaussian_curvature = gaussian_curvature
+
+    def __len__(self):
+        return len(self.area)
+
+    def field(self, name):
+        if name == QUALITY_NORMAL_ARRAY:
+            return self.normals
+        if name not in QUALITY_FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def mask(self, **ranges):
+        """按范围筛选单元，如 mask(aspect_ratio=(None, 5), area=(1e-6, None))；NaN 视为不满足"""
+        selected = np.ones(len(self), dtype=bool)
+        for name, (low, high) in ranges.items():
+            values = self.field(name)
+            if low is not None:
+                selected &= values >= low
+            if high is not None:
+                selected &= values <= high
+        return selected
+
+    def add_to(self, mesh_pv, cell_ids=None):
+        """写入 mesh_pv 的单元数组；cell_ids 为简化显示网格的 显示单元 -> 原始单元 映射"""
+        for name in (QUALITY_NORMAL_ARRAY,) + QUALITY_FIELDS:
+            values = self.field(name)
+            mesh_pv.cell_data[name] = values if cell_ids is None else values[cell_ids]
+
+
+def _facet_chunk(points, triangles, start, stop, out):
+    """计算 [start, stop) 面片的法向、面积、长宽比、内角与中心，写入 out 中的各数组"""
+    p0, p1, p2 = (points[triangles[start:stop, k]].astype(np.float64) for k in range(3))
+    edges = (p1 - p0, p2 - p1, p0 - p2)
+    lengths = np.stack([np.linalg.norm(edge, axis=1) for edge in edges], axis=1)
+    cross = np.cross(edges[0], -edges[2])
+    double_area = np.linalg.norm(cross, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['normals'][start:stop] = cross / double_area[:, None]
+        out['aspect_ratio'][start:stop] = (lengths.max(axis=1) * lengths.sum(axis=1)
+                                           / (2.0 * np.sqrt(3.0) * double_area))
+    out['area'][start:stop] = 0.5 * double_area
+    # 顶点 k 处的内角：夹在两条出边之间，用 atan2(|叉积|, 点积) 对细长三角形也稳定
+    for k, (u, v) in enumerate(((edges[0], -edges[2]), (edges[1], -edges[0]), (edges[2], -edges[1]))):
+        out['angles'][start:stop, k] = np.arctan2(double_area, np.einsum('ij,ij->i', u, v))
+    out['min_angle'][start:stop] = np.degrees(out['angles'][start:stop].min(axis=1))
+    out['centers'][start:stop] = (p0 + p1 + p2) / 3.0
+
+
+def _boundary_vertices(triangles, n_points):
+    """只属于一个面片的边上的顶点"""
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]).astype(np.int64)
+    edges.sort(axis=1)
+    keys, counts = np.unique(edges[:, 0] * n_points + edges[:, 1], return_counts=True)
+    boundary = np.zeros(n_points, dtype=bool)
+    single = keys[counts == 1]
+    boundary[single // n_points] = True
+    boundary[single % n_points] = True
+    return boundary
+
+
+@traced('facet_quality', 'quality')
+def compute_facet_quality(points, triangles, adjacency=None, chunk_cells=QUALITY_CHUNK_CELLS, max_workers=None,
+                          progress=None, cancel_event=None):
+    """一次计算全部面片的质量场，返回 FacetQuality
+
+    adjacency 为 FacetAdjacency（没有时现建）；面片数超过 chunk_cells 时分块交给线程池。
+    progress(文本, 0~1) 在每块面片与每个曲率场开始时调用；cancel_event 置位后在下一步之前抛出 LoadCancelled。
+    """
+    def step(label, value):
+        if cancel_event is not None and cancel_event.is_set():
+            raise LoadCancelled('facet_quality')
+        if progress is not None:
+            progress(label, value)
+
+    n_cells = len(triangles)
+    n_points = len(points)
+    out = {'normals': np.empty((n_cells, 3)), 'area': np.empty(n_cells), 'aspect_ratio': np.empty(n_cells),
+           'min_angle': np.empty(n_cells), 'angles': np.empty((n_cells, 3)), 'centers': np.empty((n_cells, 3))}
+
+    def run(start):
+        if cancel_event is None or not cancel_event.is_set():
+            _facet_chunk(points, triangles, start, min(start + chunk_cells, n_cells), out)
+
+    label = '计算面积、长宽比与最小内角'
+    step(label, 0.0)
+    starts = range(0, n_cells, chunk_cells)
+    if len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [executor.submit(run, start) for start in starts]
+            for done, future in enumerate(futures, 1):
+                future.result()
+                step(f"{label} ({done}/{len(futures)})", 0.5 * done / len(futures))
+    elif n_cells:
+        run(0)
+    area, normals = out['area'], out['normals']
+
+    step('计算高斯曲率', 0.5)
+    # 高斯曲率：顶点角亏 2π - Σ内角，除以顶点分到的面积（相邻面片面积的 1/3）
+    corners = triangles.ravel()
+    angle_sum = np.bincount(corners, weights=out['angles'].ravel(), minlength=n_points)
+    vertex_area = np.bincount(corners, weights=np.repeat(area, 3), minlength=n_points) / 3.0
+    deficit = 2.0 * np.pi - angle_sum
+    deficit[_boundary_vertices(triangles, n_points)] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vertex_curvature = deficit / vertex_area
+    gaussian = vertex_curvature[triangles].mean(axis=1) if n_cells else np.empty(0)
+
+    # 平均曲率：公共边上的积分平均曲率为 θ·e/2，两侧面片各分一半，再除以面片面积
+    if adjacency is None:
+        step('构建面片相邻图', 0.65)
+        adjacency = FacetAdjacency.from_triangles(triangles)
+    step('计算平均曲率', 0.8)
+    a, b = adjacency.face_a, adjacency.face_b
+    ta, tb = triangles[a], triangles[b]
+    shared = (ta[:, :, None] == tb[:, None, :]).any(axis=2)  # ta 中同属 tb 的两个顶点即公共边
+    rows = np.arange(len(a))
+    first, last = ta[rows, np.argmax(shared, axis=1)], ta[rows, 2 - np.argmax(shared[:, ::-1], axis=1)]
+    edge_length = np.linalg.norm(points[last].astype(np.float64) - points[first], axis=1)
+    theta = np.arccos(np.clip(np.einsum('ij,ij->i', normals[a], normals[b]), -1.0, 1.0))
+    convex = np.einsum('ij,ij->i', normals[b] - normals[a], out['centers'][b] - out['centers'][a]) >= 0
+    edge_curvature = np.nan_to_num(np.where(convex, theta, -theta) * edge_length / 4.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (np.bincount(a, weights=edge_curvature, minlength=n_cells)
+                + np.bincount(b, weights=edge_curvature, minlength=n_cells)) / area
+    degenerate = area <= 0
+    mean[degenerate] = np.nan
+    gaussian[degenerate] = np.nan
+    step('面片质量计算完成', 1.0)
+
+    return FacetQuality(normals, area, out['aspect_ratio'], out['min_angle'], mean, gaussian)
+
+
+class QualityTask(BackgroundTask):
+    """在工作线程中计算面片质量场，结果为 FacetQuality"""
+
+    thread_name = 'facet-quality'
+
+    def __init__(self, tk_root, points, triangles, on_progress, on_done, on_error, adjacency=None,
+                 max_workers=None, poll_ms=50):
+        super().__init__(tk_root, on_progress, on_done, on_error, poll_ms)
+        self.points = points
+        self.triangles = triangles
+        self.adjacency = adjacency
+        self.max_workers = max_workers
+
+    def work(self, progress):
+        return compute_facet_quality(self.points, self.triangles, adjacency=self.adjacency,
+                                     max_workers=self.max_workers, progress=progress,
+                                     cancel_event=self.cancel_event)
@@ -0,0 +1,200 @@
+"""焊缝检测报告：多进程离屏渲染每条焊缝的截图，并与焊缝指标表一起写出
+
+主进程一次向量化计算全部焊缝的指标与相机参数（见 metrics.py），并用单元空间索引
+取出每条焊缝包围盒附近的周边单元，把索引网格写成临时 .npy 文件；每个工作进程内存
+映射读取网格并复用一个离屏 Plotter，只渲染焊缝本身与周边单元，因此单张截图的代价
+与模型规模无关，吞吐量随进程数线性增长。
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .loader import BackgroundTask, LoadCancelled
+from .mesh import to_polydata
+from .metrics import METRIC_FIELDS, compute_weld_metrics, metric_rows, write_metrics
+from .spatial import CellSpatialIndex
+from .trace import traced
+from .welds import weld_segments
+
+REPORT_IMAGE_SIZE = (800, 600)  # 截图尺寸（宽, 高）
+REPORT_BATCH_WELDS = 32  # 每个进程任务渲染的焊缝数
+REPORT_CONTEXT_MARGIN = 0.5  # 周边网格范围：焊缝包围盒各向外扩 max_dim 的倍数
+REPORT_FRAME_MARGIN = 1.15  # 画面中焊缝投影外留白的比例
+REPORT_CONTEXT_COLOR = 'lightgrey'
+REPORT_POLL_SECONDS = 0.1  # 等待渲染结果时检查取消的间隔
+REPORT_FIELDS = METRIC_FIELDS + ['image']
+REPORT_TABLE_NAME = 'weld_report'
+
+_UNSAFE_FILE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+_worker = {}  # 工作进程内的网格与离屏 Plotter，由 _init_worker 填充
+
+
+def weld_cameras(points, triangles, welds, metrics, aspect):
+    """按焊缝的 PCA 主方向取景，返回 (焦点, 相机位置, 上方向, 平行投影半高) 四个 (W, ...) 数组
+
+    视线沿最小主方向（焊缝所在面的法向），并翻到单元面积加权平均法向一侧，
+    最大主方向水平、第二主方向竖直；焦点取包围盒中心，平行投影半高取包围盒在两个方向上投影宽度的一半，
+    留出 REPORT_FRAME_MARGIN 的边距。主方向无效（点数不足）的焊缝用等轴测视角。
+    """
+    n_welds = len(metrics)
+    _, cells, labels, _ = weld_segments(welds, len(triangles))
+    corners = points[triangles[cells]].astype(np.float64)
+    area_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    mean_normal = np.stack([np.bincount(labels, weights=area_normals[:, axis], minlength=n_welds)
+                            for axis in range(3)], axis=1)
+
+    right = metrics.eig_vecs[:, :, 0].copy()
+    up = metrics.eig_vecs[:, :, 1].copy()
+    view = metrics.eig_vecs[:, :, 2].copy()
+    invalid = ~np.isfinite(view).all(axis=1)
+    right[invalid] = np.array([1.0, -1.0, 0.0]) / np.sqrt(2.0)
+    up[invalid] = np.array([-1.0, -1.0, 2.0]) / np.sqrt(6.0)
+    view[invalid] = np.array([1.0, 1.0, 1.0]) / np.sqrt(3.0)
+    flip = np.einsum('ij,ij->i', view, mean_normal) < 0
+    view[flip] *= -1.0
+    right[flip] *= -1.0  # 保持右手系，画面不镜像
+
+    size = np.nan_to_num(metrics.bounds[:, 1::2] - metrics.bounds[:, 0::2])
+    width = np.einsum('ij,ij->i', np.abs(right), size)
+    height = np.einsum('ij,ij->i', np.abs(up), size)
+    scale = 0.5 * REPORT_FRAME_MARGIN * np.maximum(height, width / aspect)
+    max_dim = np.nan_to_num(metrics.max_dim)
+    scale[scale <= 0] = 0.5 * REPORT_FRAME_MARGIN * np.maximum(max_dim[scale <= 0], 1.0)
+
+    focal = np.nan_to_num(0.5 * (metrics.bounds[:, 0::2] + metrics.bounds[:, 1::2]))  # 包围盒中心，画面上下左右对称
+    position = focal + view * (2.0 * max_dim + 1.0)[:, None]
+    return focal, position, up, scale
+
+
+def _safe_file_name(name):
+    return _UNSAFE_FILE_CHARS.sub('_', name).strip('._') or 'weld'
+
+
+def _init_worker(mesh_dir, image_size):
+    """工作进程初始化：内存映射读取网格，建立离屏 Plotter（每个进程只做一次）"""
+    import pyvista as pv
+
+    points = np.load(os.path.join(mesh_dir, 'points.npy'), mmap_mode='r')
+    triangles = np.load(os.path.join(mesh_dir, 'triangles.npy'), mmap_mode='r')
+    plotter = pv.Plotter(off_screen=True, window_size=list(image_size))
+    plotter.set_background('white')
+    plotter.enable_parallel_projection()
+    _worker.update(points=points, triangles=triangles, plotter=plotter)
+
+
+def _submesh(points, triangles, cells):
+    """单元子集构成的紧凑 PolyData（只带用到的顶点）"""
+    point_ids, inverse = np.unique(triangles[cells], return_inverse=True)
+    return to_polydata(np.ascontiguousarray(points[point_ids]), inverse.reshape(-1, 3).astype(np.int64))
+
+
+def _render_batch(jobs):
+    """渲染一批焊缝截图，返回渲染数"""
+    points, triangles, plotter = _worker['points'], _worker['triangles'], _worker['plotter']
+    for image_path, cells, color, context, focal, position, up, scale in jobs:
+        if len(context):
+            plotter.add_mesh(_submesh(points, triangles, context), color=REPORT_CONTEXT_COLOR,
+                             show_edges=False, name='context', render=False)
+        else:
+            plotter.remove_actor('context', render=False)
+        plotter.add_mesh(_submesh(points, triangles, cells), color=color, show_edges=True, name='weld',
+                         render=False)
+        camera = plotter.camera
+        camera.focal_point = focal
+        camera.position = position
+        camera.up = up
+        camera.parallel_scale = scale
+        plotter.reset_camera_clipping_range()
+        plotter.screenshot(image_path)  # 每条焊缝只在截图时渲染一次
+    return len(jobs)
+
+
+@traced('weld_report', 'report')
+def render_weld_report(points, triangles, welds, output_dir, file_name='', fmt='csv',
+                       image_size=REPORT_IMAGE_SIZE, max_workers=None, batch_welds=REPORT_BATCH_WELDS,
+                       progress=None, cancel_event=None, spatial=None):
+    """用进程池离屏渲染 welds（{名称: WeldRecord}）中每条焊缝的截图，返回指标表路径
+
+    截图写到 output_dir，指标表 weld_report.<fmt> 的 image 列为截图文件名（没有单元的焊缝为空）。
+    spatial 为模型的 CellSpatialIndex（未给出时临时构建），用于在主进程取各焊缝的周边单元。
+    progress(文本, 0~1) 每完成一批调用；cancel_event 置位后抛出 LoadCancelled，
+    排队的批次随即丢弃，不等待正在渲染的批次。
+    工作进程用 spawn 方式启动，不继承调用方（GUI）的 VTK / Qt 状态。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_cells = len(triangles)
+    metrics = compute_weld_metrics(points, triangles, welds)
+    focal, position, up, scale = weld_cameras(points, triangles, welds, metrics, image_size[0] / image_size[1])
+    pad = REPORT_CONTEXT_MARGIN * np.nan_to_num(metrics.max_dim)
+
+    rows = metric_rows(file_name, welds, metrics)
+    jobs = []
+    for i, (name, row) in enumerate(zip(metrics.names, rows)):
+        row['image'] = ''
+        if not metrics.cell_count[i]:
+            continue
+        if spatial is None:
+            spatial = CellSpatialIndex(points, triangles)
+        row['image'] = f'{i + 1:05d}_{_safe_file_name(name)}.png'
+        cells = welds[name].cells.clip(n_cells).to_array()
+        context_box = metrics.bounds[i] + np.repeat(pad[i], 6) * np.tile([-1.0, 1.0], 3)
+        context = np.setdiff1d(spatial.cells_in_box(context_box), cells, assume_unique=True)
+        jobs.append((os.path.join(output_dir, row['image']), cells, welds[name].color, context,
+                     focal[i], position[i], up[i], float(scale[i])))
+
+    if jobs:
+        # 取消时工作进程可能仍在映射网格文件，清理失败（Windows）不影响结果
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as mesh_dir:
+            np.save(os.path.join(mesh_dir, 'points.npy'), np.ascontiguousarray(points))
+            np.save(os.path.join(mesh_dir, 'triangles.npy'), np.ascontiguousarray(triangles))
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=_init_worker, initargs=(mesh_dir, tuple(image_size)))
+            try:
+                pending = {executor.submit(_render_batch, jobs[start:start + batch_welds])
+                           for start in range(0, len(jobs), batch_welds)}
+                rendered = 0
+                while pending:
+                    # 限时等待，批次较大时也能及时响应取消
+                    done, pending = wait(pending, timeout=REPORT_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise LoadCancelled(output_dir)
+                    for future in done:
+                        rendered += future.result()
+                    if done and progress is not None:
+                        progress(f"已渲染 {rendered}/{len(jobs)} 条焊缝", rendered / len(jobs))
+            except BaseException:
+                # 取消或出错时丢弃排队的批次，不等待正在渲染的批次完成
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            executor.shutdown()
+
+    table = os.path.join(output_dir, f'{REPORT_TABLE_NAME}.{fmt}')
+    write_metrics(rows, table, fmt, fields=REPORT_FIELDS)
+    return table
+
+
+class ReportTask(BackgroundTask):
+    """在工作线程中调度焊缝报告渲染（实际渲染在进程池中进行），结果为指标表路径"""
+
+    thread_name = 'weld-report'
+
+    def __init__(self, tk_root, points, triangles, welds, output_dir, on_progress, on_done, on_error,
+                 file_name='', fmt='csv', max_workers=None, spatial=None, poll_ms=50):
+        super().__init__(tk_root, on_progress, on_done, on_error, poll_ms)
+        self.points = points
+        self.triangles = triangles
+        self.welds = dict(welds)  # 工作线程只读快照
+        self.output_dir = output_dir
+        self.file_name = file_name
+        self.fmt = fmt
+        self.max_workers = max_workers
+        self.spatial = spatial
+
+    def work(self, progress):
+        return render_weld_report(self.points, self.triangles, self.welds, self.output_dir, self.file_name,
+                                  self.fmt, max_workers=self.max_workers, progress=progress,
+                                  cancel_event=self.cancel_event, spatial=self.spatial)
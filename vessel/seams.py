@@ -0,0 +1,74 @@
+"""基于面片相邻关系与二面角的角焊缝检测"""
+import numpy as np
+
+from .adjacency import FacetAdjacency
+from .mesh import face_normals
+from .trace import traced
+from .welds import WeldCells, WeldRecord
+
+CORNER_ANGLE_THRESHOLD = 30.0  # 角焊缝检测的二面角阈值（度）
+CORNER_MIN_CELLS = 4  # 角焊缝最少单元数，更小的区域视为噪声
+CORNER_GROW_RINGS = 1  # 折角边两侧面片向外扩展的圈数
+CORNER_WELD_PREFIX = '角焊缝'
+
+
+@traced('corner_seams', 'extract')
+def detect_corner_seams(points, triangles, angle_threshold=CORNER_ANGLE_THRESHOLD,
+                        min_cells=CORNER_MIN_CELLS, grow_rings=CORNER_GROW_RINGS, adjacency=None):
+    """按二面角检测角焊缝
+
+    法向夹角超过阈值的共享边视为折角边，折角边两侧的面片组成焊缝区域，
+    向外扩展 grow_rings 圈相邻面片后按相邻关系分割为连续的焊缝。
+    adjacency 为已构建的 FacetAdjacency 时直接复用，否则临时构建。
+    返回 [(单元数组, 平均折角(度)), ...]，按单元数降序。
+    """
+    if adjacency is None:
+        adjacency = FacetAdjacency.from_triangles(triangles)
+    face_a, face_b = adjacency.face_a, adjacency.face_b
+    normals = face_normals(points, triangles)
+    cos_angle = np.einsum('ij,ij->i', normals[face_a], normals[face_b])
+    with np.errstate(invalid='ignore'):
+        angles = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+        sharp = angles > angle_threshold
+
+    seam_mask = np.zeros(len(triangles), dtype=bool)
+    seam_mask[face_a[sharp]] = True
+    seam_mask[face_b[sharp]] = True
+    # 折角边两侧的面片沿焊缝方向往往只共享顶点，扩展一圈后才能连成连续区域
+    seam_mask = adjacency.grow(seam_mask, grow_rings)
+    labels = adjacency.components(seam_mask)
+
+    seam_cells = np.flatnonzero(seam_mask)
+    seam_labels = labels[seam_cells]
+    order = np.argsort(seam_labels, kind='stable')
+    seam_cells = seam_cells[order]
+    seam_labels = seam_labels[order]
+    uniques, starts, counts = np.unique(seam_labels, return_index=True, return_counts=True)
+
+    # 每条焊缝的平均折角：按折角边所属分量累加
+    sharp_labels = labels[face_a[sharp]]
+    angle_sum = np.bincount(np.searchsorted(uniques, sharp_labels), weights=angles[sharp],
+                            minlength=len(uniques))
+    angle_count = np.bincount(np.searchsorted(uniques, sharp_labels), minlength=len(uniques))
+
+    seams = []
+    for k in np.argsort(counts, kind='stable')[::-1]:
+        if counts[k] < min_cells:
+            break
+        mean_angle = angle_sum[k] / angle_count[k] if angle_count[k] else 0.0
+        seams.append((seam_cells[starts[k]:starts[k] + counts[k]], float(mean_angle)))
+    return seams
+
+
+def build_corner_weld_data(points, triangles, **options):
+    """检测角焊缝并生成焊缝记录 {'角焊缝1': WeldRecord, ...}，options 透传给 detect_corner_seams"""
+    welds = {}
+    for i, (cells, mean_angle) in enumerate(detect_corner_seams(points, triangles, **options), start=1):
+        welds[f'{CORNER_WELD_PREFIX}{i}'] = WeldRecord(
+            cells=WeldCells.from_ids(cells),
+            strength=round(0.6 + 0.05 * (i % 5), 2),
+            status='正常' if i % 3 != 0 else '需检查',
+            color='magenta' if i % 2 == 0 else 'cyan',
+            info=f'自动检测的角焊缝{i}，平均折角 {mean_angle:.1f}°'
+        )
+    return welds
@@ -0,0 +1,274 @@
+"""常驻分析服务：模型、焊缝表与空间索引常驻内存，通过本机 HTTP 接口回答查询
+
+每个模型只加载一次（复用网格缓存与焊缝数据库），焊缝指标在第一次查询时一次向量化算出；
+请求交给固定大小的线程池并发处理，查询只读共享的 NumPy 数组与 KD 树，不需要加锁。
+默认只监听 127.0.0.1。接口均返回 JSON，路径中的焊缝名按 URL 编码：
+
+    GET    /models                                   已加载的模型
+    POST   /models            {"path": ..., "id": ...}  加载 STL（id 默认取文件名）
+    DELETE /models/<id>                              卸载模型
+    GET    /models/<id>/welds                        焊缝列表（名称、单元数、强度、状态）
+    GET    /models/<id>/metrics                      全部焊缝的几何指标（METRIC_FIELDS）
+    GET    /models/<id>/welds/<名称>                 单条焊缝的几何指标
+    GET    /models/<id>/cells/<单元 ID>              覆盖该单元的焊缝
+    POST   /models/<id>/cells     {"cells": [...]}   批量查询，每个单元一个焊缝名列表
+    GET    /models/<id>/closest?point=x,y,z&k=1      最近单元与最近的 k 条焊缝（点到三角形的精确距离）
+    GET    /models/<id>/region?box=xmin,xmax,ymin,ymax,zmin,zmax 或 ?sphere=x,y,z,r   区域内的焊缝
+"""
+import json
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from .loader import load_stl_model
+from .mesh import VERTEX_MERGE_TOLERANCE
+from .metrics import compute_weld_metrics, metric_rows
+from .seams import build_corner_weld_data
+from .trace import span
+from .welds import WeldCellIndex
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_WORKERS = 8  # 并发处理请求的线程数
+
+
+class NotFound(LookupError):
+    """请求的路径、模型或焊缝不存在，对应 HTTP 404"""
+
+
+class ServedModel:
+    """常驻内存的一个模型；焊缝指标在第一次请求时计算并缓存"""
+
+    __slots__ = ('model_id', 'model', '_rows', '_lock')
+
+    def __init__(self, model_id, model):
+        self.model_id = model_id
+        self.model = model
+        self._rows = None  # 焊缝名 -> 指标行（metric_rows）
+        self._lock = threading.Lock()
+
+    def summary(self):
+        return {'id': self.model_id, 'file': self.model.file_path, 'cells': len(self.model.triangles),
+                'points': len(self.model.points), 'welds': len(self.model.weld_data)}
+
+    def metric_rows(self):
+        if self._rows is None:
+            with self._lock:
+                if self._rows is None:
+                    model = self.model
+                    metrics = compute_weld_metrics(model.points, model.triangles, model.weld_data)
+                    rows = metric_rows(os.path.basename(model.file_path), model.weld_data, metrics)
+                    self._rows = {row['weld']: row for row in rows}
+        return self._rows
+
+
+class AnalysisSession:
+    """服务端状态：已加载的模型 {id: ServedModel}
+
+    加载串行进行（大模型加载本身已占满内存带宽），查询与加载互不阻塞；
+    查询方法找不到模型或焊缝时抛出 NotFound，参数不合法时抛出 ValueError。
+    """
+
+    def __init__(self, tolerance=VERTEX_MERGE_TOLERANCE, cache=None, store=None, corner_welds=False):
+        self.tolerance = tolerance
+        self.cache = cache
+        self.store = store
+        self.corner_welds = corner_welds
+        self._models = {}
+        self._load_lock = threading.Lock()
+
+    def load(self, path, model_id=None):
+        """加载 STL 并常驻内存，返回模型摘要；同一 id 已加载同一文件时直接返回"""
+        model_id = model_id or os.path.splitext(os.path.basename(path))[0]
+        with self._load_lock:
+            served = self._models.get(model_id)
+            if served is not None and os.path.abspath(served.model.file_path) == os.path.abspath(path):
+                return served.summary()
+            if not os.path.isfile(path):
+                raise ValueError(f"文件不存在: {path}")
+            with span('server_load', 'server', model=model_id):
+                model = load_stl_model(path, self.tolerance, cache=self.cache, store=self.store,
+                                       build_polydata=False, build_spatial=True)
+                if self.corner_welds:
+                    model.weld_data.update(build_corner_weld_data(model.points, model.triangles,
+                                                                  adjacency=model.adjacency))
+                    model.weld_index = WeldCellIndex.from_weld_data(len(model.triangles), model.weld_data)
+            self._models[model_id] = ServedModel(model_id, model)  # 整体替换，正在进行的查询仍持有旧模型
+            return self._models[model_id].summary()
+
+    def unload(self, model_id):
+        if self._models.pop(model_id, None) is None:
+            raise NotFound(f"模型 {model_id}")
+        return {'id': model_id}
+
+    def get(self, model_id):
+        served = self._models.get(model_id)
+        if served is None:
+            raise NotFound(f"模型 {model_id}")
+        return served
+
+    def models(self):
+        return [served.summary() for served in list(self._models.values())]
+
+    def welds(self, model_id):
+        weld_data = self.get(model_id).model.weld_data
+        return [{'weld': name, 'cells': len(record.cells), 'strength': record.strength, 'status': record.status}
+                for name, record in list(weld_data.items())]
+
+    def metrics(self, model_id):
+        return list(self.get(model_id).metric_rows().values())
+
+    def weld_metrics(self, model_id, weld_name):
+        row = self.get(model_id).metric_rows().get(weld_name)
+        if row is None:
+            raise NotFound(f"焊缝 {weld_name}")
+        return row
+
+    def cell_welds(self, model_id, cell_ids):
+        """每个单元的焊缝名列表；越界单元为空列表"""
+        index = self.get(model_id).model.weld_index
+        return [index.welds_at(int(cell_id)) for cell_id in cell_ids]
+
+    def closest(self, model_id, point, k=1):
+        if k <= 0:
+            raise ValueError("k 必须为正整数")
+        spatial, index = self._spatial(model_id)
+        cell_id, distance = spatial.closest_cell(point, return_distance=True)
+        return {'cell': int(cell_id), 'distance': float(distance), 'welds_at_cell': index.welds_at(int(cell_id)),
+                'nearest_welds': [{'weld': name, 'distance': d}
+                                  for name, d in spatial.closest_welds(index, point, k)]}
+
+    def region(self, model_id, box=None, sphere=None):
+        spatial, index = self._spatial(model_id)
+        if box is not None:
+            cell_ids = spatial.cells_in_box(box)
+        elif sphere is not None:
+            cell_ids = spatial.cells_in_sphere(sphere[:3], sphere[3])
+        else:
+            raise ValueError("需要 box 或 sphere 参数")
+        return {'cells': len(cell_ids), 'welds': index.welds_in(cell_ids)}
+
+    def _spatial(self, model_id):
+        model = self.get(model_id).model
+        return model.spatial, model.weld_index
+
+
+def _floats(query, name, count):
+    """查询参数 name=v1,v2,... 解析为 count 个浮点数，缺省时返回 None"""
+    if name not in query:
+        return None
+    values = [float(value) for value in query[name][0].split(',')]
+    if len(values) != count:
+        raise ValueError(f"参数 {name} 需要 {count} 个数")
+    return values
+
+
+def route(session, method, path, query, body):
+    """把一个请求分派到 AnalysisSession，返回可 JSON 序列化的结果"""
+    parts = [unquote(part) for part in path.strip('/').split('/') if part]
+    if not parts or parts[0] != 'models':
+        raise NotFound(path)
+    if len(parts) == 1:
+        if method == 'POST':
+            if 'path' not in body:
+                raise ValueError("需要 path 字段")
+            return session.load(body['path'], body.get('id'))
+        return session.models()
+
+    model_id, rest = parts[1], parts[2:]
+    if not rest:
+        if method == 'DELETE':
+            return session.unload(model_id)
+        return session.get(model_id).summary()
+    if rest == ['welds']:
+        return session.welds(model_id)
+    if rest == ['metrics']:
+        return session.metrics(model_id)
+    if rest[0] == 'welds' and len(rest) == 2:
+        return session.weld_metrics(model_id, rest[1])
+    if rest == ['cells'] and method == 'POST':
+        return session.cell_welds(model_id, body.get('cells', []))
+    if rest[0] == 'cells' and len(rest) == 2:
+        cell_id = int(rest[1])
+        return {'cell': cell_id, 'welds': session.cell_welds(model_id, [cell_id])[0]}
+    if rest == ['closest']:
+        point = _floats(query, 'point', 3)
+        if point is None:
+            raise ValueError("需要 point=x,y,z 参数")
+        return session.closest(model_id, np.array(point), int(query.get('k', ['1'])[0]))
+    if rest == ['region']:
+        return session.region(model_id, _floats(query, 'box', 6), _floats(query, 'sphere', 4))
+    raise NotFound(path)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'VesselAnalysis/1.0'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            with span('request', 'server', method=method, path=url.path):
+                status, result = 200, route(self.server.session, method, url.path, parse_qs(url.query), body)
+        except NotFound as e:
+            status, result = 404, {'error': f"未找到: {e.args[0] if e.args else url.path}"}
+        except (ValueError, TypeError) as e:
+            status, result = 400, {'error': str(e)}
+        except Exception as e:
+            traceback.print_exc()
+            status, result = 500, {'error': str(e)}
+
+        data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AnalysisServer(HTTPServer):
+    """把每个连接交给固定大小线程池处理的 HTTP 服务
+
+    与 ThreadingHTTPServer 每个请求新建线程不同，并发数受 max_workers 限制，
+    大量下游工具同时查询时不会无限制地创建线程。
+    """
+
+    def __init__(self, session, host=SERVER_HOST, port=SERVER_PORT, max_workers=SERVER_WORKERS, verbose=False):
+        super().__init__((host, port), _RequestHandler)
+        self.session = session
+        self.verbose = verbose
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,352 @@
+"""单元空间索引：最近单元拾取、框选/球选焊缝与 k 近邻焊缝查询
+
+以单元中心建 KD 树（scipy.spatial.cKDTree，构建时才导入），并记录每个单元
+外接球半径。最近单元先用 KD 树得到上界，再只对上界球内的候选单元精确计算
+点到三角形距离，结果与逐单元搜索一致。载入模型后构建一次，GUI 与批处理共用。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from .trace import span
+
+SPATIAL_LEAF_SIZE = 32
+SPATIAL_BATCH_K = 24  # 批量最近单元查询时每级代理点树的近邻数
+SPATIAL_BATCH_MAX_K = 1024  # 近邻数超过该值仍未确定的点逐点查询
+SPATIAL_BOUND_QUANTILE = 0.9  # 代理点查询半径取各点距离上界的该分位数，超出的点在下一轮重查
+SPATIAL_PROXY_STEPS = 2  # 大单元重心坐标网格的最大分段数（2 段即 6 个采样点）
+SPATIAL_PROXY_TAIL = 0.01  # 剩余单元不超过该比例时全部放入最后一级，按需加密采样
+SPATIAL_CHUNK_POINTS = 65536  # closest_cells_chunked 每个线程任务处理的点数
+
+
+def _dot(u, v):
+    return np.einsum('ij,ij->i', u, v)
+
+
+def closest_points_on_triangles(p, a, b, c):
+    """逐行计算点 p 到三角形 (a, b, c) 的最近点，各参数为 (N, 3) 或可广播的 (3,)"""
+    p, a, b, c = np.broadcast_arrays(*(np.atleast_2d(np.asarray(x, dtype=np.float64)) for x in (p, a, b, c)))
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    bp = p - b
+    cp = p - c
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    d3, d4 = _dot(ab, bp), _dot(ac, bp)
+    d5, d6 = _dot(ab, cp), _dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    # 按 Voronoi 区域分别求最近点，优先级低的先写入、高的覆盖
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denom = va + vb + vc
+        result = a + ab * (vb / denom)[:, None] + ac * (vc / denom)[:, None]  # 面内
+
+        edge_bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        result[edge_bc] = (b + (c - b) * t[:, None])[edge_bc]
+
+        edge_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = d2 / (d2 - d6)
+        result[edge_ac] = (a + ac * t[:, None])[edge_ac]
+
+        corner_c = (d6 >= 0) & (d5 <= d6)
+        result[corner_c] = c[corner_c]
+
+        edge_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = d1 / (d1 - d3)
+        result[edge_ab] = (a + ab * t[:, None])[edge_ab]
+
+        corner_b = (d3 >= 0) & (d4 <= d3)
+        result[corner_b] = b[corner_b]
+
+        corner_a = (d1 <= 0) & (d2 <= 0)
+        result[corner_a] = a[corner_a]
+    return result
+
+
+class CellSpatialIndex:
+    """单元中心 KD 树；points / triangles 为索引网格（见 build_indexed_mesh）"""
+
+    __slots__ = ('points', 'triangles', 'centers', 'radius', 'max_radius', '_tree', '_proxies')
+
+    def __init__(self, points, triangles, leafsize=SPATIAL_LEAF_SIZE):
+        from scipy.spatial import cKDTree
+
+        self.points = points
+        self.triangles = triangles
+        a, b, c = (np.asarray(points[triangles[:, k]], dtype=np.float64) for k in range(3))
+        self.centers = (a + b + c) / 3.0
+        self.radius = np.sqrt(np.maximum.reduce([_dot(v - self.centers, v - self.centers) for v in (a, b, c)]))
+        self.max_radius = float(self.radius.max()) if len(self.radius) else 0.0
+        self._tree = cKDTree(self.centers, leafsize=leafsize, balanced_tree=False, compact_nodes=False)
+        self._proxies = None  # 批量查询用的分级代理点 KD 树，见 build_proxy_levels
+
+    def __len__(self):
+        return len(self.centers)
+
+    def _distances(self, point, cell_ids):
+        corners = self.points[self.triangles[cell_ids]]
+        nearest = closest_points_on_triangles(point, corners[:, 0], corners[:, 1], corners[:, 2])
+        return np.linalg.norm(nearest - point, axis=1)
+
+    def closest_cell(self, point, return_distance=False):
+        """返回离 point 最近的单元 ID（按点到三角形的精确距离）"""
+        point = np.asarray(point, dtype=np.float64)
+        if not len(self):
+            return (-1, np.inf) if return_distance else -1
+
+        _, nearest = self._tree.query(point)
+        bound = self._distances(point, [nearest])[0]
+
+        # 更近的单元，其中心一定落在 bound + 外接球半径 的球内
+        candidates = np.asarray(self._tree.query_ball_point(point, bound + self.max_radius), dtype=np.int64)
+        gap = np.linalg.norm(self.centers[candidates] - point, axis=1) - self.radius[candidates]
+        candidates = candidates[gap <= bound]
+        distances = self._distances(point, candidates)
+        best = int(np.argmin(distances))
+        cell_id = int(candidates[best])
+        return (cell_id, float(distances[best])) if return_distance else cell_id
+
+    def closest_cells(self, points, k=SPATIAL_BATCH_K, workers=1):
+        """批量最近单元：返回 (单元 ID, 精确距离, 最近点)，结果与逐点 closest_cell 一致
+
+        代理点按覆盖半径分级建树（见 build_proxy_levels），每级取 k 个最近代理点，
+        代理点距离减去覆盖半径即其所属单元的距离下界；以中心最近单元的精确距离为上界，
+        只对下界小于上界的候选精确计算点到三角形距离。各级未取到的代理点的下界
+        都不小于最优距离时结果已确定；否则 k 翻 4 倍重查，
+        超过 SPATIAL_BATCH_MAX_K 后回退到逐点 closest_cell。
+        workers 传给 cKDTree.query（-1 为全部核）。
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        n = len(points)
+        cell_ids = np.full(n, -1, dtype=np.int64)
+        distances = np.full(n, np.inf)
+        closest = np.full((n, 3), np.nan)
+        pending = np.arange(n) if len(self) else np.empty(0, dtype=np.int64)
+        while len(pending):
+            certain, ids, dist, near = self._closest_among_nearest(points[pending], k, workers)
+            done = pending[certain]
+            cell_ids[done], distances[done], closest[done] = ids[certain], dist[certain], near[certain]
+            pending = pending[~certain]
+            k *= 4
+            if k > SPATIAL_BATCH_MAX_K:
+                break
+        for i in pending:
+            cell_ids[i], distances[i] = self.closest_cell(points[i], return_distance=True)
+            corner = self.points[self.triangles[cell_ids[i]]]
+            closest[i] = closest_points_on_triangles(points[i], corner[0], corner[1], corner[2])[0]
+        return cell_ids, distances, closest
+
+    def closest_cells_chunked(self, points, chunk=SPATIAL_CHUNK_POINTS, max_workers=None, progress=None,
+                              cancel_event=None, label='查询最近单元'):
+        """分块并行的 closest_cells：返回 (单元 ID, 精确距离, 最近点)
+
+        点按 chunk 分块交给线程池（KD 树查询在 SciPy 内部释放 GIL），代理点树在提交前
+        于调用线程构建一次。progress(文本, 0~1) 每完成一块调用一次；
+        cancel_event 置位后未开始的块直接跳过，并抛出 LoadCancelled。
+        """
+        from .loader import LoadCancelled  # loader 依赖本模块，取消异常在调用时导入
+
+        n = len(points)
+        cell_ids = np.full(n, -1, dtype=np.int64)
+        distances = np.full(n, np.inf)
+        closest = np.full((n, 3), np.nan)
+        if not n or not len(self):
+            return cell_ids, distances, closest
+        self.build_proxy_levels()
+
+        def run(start):
+            stop = min(start + chunk, n)
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            with span('closest_cells_chunk', 'spatial', points=stop - start):
+                cell_ids[start:stop], distances[start:stop], closest[start:stop] = self.closest_cells(
+                    np.asarray(points[start:stop], dtype=np.float64))
+
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [executor.submit(run, start) for start in range(0, n, chunk)]
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    raise LoadCancelled(label)
+                if progress is not None:
+                    progress(f"{label} ({done}/{len(futures)})", done / len(futures))
+        return cell_ids, distances, closest
+
+    def _closest_among_nearest(self, points, k, workers):
+        """在各级 k 个最近代理点的单元中求最近单元，返回 (是否已确定, 单元 ID, 距离, 最近点)"""
+        n = len(points)
+        # 中心最近的单元给出距离上界 best，代理点查询只需在 best + cover 的范围内进行
+        _, cell_ids = self._tree.query(points, workers=workers)
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        nearest, best = self._closest_points(points, cell_ids)
+        bound = float(np.quantile(best, SPATIAL_BOUND_QUANTILE))
+        row_parts, id_parts = [], []
+        limit = np.full(n, np.inf)  # 各级未取到的代理点所属单元的距离下界
+        for tree, owners, cover in self.build_proxy_levels():
+            level_k = min(k, tree.n)
+            radius = bound + cover
+            proxy_distances, proxies = tree.query(points, k=level_k, distance_upper_bound=radius, workers=workers)
+            proxy_distances = proxy_distances.reshape(n, level_k)
+            proxies = proxies.reshape(n, level_k)
+            # 单元上每一点离自己的某个代理点不超过 cover，而更近的代理点一定也已取到；
+            # 未取到的代理点不近于第 k 个，k 个未取满时不近于 radius
+            full = np.isfinite(proxy_distances[:, -1])
+            if level_k < tree.n:
+                limit = np.minimum(limit, np.where(full, proxy_distances[:, -1], radius) - cover)
+            else:
+                limit = np.minimum(limit, np.where(full, np.inf, radius - cover))
+            rows, columns = np.nonzero(proxy_distances - cover < best[:, None])
+            row_parts.append(rows)
+            id_parts.append(owners[proxies[rows, columns]])
+
+        # 只有下界小于上界的候选才可能更近，逐对精确计算后每行取最近
+        open_rows = np.concatenate(row_parts)
+        open_ids = np.concatenate(id_parts)
+        keep = open_ids != cell_ids[open_rows]
+        open_rows, open_ids = open_rows[keep], open_ids[keep]
+        if len(open_rows):
+            open_nearest, open_distances = self._closest_points(points[open_rows], open_ids)
+            order = np.lexsort((open_distances, open_rows))
+            hit_rows, first_hit = np.unique(open_rows[order], return_index=True)
+            first_hit = order[first_hit]
+            better = open_distances[first_hit] < best[hit_rows]
+            hit_rows, first_hit = hit_rows[better], first_hit[better]
+            cell_ids[hit_rows] = open_ids[first_hit]
+            nearest[hit_rows] = open_nearest[first_hit]
+            best[hit_rows] = open_distances[first_hit]
+        return limit >= best, cell_ids, best, nearest
+
+    def _closest_points(self, points, cell_ids):
+        """逐对计算 points[i] 到单元 cell_ids[i] 的最近点与距离"""
+        corners = self.points[self.triangles[cell_ids]]
+        nearest = closest_points_on_triangles(points, corners[:, 0], corners[:, 1], corners[:, 2])
+        return nearest, np.linalg.norm(nearest - points, axis=1)
+
+    def build_proxy_levels(self):
+        """构建（或返回已构建的）分级代理点 KD 树：[(树, 代理点所属单元, 覆盖半径), ...]
+
+        第 L 级覆盖半径为单元外接球半径中位数的 2^L 倍。每个单元放入能用中心、或
+        SPATIAL_PROXY_STEPS 段的重心坐标网格采样点覆盖自身的最低一级，使单元上每一点
+        到本单元某个代理点的距离不超过该级覆盖半径；剩余单元不超过 SPATIAL_PROXY_TAIL
+        时全部放入当前级并按需加密网格。狭长的大三角形因此落在高级别的小树里，
+        不会放大其余单元的距离下界。多线程批量查询前应先在调用线程构建，避免各线程重复构建。
+        """
+        if self._proxies is not None:
+            return self._proxies
+        from scipy.spatial import cKDTree
+
+        corners = [np.asarray(self.points[self.triangles[:, k]], dtype=np.float64) for k in range(3)]
+        longest = np.sqrt(np.maximum.reduce([_dot(corners[i] - corners[j], corners[i] - corners[j])
+                                             for i, j in ((0, 1), (1, 2), (2, 0))]))
+        cover = (float(np.median(self.radius)) if len(self) else 0.0) or self.max_radius or 1.0
+        remaining = np.arange(len(self))
+        tail = SPATIAL_PROXY_TAIL * len(self)
+        levels = []
+        while len(remaining):
+            centered = self.radius[remaining] <= cover
+            steps = np.ceil(longest[remaining] / cover).astype(np.int64)
+            sampled = ~centered
+            if len(remaining) > tail:
+                sampled &= steps <= SPATIAL_PROXY_STEPS
+            cells = remaining[centered]
+            proxy_points, owners = [self.centers[cells]], [cells]
+            for step in np.unique(steps[sampled]):
+                cells = remaining[sampled & (steps == step)]
+                i, j = np.triu_indices(step + 1)  # 重心坐标网格 (u, v) = ((j - i) / step, i / step)
+                u, v = (j - i) / step, i / step
+                a, b, c = (corner[cells] for corner in corners)
+                samples = a[:, None] + u[None, :, None] * (b - a)[:, None] + v[None, :, None] * (c - a)[:, None]
+                proxy_points.append(samples.reshape(-1, 3))
+                owners.append(np.repeat(cells, len(u)))
+            owners = np.concatenate(owners).astype(np.int64)
+            if len(owners):
+                tree = cKDTree(np.concatenate(proxy_points), leafsize=SPATIAL_LEAF_SIZE, balanced_tree=False,
+                               compact_nodes=False)
+                levels.append((tree, owners, cover))
+            remaining = remaining[~(centered | sampled)]
+            cover *= 2.0
+        self._proxies = levels
+        return levels
+
+    def nearest_cells(self, point, k=1, workers=1):
+        """按单元中心距离返回最近的 k 个单元：(距离数组, 单元 ID 数组)
+
+        point 也可以是 (n, 3) 的点集，此时 k=1 返回两个长度为 n 的数组；workers 传给 cKDTree.query。
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        distances, cell_ids = self._tree.query(np.asarray(point, dtype=np.float64), k=k, workers=workers)
+        return np.atleast_1d(distances), np.atleast_1d(cell_ids).astype(np.int64)
+
+    def cells_in_sphere(self, center, radius):
+        """单元中心落在球内的单元 ID（升序）"""
+        cell_ids = self._tree.query_ball_point(np.asarray(center, dtype=np.float64), radius)
+        return np.sort(np.asarray(cell_ids, dtype=np.int64))
+
+    def cells_in_box(self, bounds):
+        """单元中心落在包围盒 (xmin, xmax, ymin, ymax, zmin, zmax) 内的单元 ID（升序）"""
+        lower = np.asarray(bounds[0::2], dtype=np.float64)
+        upper = np.asarray(bounds[1::2], dtype=np.float64)
+        # 先用切比雪夫距离取外接立方体内的候选，再按各轴范围精确过滤
+        cell_ids = np.asarray(self._tree.query_ball_point((lower + upper) / 2, (upper - lower).max() / 2,
+                                                          p=np.inf), dtype=np.int64)
+        centers = self.centers[cell_ids]
+        inside = np.all((centers >= lower) & (centers <= upper), axis=1)
+        return np.sort(cell_ids[inside])
+
+    def welds_in_box(self, weld_index, bounds):
+        """包围盒内有单元的焊缝名"""
+        return weld_index.welds_in(self.cells_in_box(bounds))
+
+    def welds_in_sphere(self, weld_index, center, radius):
+        """球内有单元的焊缝名"""
+        return weld_index.welds_in(self.cells_in_sphere(center, radius))
+
+    def nearest_welds(self, weld_index, point, k=1):
+        """离 point 最近的 k 条焊缝（按焊缝单元中心的最近距离）：[(焊缝名, 距离)]
+
+        每次把近邻单元数翻倍，直到覆盖 k 条焊缝或查完全部单元。
+        """
+        n_query = 64
+        while True:
+            distances, cell_ids = self.nearest_cells(point, n_query)
+            hits = weld_index.first_hits(cell_ids)
+            if len(hits) >= k or len(cell_ids) >= len(self):
+                return [(name, float(distances[position])) for name, position in hits[:k]]
+            n_query *= 2
+
+    def closest_welds(self, weld_index, point, k=1):
+        """离 point 最近的 k 条焊缝（按点到焊缝三角形的精确距离）：[(焊缝名, 距离)]
+
+        先取中心最近的 k 条焊缝，以各自中心最近单元的精确距离的最大值为上界；
+        更近的焊缝一定有单元的外接球与上界球相交，只对这些单元精确计算。
+        最近单元属于某条焊缝时，第一条焊缝的距离即 closest_cell 的距离。
+        """
+        point = np.asarray(point, dtype=np.float64)
+        if k <= 0 or not len(self):
+            return []
+        n_query = 64
+        while True:
+            _, cell_ids = self.nearest_cells(point, n_query)
+            hits = weld_index.first_hits(cell_ids)
+            if len(hits) >= k or len(cell_ids) >= len(self):
+                break
+            n_query *= 2
+        if len(hits) < k:
+            cell_ids = np.arange(len(self))  # 焊缝不足 k 条，全部单元都是候选
+        else:
+            bound = self._distances(point, cell_ids[[position for _, position in hits[:k]]]).max()
+            cell_ids = np.asarray(self._tree.query_ball_point(point, bound + self.max_radius), dtype=np.int64)
+            gap = np.linalg.norm(self.centers[cell_ids] - point, axis=1) - self.radius[cell_ids]
+            cell_ids = cell_ids[gap <= bound]
+        distances = self._distances(point, cell_ids)
+        order = np.argsort(distances, kind='stable')
+        distances = distances[order]
+        return [(name, float(distances[position])) for name, position in weld_index.first_hits(cell_ids[order])[:k]]
@@ -0,0 +1,290 @@
+"""流式 STL 读取：二进制 STL 内存映射、ASCII 分块解析，逐块计算
+
+大型扫描船体文件不再整体读入内存：每次只处理 chunk_facets 个面片，
+质量属性、包围盒与面法向逐块累加；顶点合并分两遍完成（第一遍求坐标范围，
+第二遍逐块合并到全局有序键表），常驻内存只有输出的索引网格与一个块的工作集。
+"""
+import os
+import re
+
+import numpy as np
+
+from .mesh import VERTEX_MERGE_TOLERANCE
+
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vectors', '<f4', (3, 3)), ('attr', '<u2')])
+STL_HEADER_BYTES = 84
+STL_CHUNK_FACETS = 1 << 20  # 每块面片数，二进制约 50 MB 映射、36 MB 坐标
+STL_STREAM_THRESHOLD_BYTES = 256 * 1024 * 1024  # 加载流水线自动改用流式读取的文件大小
+
+_ASCII_FACET_BYTES = 256  # ASCII 面片的大致字节数，用于按面片数估算每次读取的块大小
+_ASCII_VERTEX = re.compile(rb'vertex\s+(\S+)\s+(\S+)\s+(\S+)')
+# 质量属性积分的归一化系数（Eberly 多面体质量属性算法，与 numpy-stl 相同）
+_MASS_DIVISORS = np.array([6, 24, 24, 24, 60, 60, 60, 120, 120, 120], dtype=np.float64)
+
+
+def _subexpressions(w0, w1, w2):
+    temp0 = w0 + w1
+    f1 = temp0 + w2
+    temp1 = w0 * w0
+    temp2 = temp1 + w1 * temp0
+    f2 = temp2 + w2 * f1
+    f3 = w0 * temp1 + w1 * temp2 + w2 * f2
+    g0 = f2 + w0 * (f1 + w0)
+    g1 = f2 + w1 * (f1 + w1)
+    g2 = f2 + w2 * (f1 + w2)
+    return f1, f2, f3, g0, g1, g2
+
+
+def mass_integrals(vectors):
+    """一块面片 (n, 3, 3) 的 10 项体积分之和（float64 累加），可逐块相加"""
+    v = np.asarray(vectors, dtype=np.float64)
+    x0, x1, x2 = v[:, 0, 0], v[:, 1, 0], v[:, 2, 0]
+    y0, y1, y2 = v[:, 0, 1], v[:, 1, 1], v[:, 2, 1]
+    z0, z1, z2 = v[:, 0, 2], v[:, 1, 2], v[:, 2, 2]
+    a1, b1, c1 = x1 - x0, y1 - y0, z1 - z0
+    a2, b2, c2 = x2 - x0, y2 - y0, z2 - z0
+    d0, d1, d2 = b1 * c2 - b2 * c1, a2 * c1 - a1 * c2, a1 * b2 - a2 * b1
+
+    f1x, f2x, f3x, g0x, g1x, g2x = _subexpressions(x0, x1, x2)
+    _, f2y, f3y, g0y, g1y, g2y = _subexpressions(y0, y1, y2)
+    _, f2z, f3z, g0z, g1z, g2z = _subexpressions(z0, z1, z2)
+
+    intg = np.empty(10)
+    intg[0] = np.dot(d0, f1x)
+    intg[1:4] = np.dot(d0, f2x), np.dot(d1, f2y), np.dot(d2, f2z)
+    intg[4:7] = np.dot(d0, f3x), np.dot(d1, f3y), np.dot(d2, f3z)
+    intg[7] = np.dot(d0, y0 * g0x + y1 * g1x + y2 * g2x)
+    intg[8] = np.dot(d1, z0 * g0y + z1 * g1y + z2 * g2y)
+    intg[9] = np.dot(d2, x0 * g0z + x1 * g1z + x2 * g2z)
+    return intg
+
+
+def mass_properties_from_integrals(intg):
+    """由累加的体积分得到 (体积, 重心, 重心处惯性张量)，与 numpy-stl 的 get_mass_properties 一致"""
+    intg = np.asarray(intg, dtype=np.float64) / _MASS_DIVISORS
+    volume = intg[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cog = intg[1:4] / volume
+    cogsq = cog ** 2
+    inertia = np.zeros((3, 3))
+    inertia[0, 0] = intg[5] + intg[6] - volume * (cogsq[1] + cogsq[2])
+    inertia[1, 1] = intg[4] + intg[6] - volume * (cogsq[2] + cogsq[0])
+    inertia[2, 2] = intg[4] + intg[5] - volume * (cogsq[0] + cogsq[1])
+    inertia[0, 1] = inertia[1, 0] = -(intg[7] - volume * cog[0] * cog[1])
+    inertia[1, 2] = inertia[2, 1] = -(intg[8] - volume * cog[1] * cog[2])
+    inertia[0, 2] = inertia[2, 0] = -(intg[9] - volume * cog[2] * cog[0])
+    return volume, cog, inertia
+
+
+def mesh_mass_properties(points, triangles=None, chunk_facets=STL_CHUNK_FACETS):
+    """分块计算质量属性，不构造 numpy-stl 网格
+
+    triangles 为 None 时 points 是面片顶点 (n, 3, 3)（如 numpy-stl 的 vectors 视图），
+    否则 (points, triangles) 是索引网格，每块只临时展开 chunk_facets 个面片。
+    """
+    n_facets = len(points) if triangles is None else len(triangles)
+    intg = np.zeros(10)
+    for start in range(0, n_facets, chunk_facets):
+        if triangles is None:
+            vectors = points[start:start + chunk_facets]
+        else:
+            vectors = points[triangles[start:start + chunk_facets]]
+        intg += mass_integrals(vectors)
+    return mass_properties_from_integrals(intg)
+
+
+def stl_facet_count(file_path):
+    """二进制 STL 返回头部记录的面片数，ASCII STL 返回 None"""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.read(STL_HEADER_BYTES)
+    if len(header) == STL_HEADER_BYTES:
+        n_facets = int(np.frombuffer(header, dtype='<u4', count=1, offset=80)[0])
+        if size == STL_HEADER_BYTES + n_facets * STL_RECORD.itemsize:
+            return n_facets
+    if header.lstrip().startswith(b'solid'):
+        return None
+    raise ValueError(f"无法识别的 STL 文件: {file_path}")
+
+
+class StlStream:
+    """按块读取 STL 面片
+
+    二进制文件通过内存映射按块复制坐标，ASCII 文件按字节块读取并用正则提取顶点；
+    chunks() 每次产生 (起始面片序号, (n, 3, 3) float32)，任何方法都不会一次读入整个文件。
+    scan() 一遍求出面片数、包围盒与质量属性并缓存，供后续顶点合并使用。
+    """
+
+    def __init__(self, file_path, chunk_facets=STL_CHUNK_FACETS):
+        self.file_path = file_path
+        self.chunk_facets = max(1, int(chunk_facets))
+        self.n_facets = stl_facet_count(file_path)
+        self.binary = self.n_facets is not None
+        self.bounds = None           # (下界, 上界) float32，scan() 之后可用
+        self.mass_properties = None  # (体积, 重心, 惯性张量)，scan() 之后可用
+
+    def __len__(self):
+        if self.n_facets is None:
+            self.scan()
+        return self.n_facets
+
+    def chunks(self):
+        return self._binary_chunks() if self.binary else self._ascii_chunks()
+
+    def _binary_chunks(self):
+        if self.n_facets == 0:
+            return
+        records = np.memmap(self.file_path, dtype=STL_RECORD, mode='r', offset=STL_HEADER_BYTES,
+                            shape=(self.n_facets,))
+        try:
+            for start in range(0, self.n_facets, self.chunk_facets):
+                yield start, np.array(records['vectors'][start:start + self.chunk_facets], dtype=np.float32)
+        finally:
+            del records
+
+    def _ascii_chunks(self):
+        block_bytes = self.chunk_facets * _ASCII_FACET_BYTES
+        pending = np.empty((0, 3), dtype=np.float32)  # 上一块末尾不足一个面片的顶点
+        tail = b''
+        start = 0
+        with open(self.file_path, 'rb') as f:
+            while True:
+                block = f.read(block_bytes)
+                data = tail + block
+                if block:
+                    cut = data.rfind(b'\n') + 1
+                    data, tail = data[:cut], data[cut:]
+                coords = _ASCII_VERTEX.findall(data)
+                if coords:
+                    vertices = np.array(coords).astype(np.float32)
+                    if len(pending):
+                        vertices = np.concatenate([pending, vertices])
+                    n = len(vertices) // 3
+                    pending = vertices[3 * n:]
+                    if n:
+                        yield start, vertices[:3 * n].reshape(n, 3, 3)
+                        start += n
+                if not block:
+                    break
+        if len(pending):
+            raise ValueError(f"ASCII STL 顶点数不是 3 的倍数: {self.file_path}")
+
+    def scan(self):
+        """一遍读取求面片数、包围盒与质量属性"""
+        n_facets = 0
+        lower = upper = None
+        intg = np.zeros(10)
+        for start, vectors in self.chunks():
+            flat = vectors.reshape(-1, 3)
+            chunk_lower, chunk_upper = flat.min(axis=0), flat.max(axis=0)
+            lower = chunk_lower if lower is None else np.minimum(lower, chunk_lower)
+            upper = chunk_upper if upper is None else np.maximum(upper, chunk_upper)
+            intg += mass_integrals(vectors)
+            n_facets = start + len(vectors)
+        if lower is None:
+            lower = upper = np.zeros(3, dtype=np.float32)
+        self.n_facets = n_facets
+        self.bounds = (lower, upper)
+        self.mass_properties = mass_properties_from_integrals(intg)
+        return self.mass_properties
+
+    def face_normals(self):
+        """逐块计算单位面法向 (n, 3) float32，退化面片为 NaN"""
+        normals = np.empty((len(self), 3), dtype=np.float32)
+        for start, vectors in self.chunks():
+            v = vectors.astype(np.float64)
+            chunk = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                chunk /= np.linalg.norm(chunk, axis=1)[:, None]
+            normals[start:start + len(vectors)] = chunk
+        return normals
+
+    def build_indexed_mesh(self, tolerance=VERTEX_MERGE_TOLERANCE, drop_degenerate=True):
+        """逐块合并顶点，结果与 mesh.build_indexed_mesh 相同：(points, triangles, facet_ids)
+
+        每块先在块内去重，再在全局有序键表中二分查找；新键插入键表并分配新顶点号。
+        最后按键顺序重新编号，使顶点顺序也与整体读取时一致。
+        """
+        if self.bounds is None:
+            self.scan()
+        make_keys = _vertex_keys(self.bounds, tolerance)
+
+        known_keys = None  # 全局有序键表
+        known_ids = np.empty(0, dtype=np.int64)
+        point_chunks, triangle_chunks, facet_chunks = [], [], []
+        n_points = 0
+        for start, vectors in self.chunks():
+            flat = vectors.reshape(-1, 3)
+            keys = make_keys(flat)
+            chunk_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            if known_keys is None:
+                known_keys = chunk_keys[:0]
+
+            position = np.searchsorted(known_keys, chunk_keys)
+            ids = np.empty(len(chunk_keys), dtype=np.int64)
+            new = np.ones(len(chunk_keys), dtype=bool)
+            if len(known_keys):
+                clipped = np.minimum(position, len(known_keys) - 1)
+                found = known_keys[clipped] == chunk_keys
+                ids[found] = known_ids[clipped[found]]
+                new = ~found
+            n_new = int(new.sum())
+            ids[new] = np.arange(n_points, n_points + n_new)
+            n_points += n_new
+            point_chunks.append(flat[first_index[new]])
+            known_keys = np.insert(known_keys, position[new], chunk_keys[new])
+            known_ids = np.insert(known_ids, position[new], ids[new])
+
+            triangles = ids[inverse.ravel()].reshape(len(vectors), 3)
+            facet_ids = np.arange(start, start + len(vectors))
+            if drop_degenerate:
+                # 合并顶点后退化为线或点的面片不再参与显示
+                valid = ((triangles[:, 0] != triangles[:, 1]) &
+                         (triangles[:, 1] != triangles[:, 2]) &
+                         (triangles[:, 0] != triangles[:, 2]))
+                if not valid.all():
+                    triangles = triangles[valid]
+                    facet_ids = facet_ids[valid]
+            triangle_chunks.append(triangles)
+            facet_chunks.append(facet_ids)
+
+        if not point_chunks:
+            return (np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int64),
+                    np.empty(0, dtype=np.int64))
+        points = np.concatenate(point_chunks)[known_ids]
+        rank = np.empty(n_points, dtype=np.int64)
+        rank[known_ids] = np.arange(n_points)
+        triangles = rank[np.concatenate(triangle_chunks)]
+        return points, triangles, np.concatenate(facet_chunks)
+
+
+def _vertex_keys(bounds, tolerance):
+    """返回 flat (n, 3) -> 可排序顶点键 的函数，与 mesh.unique_rows 的键一致
+
+    量化后的整数键范围允许时用包围盒下界压缩为单个 int64，否则按字节视图比较。
+    """
+    if tolerance > 0:
+        lower = np.round(bounds[0] / tolerance).astype(np.int64)
+        span = np.round(bounds[1] / tolerance).astype(np.int64) - lower + 1
+        if np.prod(span.astype(np.float64)) < 2.0 ** 62:
+            def packed(flat):
+                keys = np.round(flat / tolerance).astype(np.int64)
+                result = np.zeros(len(keys), dtype=np.int64)
+                for column in range(3):
+                    result = result * int(span[column]) + (keys[:, column] - lower[column])
+                return result
+            return packed
+
+    def rows(flat):
+        keys = np.round(flat / tolerance).astype(np.int64) if tolerance > 0 else flat
+        keys = np.ascontiguousarray(keys)
+        return keys.view(np.dtype((np.void, keys.dtype.itemsize * 3))).ravel()
+    return rows
+
+
+def read_stl_streaming(file_path, tolerance=VERTEX_MERGE_TOLERANCE, chunk_facets=STL_CHUNK_FACETS):
+    """流式读取 STL，返回 (points, triangles, facet_ids, (体积, 重心, 惯性张量))"""
+    stream = StlStream(file_path, chunk_facets)
+    mass_properties = stream.scan()
+    points, triangles, facet_ids = stream.build_indexed_mesh(tolerance)
+    return points, triangles, facet_ids, mass_properties
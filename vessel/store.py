@@ -0,0 +1,144 @@
+"""焊缝数据库：按模型内容摘要持久化焊缝表，编辑时逐条写入
+
+使用 SQLite，每条焊缝一行，单元集合以 pack_weld_cells 的 int32 数据存为 BLOB，
+读取时 np.frombuffer 直接解码，数千条焊缝的表一次查询即可读完。
+修改或删除焊缝只写受影响的行，不重写整张表。
+"""
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from .cache import MESH_CACHE_DIR
+from .welds import WeldRecord, pack_weld_cells, unpack_weld_cells
+
+WELD_STORE_PATH = os.path.join(MESH_CACHE_DIR, 'welds.sqlite')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    key TEXT PRIMARY KEY,
+    n_cells INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS welds (
+    model TEXT NOT NULL,
+    name TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    strength REAL,
+    status TEXT,
+    color TEXT,
+    info TEXT,
+    bounds TEXT,
+    max_dim REAL,
+    kind INTEGER NOT NULL,
+    cells BLOB NOT NULL,
+    PRIMARY KEY (model, name)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO welds (model, name, seq, strength, status, color, info, bounds, max_dim, kind, cells)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (model, name) DO UPDATE SET
+    strength = excluded.strength, status = excluded.status, color = excluded.color,
+    info = excluded.info, bounds = excluded.bounds, max_dim = excluded.max_dim,
+    kind = excluded.kind, cells = excluded.cells
+"""
+
+
+def weld_store_key(digest, tolerance):
+    """焊缝数据库中的模型键：同一文件不同顶点合并容差的单元编号不同，分别保存"""
+    return f'{digest}-{tolerance:g}'
+
+
+def _weld_row(key, seq, name, record):
+    kind, data = pack_weld_cells(record.cells)
+    bounds = None if record.bounds is None else json.dumps([float(v) for v in record.bounds])
+    max_dim = None if record.max_dim is None else float(record.max_dim)
+    strength = None if record.strength is None else float(record.strength)
+    return (key, name, seq, strength, record.status, record.color, record.info,
+            bounds, max_dim, int(kind), np.ascontiguousarray(data, dtype=np.int32).tobytes())
+
+
+class WeldStore:
+    """按模型键（见 weld_store_key）保存焊缝表的 SQLite 数据库
+
+    每个线程使用各自的连接（加载在工作线程、编辑在主线程）。
+    """
+
+    def __init__(self, path=WELD_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def load(self, key):
+        """读取模型的焊缝表 {名称: WeldRecord}；模型从未保存过时返回 None"""
+        connection = self._connection()
+        if connection.execute('SELECT 1 FROM models WHERE key = ?', (key,)).fetchone() is None:
+            return None
+        welds = {}
+        rows = connection.execute(
+            'SELECT name, strength, status, color, info, bounds, max_dim, kind, cells '
+            'FROM welds WHERE model = ? ORDER BY seq', (key,))
+        for name, strength, status, color, info, bounds, max_dim, kind, cells in rows:
+            cells = unpack_weld_cells(kind, np.frombuffer(cells, dtype=np.int32))
+            welds[name] = WeldRecord(cells, strength, status, color, info,
+                                     None if bounds is None else json.loads(bounds), max_dim)
+        return welds
+
+    def save(self, key, n_cells, welds):
+        """整体保存模型的焊缝表（首次加载时调用），替换已有记录"""
+        connection = self._connection()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO models (key, n_cells) VALUES (?, ?)', (key, n_cells))
+            connection.execute('DELETE FROM welds WHERE model = ?', (key,))
+            connection.executemany(_UPSERT, (_weld_row(key, seq, name, record)
+                                             for seq, (name, record) in enumerate(welds.items())))
+
+    def write(self, key, updated=None, deleted=()):
+        """增量写入：updated 为 {名称: WeldRecord}（新增或修改），deleted 为要删除的焊缝名
+
+        同一次调用在一个事务中完成。
+        """
+        connection = self._connection()
+        with connection:
+            connection.executemany('DELETE FROM welds WHERE model = ? AND name = ?',
+                                   ((key, name) for name in deleted))
+            if updated:
+                # 新焊缝排在末尾；已有焊缝冲突时只更新属性，保留原顺序
+                last, = connection.execute('SELECT COALESCE(MAX(seq), -1) FROM welds WHERE model = ?',
+                                           (key,)).fetchone()
+                connection.executemany(_UPSERT, (_weld_row(key, last + 1 + i, name, record)
+                                                 for i, (name, record) in enumerate(updated.items())))
+
+    def upsert(self, key, weld_name, record):
+        self.write(key, updated={weld_name: record})
+
+    def delete(self, key, weld_name):
+        self.write(key, deleted=[weld_name])
+
+    def forget(self, key):
+        """删除模型的全部焊缝记录，下次加载时重新生成"""
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM welds WHERE model = ?', (key,))
+            connection.execute('DELETE FROM models WHERE key = ?', (key,))
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
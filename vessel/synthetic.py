@@ -0,0 +1,75 @@
+"""确定性的合成船体网格（基准测试与演示用）
+
+船体为沿 x 方向的管状曲面：横截面是超椭圆，宽度与高度从船中向首尾收缩，
+两端用扇形封口，因此是封闭网格。给定面片数与随机种子，结果完全确定。
+"""
+import numpy as np
+
+from .stlstream import STL_RECORD
+
+
+def hull_grid_shape(n_facets, aspect=4.0):
+    """选择 (纵向分段数, 周向分段数)，使面片数约为 n_facets（2·nu·nv + 2·nv）"""
+    nv = max(8, int(round(np.sqrt(n_facets / (2.0 * aspect)))))
+    nu = max(2, int(round((n_facets - 2 * nv) / (2.0 * nv))))
+    return nu, nv
+
+
+def synthetic_hull(n_facets, seed=0, length=100.0, beam=16.0, depth=10.0, jitter=0.002):
+    """生成约 n_facets 个面片的船体三角形 (N, 3, 3) float32
+
+    jitter 为按种子添加的顶点扰动（相对船宽），使网格不是完全规则的。
+    """
+    rng = np.random.default_rng(seed)
+    nu, nv = hull_grid_shape(n_facets)
+
+    u = np.linspace(0.0, 1.0, nu + 1)
+    v = np.linspace(0.0, 2.0 * np.pi, nv, endpoint=False)
+    taper = 0.15 + 0.85 * np.sqrt(np.clip(1.0 - (2.0 * u - 1.0) ** 4, 0.0, 1.0))
+
+    cos_v, sin_v = np.cos(v), np.sin(v)
+    section_y = np.sign(cos_v) * np.abs(cos_v) ** 0.4 * beam / 2   # 超椭圆截面，船底较平
+    section_z = np.sign(sin_v) * np.abs(sin_v) ** 0.6 * depth / 2
+
+    grid = np.empty((nu + 1, nv, 3))
+    grid[:, :, 0] = (u * length)[:, None]
+    grid[:, :, 1] = taper[:, None] * section_y
+    grid[:, :, 2] = taper[:, None] * section_z
+    grid[:, :, 1:] += rng.normal(scale=jitter * beam, size=(nu + 1, nv, 2))
+    points = grid.reshape(-1, 3)
+
+    i = np.arange(nu)[:, None]
+    j = np.arange(nv)[None, :]
+    a = i * nv + j
+    b = i * nv + (j + 1) % nv
+    c = a + nv
+    d = b + nv
+    quads = np.stack([a, b, c, d], axis=-1).reshape(-1, 4)
+    side = np.concatenate([quads[:, [0, 1, 2]], quads[:, [1, 3, 2]]])  # 法线朝外
+
+    # 首尾封口：截面中心加扇形三角形
+    centers = np.array([[0.0, 0.0, 0.0], [length, 0.0, 0.0]])
+    first = np.arange(nv)
+    last = nu * nv + np.arange(nv)
+    n_grid = len(points)
+    caps = np.concatenate([
+        np.column_stack([np.full(nv, n_grid), (first + 1) % nv, first]),
+        np.column_stack([np.full(nv, n_grid + 1), last, nu * nv + (first + 1) % nv]),
+    ])
+    points = np.concatenate([points, centers])
+    triangles = np.concatenate([side, caps])
+    return points[triangles].astype(np.float32)
+
+
+def write_binary_stl(file_path, vectors, header=b'vessel synthetic hull'):
+    """把三角形 (N, 3, 3) 写成二进制 STL"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    records = np.zeros(len(vectors), dtype=STL_RECORD)
+    records['vectors'] = vectors
+    normals = np.cross(vectors[:, 1] - vectors[:, 0], vectors[:, 2] - vectors[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    records['normal'] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    with open(file_path, 'wb') as f:
+        f.write(header[:80].ljust(80, b'\0'))
+        f.write(np.uint32(len(vectors)).tobytes())
+        records.tofile(f)
@@ -0,0 +1,148 @@
+"""阶段计时与性能追踪
+
+tracer 记录计时区间 (span) 与计数器，可导出 Chrome trace-event JSON
+（chrome://tracing 或 Perfetto 打开）。默认关闭，关闭时 span() 返回共享的
+空上下文对象，开销只有一次属性判断；设置环境变量 VESSEL_TRACE=1 可在启动时打开。
+"""
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._finish(self, time.perf_counter_ns())
+        return False
+
+
+class Tracer:
+    """线程安全的区间与计数器记录器"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self.events = []      # Chrome trace 事件
+        self.counters = {}    # 计数器名 -> 当前值
+        self.last = {}        # 区间名 -> 最近一次耗时（秒），按完成顺序，供状态栏显示
+        self.totals = {}      # 区间名 -> (次数, 总耗时秒)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self.counters = {}
+            self.last = {}
+            self.totals = {}
+            self._origin = time.perf_counter_ns()
+
+    def span(self, name, category='vessel', **args):
+        """计时区间：with tracer.span('parse', file=...): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def _finish(self, span, end):
+        duration = end - span.start
+        event = {'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': self._pid,
+                 'tid': threading.get_ident(), 'ts': (span.start - self._origin) / 1000,
+                 'dur': duration / 1000}
+        if span.args:
+            event['args'] = {key: str(value) if not isinstance(value, (int, float)) else value
+                             for key, value in span.args.items()}
+        seconds = duration / 1e9
+        with self._lock:
+            self.events.append(event)
+            self.last.pop(span.name, None)  # 保持按最近完成的顺序
+            self.last[span.name] = seconds
+            count, total = self.totals.get(span.name, (0, 0.0))
+            self.totals[span.name] = (count + 1, total + seconds)
+
+    def count(self, name, value=1):
+        """计数器累加 value，并记录一个 Chrome 计数器事件"""
+        if not self.enabled:
+            return
+        with self._lock:
+            current = self.counters.get(name, 0) + value
+            self.counters[name] = current
+            self.events.append({'name': name, 'ph': 'C', 'pid': self._pid, 'tid': threading.get_ident(),
+                                'ts': (time.perf_counter_ns() - self._origin) / 1000, 'args': {name: current}})
+
+    def recent(self, n=5):
+        """最近完成的 n 个区间 [(区间名, 耗时秒)]，最新的在前"""
+        with self._lock:
+            items = list(self.last.items())
+        return items[::-1][:n]
+
+    def summary(self):
+        """{区间名: (次数, 总耗时秒)} 的副本"""
+        with self._lock:
+            return dict(self.totals)
+
+    def to_chrome_trace(self):
+        with self._lock:
+            events = list(self.events)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path):
+        """写出 Chrome trace-event JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+
+
+tracer = Tracer(enabled=os.environ.get('VESSEL_TRACE') == '1')
+
+
+def span(name, category='vessel', **args):
+    """全局 tracer 的计时区间"""
+    return tracer.span(name, category, **args)
+
+
+def count(name, value=1):
+    """全局 tracer 的计数器"""
+    tracer.count(name, value)
+
+
+def traced(name=None, category='vessel'):
+    """函数装饰器：每次调用记录一个区间"""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(span_name, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,125 @@
+"""焊缝列表的数据模型：稳定 ID、增量更新与过滤
+
+每条焊缝登记时分配一个不再变化的整数 ID，列表行按 ID（即登记顺序）排列；
+修改、删除、新增只调整受影响的行，界面只需要按行号取当前可见的几行来显示。
+"""
+from bisect import bisect_left, insort
+
+
+def weld_row_text(name, record):
+    """列表行的显示文本"""
+    status_indicator = "✓" if record.status == '正常' else "⚠"
+    return f"{status_indicator} {name} ({record.status})"
+
+
+class WeldListFilter:
+    """列表过滤条件；None / 空字符串表示不限制
+
+    设置了强度范围时，强度未知（None）的焊缝视为不满足条件。
+    """
+
+    __slots__ = ('status', 'min_strength', 'max_strength', 'text')
+
+    def __init__(self, status=None, min_strength=None, max_strength=None, text=''):
+        self.status = status
+        self.min_strength = min_strength
+        self.max_strength = max_strength
+        self.text = text.strip().lower()
+
+    def matches(self, name, record):
+        if self.status and record.status != self.status:
+            return False
+        if self.min_strength is not None or self.max_strength is not None:
+            if record.strength is None:
+                return False
+            if self.min_strength is not None and record.strength < self.min_strength:
+                return False
+            if self.max_strength is not None and record.strength > self.max_strength:
+                return False
+        if self.text and self.text not in name.lower() and self.text not in str(record.info).lower():
+            return False
+        return True
+
+
+class WeldListModel:
+    """焊缝列表模型：ID <-> 焊缝名，rows 为通过过滤的 ID（升序）"""
+
+    def __init__(self):
+        self._ids = {}        # 焊缝名 -> ID
+        self._names = []      # ID -> 焊缝名（已删除为 None）
+        self._records = []    # ID -> WeldRecord（已删除为 None）
+        self.rows = []
+        self.filter = WeldListFilter()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, weld_name):
+        return weld_name in self._ids
+
+    def reset(self, welds):
+        """用 {名称: WeldRecord} 重建模型（加载新模型时调用）"""
+        self._ids = {}
+        self._names = []
+        self._records = []
+        for name, record in welds.items():
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._records.append(record)
+        self._refilter()
+
+    def upsert(self, weld_name, record):
+        """新增或更新一条焊缝，只调整这一行；返回其当前行号（被过滤掉时为 None）"""
+        weld_id = self._ids.get(weld_name)
+        if weld_id is None:
+            weld_id = len(self._names)
+            self._ids[weld_name] = weld_id
+            self._names.append(weld_name)
+            self._records.append(record)
+        else:
+            self._records[weld_id] = record
+
+        row = bisect_left(self.rows, weld_id)
+        shown = row < len(self.rows) and self.rows[row] == weld_id
+        if self.filter.matches(weld_name, record):
+            if not shown:
+                insort(self.rows, weld_id)
+            return row
+        if shown:
+            del self.rows[row]
+        return None
+
+    def remove(self, weld_name):
+        """删除一条焊缝"""
+        weld_id = self._ids.pop(weld_name, None)
+        if weld_id is None:
+            return
+        self._names[weld_id] = None
+        self._records[weld_id] = None
+        row = bisect_left(self.rows, weld_id)
+        if row < len(self.rows) and self.rows[row] == weld_id:
+            del self.rows[row]
+
+    def set_filter(self, status=None, min_strength=None, max_strength=None, text=''):
+        self.filter = WeldListFilter(status, min_strength, max_strength, text)
+        self._refilter()
+
+    def _refilter(self):
+        matches = self.filter.matches
+        self.rows = [weld_id for weld_id, (name, record) in enumerate(zip(self._names, self._records))
+                     if name is not None and matches(name, record)]
+
+    def name_at(self, row):
+        return self._names[self.rows[row]]
+
+    def text_at(self, row):
+        weld_id = self.rows[row]
+        return weld_row_text(self._names[weld_id], self._records[weld_id])
+
+    def row_of(self, weld_name):
+        """焊缝当前所在行号，不存在或被过滤掉时为 None"""
+        weld_id = self._ids.get(weld_name)
+        if weld_id is None:
+            return None
+        row = bisect_left(self.rows, weld_id)
+        return row if row < len(self.rows) and self.rows[row] == weld_id else None
@@ -0,0 +1,394 @@
+"""焊缝数据：紧凑的单元集合、焊缝记录与单元反向索引"""
+import numpy as np
+
+from .trace import traced
+
+WELD_STATUSES = ('正常', '需检查', '需修复')  # 焊缝状态，列表过滤与信息面板着色都按此取值
+
+
+def _ids_to_runs(ids):
+    """将有序去重的 int32 单元数组拆分为连续区间 (starts, stops)"""
+    if len(ids) == 0:
+        return ids[:0].copy(), ids[:0].copy()
+    breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+    starts = ids[np.concatenate(([0], breaks))]
+    stops = ids[np.concatenate((breaks - 1, [len(ids) - 1]))] + 1
+    return starts.astype(np.int32), stops.astype(np.int32)
+
+
+class WeldCells:
+    """焊缝单元集合
+
+    单元 ID 有序去重后存储：连续区间多时存为 int32 区间 [starts, stops)，
+    否则存为 int32 数组。每个单元最多 4 字节，不再使用 Python int 列表。
+    """
+
+    __slots__ = ('_starts', '_stops', '_ids', '_size')
+
+    def __init__(self, starts=None, stops=None, ids=None):
+        self._starts = starts
+        self._stops = stops
+        self._ids = ids
+        if ids is not None:
+            self._size = len(ids)
+        else:
+            self._size = int((stops - starts).sum())
+
+    @classmethod
+    def from_range(cls, start, stop):
+        """由单个连续区间 [start, stop) 构造"""
+        stop = max(start, stop)
+        return cls(starts=np.array([start], dtype=np.int32),
+                   stops=np.array([stop], dtype=np.int32))
+
+    @classmethod
+    def from_ids(cls, ids, presorted=False):
+        """由任意单元 ID 序列构造，自动选择更紧凑的存储方式
+
+        presorted=True 表示 ids 已有序去重，跳过排序（大量小片段时明显更快）。
+        """
+        if presorted:
+            ids = np.asarray(ids).astype(np.int32)
+        else:
+            ids = np.unique(np.asarray(ids, dtype=np.int64)).astype(np.int32)
+        if len(ids) < 3:  # 区间存储至少需要两个数，不会更紧凑
+            ids.flags.writeable = False
+            return cls(ids=ids)
+        starts, stops = _ids_to_runs(ids)
+        if 2 * len(starts) < len(ids):
+            return cls(starts=starts, stops=stops)
+        ids.flags.writeable = False
+        return cls(ids=ids)
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        return iter(self.to_array().tolist())
+
+    def __contains__(self, cell_id):
+        if self._ids is not None:
+            pos = np.searchsorted(self._ids, cell_id)
+            return pos < len(self._ids) and self._ids[pos] == cell_id
+        pos = np.searchsorted(self._starts, cell_id, side='right') - 1
+        return pos >= 0 and cell_id < self._stops[pos]
+
+    @property
+    def is_ranges(self):
+        return self._ids is None
+
+    @property
+    def nbytes(self):
+        if self._ids is not None:
+            return self._ids.nbytes
+        return self._starts.nbytes + self._stops.nbytes
+
+    def runs(self):
+        """返回连续区间 (starts, stops)"""
+        if self._ids is None:
+            return self._starts, self._stops
+        return _ids_to_runs(self._ids)
+
+    def to_array(self):
+        """返回有序 int32 单元数组，可直接传给 PyVista
+
+        数组存储时零拷贝返回只读数组；区间存储时按需展开。
+        """
+        if self._ids is not None:
+            return self._ids
+        lengths = (self._stops - self._starts).astype(np.int64)
+        offsets = np.repeat(self._starts.astype(np.int64) - (np.cumsum(lengths) - lengths), lengths)
+        return (offsets + np.arange(self._size)).astype(np.int32)
+
+    def take(self, values):
+        """返回 values[cells]，区间存储时按切片读取"""
+        if self._ids is not None:
+            return values[self._ids]
+        if len(self._starts) == 1:
+            return values[self._starts[0]:self._stops[0]]
+        return np.concatenate([values[s:e] for s, e in zip(self._starts, self._stops)])
+
+    def put(self, values, value):
+        """执行 values[cells] = value，区间存储时按切片写入"""
+        if self._ids is not None:
+            values[self._ids] = value
+            return
+        for s, e in zip(self._starts, self._stops):
+            values[s:e] = value
+
+    def shifted(self, offset):
+        """所有单元 ID 加上 offset（合并多个网格时使用）"""
+        if self._ids is not None:
+            ids = (self._ids + np.int32(offset)).astype(np.int32)
+            ids.flags.writeable = False
+            return WeldCells(ids=ids)
+        return WeldCells(starts=(self._starts + np.int32(offset)).astype(np.int32),
+                         stops=(self._stops + np.int32(offset)).astype(np.int32))
+
+    def clip(self, n_cells):
+        """去掉超出 [0, n_cells) 范围的单元"""
+        if self._ids is not None:
+            if len(self._ids) == 0 or (self._ids[0] >= 0 and self._ids[-1] < n_cells):
+                return self
+            return WeldCells.from_ids(self._ids[(self._ids >= 0) & (self._ids < n_cells)])
+        starts = np.clip(self._starts, 0, n_cells)
+        stops = np.clip(self._stops, 0, n_cells)
+        keep = stops > starts
+        return WeldCells(starts=starts[keep].astype(np.int32), stops=stops[keep].astype(np.int32))
+
+
+class WeldRecord:
+    """单条焊缝记录"""
+
+    __slots__ = ('cells', 'strength', 'status', 'color', 'info', 'bounds', 'max_dim')
+
+    def __init__(self, cells, strength, status, color, info, bounds=None, max_dim=None):
+        self.cells = cells if isinstance(cells, WeldCells) else WeldCells.from_ids(cells)
+        self.strength = strength
+        self.status = status
+        self.color = color
+        self.info = info
+        self.bounds = bounds
+        self.max_dim = max_dim
+
+
+def weld_segments(welds, n_cells):
+    """把焊缝表 {名称: WeldRecord} 展开为按焊缝顺序拼接的单元，供分段归约使用
+
+    返回 (names, cells, labels, counts)：cells 为各焊缝裁剪到 [0, n_cells) 后的单元依次拼接，
+    labels[i] 为 cells[i] 所属焊缝在 names 中的行号，counts 为每条焊缝的单元数。
+    """
+    names = list(welds)
+    cell_arrays = [welds[name].cells.clip(n_cells).to_array() for name in names]
+    counts = np.array([len(cells) for cells in cell_arrays], dtype=np.int64)
+    cells = np.concatenate(cell_arrays) if cell_arrays else np.empty(0, dtype=np.int32)
+    labels = np.repeat(np.arange(len(names)), counts)
+    return names, cells, labels, counts
+
+
+class WeldTable:
+    """按列存放的逐焊缝结果（指标、偏差、扫描覆盖等）的公共部分，第 i 行对应 names[i]"""
+
+    __slots__ = ('names', 'cell_count', '_rows')
+
+    def __init__(self, names, cell_count):
+        self.names = names
+        self.cell_count = cell_count
+        self._rows = {name: i for i, name in enumerate(names)}  # 焊缝名 -> 行号
+
+    def __len__(self):
+        return len(self.names)
+
+    def row(self, weld_name):
+        """焊缝名对应的行号"""
+        return self._rows[weld_name]
+
+
+class WeldCellIndex:
+    """单元 -> 焊缝 的反向索引
+
+    每一层是长度为 n_cells 的 int32 标签数组（-1 表示无焊缝），焊缝放入第一个
+    与其单元不冲突的层，因此允许焊缝相互重叠。查询只与层数有关，与焊缝数量无关。
+    """
+
+    def __init__(self, n_cells):
+        self.n_cells = n_cells
+        self.layers = []
+        self._ids = {}      # 焊缝名 -> 整数 ID
+        self._names = []    # 整数 ID -> 焊缝名（已删除为 None）
+        self._placement = {}  # 整数 ID -> (层号, WeldCells)
+
+    def __contains__(self, weld_name):
+        return weld_name in self._ids
+
+    def add(self, weld_name, cells):
+        """登记焊缝单元（WeldCells 或单元 ID 序列），已存在的同名焊缝会被替换"""
+        if weld_name in self._ids:
+            self.remove(weld_name)
+
+        if not isinstance(cells, WeldCells):
+            cells = WeldCells.from_ids(cells)
+        cells = cells.clip(self.n_cells)
+
+        weld_id = len(self._names)
+        self._names.append(weld_name)
+        self._ids[weld_name] = weld_id
+
+        for layer_no, labels in enumerate(self.layers):
+            if np.all(cells.take(labels) < 0):
+                break
+        else:
+            layer_no = len(self.layers)
+            self.layers.append(np.full(self.n_cells, -1, dtype=np.int32))
+
+        cells.put(self.layers[layer_no], weld_id)
+        self._placement[weld_id] = (layer_no, cells)
+
+    def remove(self, weld_name):
+        """从索引中移除焊缝"""
+        weld_id = self._ids.pop(weld_name, None)
+        if weld_id is None:
+            return
+        layer_no, cells = self._placement.pop(weld_id)
+        cells.put(self.layers[layer_no], -1)
+        self._names[weld_id] = None
+
+        # 去掉末尾的空层，保持查询层数最少
+        while self.layers and not self._placement_in_layer(len(self.layers) - 1):
+            self.layers.pop()
+
+    def _placement_in_layer(self, layer_no):
+        return any(layer == layer_no for layer, _ in self._placement.values())
+
+    def weld_at(self, cell_id):
+        """返回覆盖该单元的第一条焊缝名，没有则返回 None"""
+        if not 0 <= cell_id < self.n_cells:
+            return None
+        for labels in self.layers:
+            weld_id = labels[cell_id]
+            if weld_id >= 0:
+                return self._names[weld_id]
+        return None
+
+    def welds_at(self, cell_id):
+        """返回覆盖该单元的全部焊缝名"""
+        if not 0 <= cell_id < self.n_cells:
+            return []
+        return [self._names[labels[cell_id]] for labels in self.layers if labels[cell_id] >= 0]
+
+    def first_hits(self, cell_ids):
+        """批量查询：[(焊缝名, 该焊缝首个单元在 cell_ids 中的位置)]，按位置排序"""
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        valid = np.flatnonzero((cell_ids >= 0) & (cell_ids < self.n_cells))
+        positions = []
+        weld_ids = []
+        for labels in self.layers:
+            ids = labels[cell_ids[valid]]
+            hit = ids >= 0
+            positions.append(valid[hit])
+            weld_ids.append(ids[hit])
+        if not positions:
+            return []
+
+        positions = np.concatenate(positions)
+        weld_ids = np.concatenate(weld_ids)
+        order = np.argsort(positions, kind='stable')
+        unique_ids, first = np.unique(weld_ids[order], return_index=True)
+        first_positions = positions[order][first]
+        order = np.argsort(first_positions, kind='stable')
+        return [(self._names[weld_id], int(position))
+                for weld_id, position in zip(unique_ids[order], first_positions[order])]
+
+    def welds_in(self, cell_ids):
+        """返回覆盖 cell_ids 中任一单元的焊缝名，按首次出现的顺序"""
+        return [name for name, _ in self.first_hits(cell_ids)]
+
+    def contains(self, weld_name, cell_id):
+        """判断单元是否属于指定焊缝"""
+        weld_id = self._ids.get(weld_name)
+        if weld_id is None or not 0 <= cell_id < self.n_cells:
+            return False
+        layer_no, _ = self._placement[weld_id]
+        return self.layers[layer_no][cell_id] == weld_id
+
+    @classmethod
+    def from_weld_data(cls, n_cells, welds):
+        index = cls(n_cells)
+        for name, data in welds.items():
+            index.add(name, data.cells)
+        return index
+
+
+@traced('weld_generation', 'welds')
+def build_weld_data(n_cells, n_welds=12, seed=None, verbose=True, adjacency=None):
+    """为 n_cells 个单元的模型生成模拟焊缝数据
+
+    单元按顺序均分为 n_welds 段；给定 adjacency (FacetAdjacency) 时改为以每段的
+    首个单元为种子沿相邻关系生长，每条焊缝都是连续区域（不可达的单元不属于任何焊缝）。
+    seed 不为 None 时结果可复现（基准测试使用）。
+    """
+    if verbose:
+        print(f"模型总单元数: {n_cells}")
+
+    rng = np.random.default_rng(seed)
+    bounds = (np.arange(n_welds + 1, dtype=np.int64) * n_cells // n_welds).astype(np.int32)
+    if adjacency is not None:
+        cells = _grown_weld_cells(adjacency, bounds[:-1][bounds[:-1] < n_cells], n_welds)
+    else:
+        cells = [WeldCells(starts=bounds[i:i + 1], stops=bounds[i + 1:i + 2]) for i in range(n_welds)]
+    strengths = np.round(rng.uniform(0.7, 0.95, n_welds), 2).tolist()
+    checked = (rng.random(n_welds) > 0.3).tolist()
+    colors = rng.choice(['red', 'green', 'yellow', 'blue', 'orange'], n_welds).tolist()
+
+    welds = {}
+    for i in range(n_welds):
+        welds[f'焊缝{i + 1}'] = WeldRecord(
+            cells=cells[i],
+            strength=strengths[i],
+            status='正常' if checked[i] else '需检查',
+            color=colors[i],
+            info=f'焊缝 {i + 1} 区域，模拟数据'
+        )
+
+    if verbose:
+        for name, data in welds.items():
+            print(f"焊缝 {name} 包含 {len(data.cells)} 个有效单元")
+
+    return welds
+
+
+def _grown_weld_cells(adjacency, seeds, n_welds):
+    """从种子生长出连续区域，返回 n_welds 个 WeldCells（种子不足时后面的为空）"""
+    labels = adjacency.grow_regions(seeds)
+    assigned = np.flatnonzero(labels >= 0)
+    order = assigned[np.argsort(labels[assigned], kind='stable')]
+    offsets = np.zeros(n_welds + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels[assigned], minlength=n_welds)[:n_welds], out=offsets[1:])
+    return [WeldCells.from_ids(order[offsets[i]:offsets[i + 1]], presorted=True) for i in range(n_welds)]
+
+
+WELD_FIELDS = ('strength', 'status', 'color', 'info', 'bounds', 'max_dim')
+
+
+def pack_weld_cells(cells):
+    """把 WeldCells 编码为 (类型, int32 数组)：区间存储为 0 与 [s0, e0, s1, e1, ...]，数组存储为 1 与单元 ID"""
+    if cells.is_ranges:
+        starts, stops = cells.runs()
+        return 0, np.column_stack((starts, stops)).ravel().astype(np.int32)
+    return 1, cells.to_array()
+
+
+def unpack_weld_cells(kind, data):
+    """pack_weld_cells 的逆操作，data 可以是内存映射数组的切片（不复制）"""
+    if kind == 0:
+        return WeldCells(starts=data[0::2], stops=data[1::2])
+    return WeldCells(ids=data)
+
+
+def pack_weld_table(welds):
+    """把焊缝字典编码为列式表：(属性列表, 类型数组, 偏移数组, 单元数据)"""
+    attributes = []
+    kinds = np.empty(len(welds), dtype=np.int8)
+    chunks = []
+    for i, (name, record) in enumerate(welds.items()):
+        attributes.append(dict(name=name, **{field: getattr(record, field) for field in WELD_FIELDS}))
+        kinds[i], data = pack_weld_cells(record.cells)
+        chunks.append(data)
+    offsets = np.zeros(len(welds) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in chunks])
+    data = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+    return attributes, kinds, offsets, data
+
+
+def unpack_weld_table(attributes, kinds, offsets, data):
+    """pack_weld_table 的逆操作，返回 {焊缝名: WeldRecord}"""
+    welds = {}
+    for i, attrs in enumerate(attributes):
+        attrs = dict(attrs)
+        name = attrs.pop('name')
+        cells = unpack_weld_cells(kinds[i], data[offsets[i]:offsets[i + 1]])
+        welds[name] = WeldRecord(cells=cells, **attrs)
+    return welds